@@ -0,0 +1,72 @@
+"""
+Report the memory each cached train status costs, built from the bundled
+train_status.json:
+
+- full models: every field and station validated eagerly into pydantic models
+  (how responses were cached before lazy routes and compaction)
+- unread: station lists still decoded JSON, as every cached response holds them
+  until a tool first reads its route (whatever TRAIN_CACHE_COMPACT is)
+- lazy read: station lists read as pydantic models (TRAIN_CACHE_COMPACT=0)
+- compact read: station lists read as slotted CompactStation records (TRAIN_CACHE_COMPACT=1)
+
+    python -m benchmarks.cache_memory [--trains 200]
+"""
+
+import argparse
+import os
+import tracemalloc
+from lib.decoding import decode_json
+from lib.schema.train import FullTrainStatusResponse, NewTrainStatusResponse
+
+EXAMPLE_TRAIN_STATUS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib", "example_api_responses", "train_status.json"
+)
+
+
+def full_models(content: bytes):
+    response = FullTrainStatusResponse.model_validate(decode_json(content))
+    response.upcoming_stations, response.previous_stations
+    return response
+
+
+def unread(content: bytes):
+    return NewTrainStatusResponse.model_validate(decode_json(content)).compact()
+
+
+def lazy_read(content: bytes):
+    response = NewTrainStatusResponse.model_validate(decode_json(content))
+    response.upcoming_stations, response.previous_stations
+    return response
+
+
+def compact_read(content: bytes):
+    response = NewTrainStatusResponse.model_validate(decode_json(content)).compact()
+    response.upcoming_stations, response.previous_stations
+    return response
+
+
+def kib_per_train(build, content: bytes, trains: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    cache = [build(content) for _ in range(trains)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del cache
+    return (after - before) / trains / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trains", type=int, default=200, help="Responses held at once")
+    args = parser.parse_args()
+
+    with open(EXAMPLE_TRAIN_STATUS, "rb") as f:
+        content = f.read()
+
+    for build in (full_models, unread, lazy_read, compact_read):
+        build(content)  # warm up
+        print(f"{build.__name__:<14} {kib_per_train(build, content, args.trains):7.1f} KiB per cached train")
+
+
+if __name__ == "__main__":
+    main()
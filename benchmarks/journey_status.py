@@ -0,0 +1,87 @@
+"""
+Compare end-to-end latency of get_full_journey_status-style lookups against mocked
+upstreams: a cold PNR (train fetched after the PNR) vs. a known train number (train
+fetched alongside the PNR), with cached-PNR lookups (no PNR fetch at all) reported apart.
+
+    python -m benchmarks.journey_status [--latency 0.2] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+from datetime import date
+import httpx
+from lib.http_client import open_http_clients, close_http_clients
+from lib.journey import (
+    fetch_journey_status,
+    JOURNEY_CACHED_PNR_LATENCY,
+    JOURNEY_OVERLAPPED_LATENCY,
+    JOURNEY_SEQUENTIAL_LATENCY,
+)
+
+pnr_module = importlib.import_module("lib.pnr")
+train_module = importlib.import_module("lib.train")
+timetable_module = importlib.import_module("lib.timetable")
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib", "example_api_responses")
+PNR_NO = "8341223680"
+
+
+def mock_transport(latency: float) -> httpx.MockTransport:
+    with open(os.path.join(EXAMPLES, "pnr.json")) as f:
+        pnr = json.load(f)
+    pnr["data"]["SourceDoj"] = date.today().strftime("%d-%m-%Y")
+    with open(os.path.join(EXAMPLES, "train_status.json"), "rb") as f:
+        train_body = f.read()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        if request.url.host == "trains.example":
+            return httpx.Response(200, content=train_body)
+        if request.method == "GET":
+            return httpx.Response(200, headers={"set-cookie": "XSRF-TOKEN=bench; Path=/"})
+        return httpx.Response(200, json=pnr)
+
+    return httpx.MockTransport(handler)
+
+
+async def run(latency: float, rounds: int) -> None:
+    pnr_module.PNR_API_PATH = "https://pnr.example/api"
+    pnr_module.PNR_API_KEY_NAME = "XSRF-TOKEN"
+    train_module.NEW_TRAIN_STATUS_API_BASE = "https://trains.example"
+    # Keep the benchmark's timetables out of the on-disk store
+    timetable_module.TIMETABLE_DB_PATH = ":memory:"
+    await open_http_clients(transport=mock_transport(latency))
+    try:
+        # Prime the XSRF token so every round pays for exactly one PNR POST
+        await fetch_journey_status(PNR_NO)
+        for tracker in (JOURNEY_SEQUENTIAL_LATENCY, JOURNEY_OVERLAPPED_LATENCY, JOURNEY_CACHED_PNR_LATENCY):
+            tracker.reset()
+        for _ in range(rounds):
+            for scenario in ("cold", "train_number", "cached_pnr"):
+                train_module.TRAIN_STATUS_CACHE.clear()
+                if scenario != "cached_pnr":
+                    pnr_module.PNR_STATUS_CACHE.clear()
+                train_number = "19309" if scenario == "train_number" else None
+                await fetch_journey_status(PNR_NO, train_number=train_number)
+    finally:
+        await close_http_clients()
+
+    print(f"upstream latency {latency * 1000:.0f}ms, {rounds} rounds")
+    print(JOURNEY_SEQUENTIAL_LATENCY.summary())
+    print(JOURNEY_OVERLAPPED_LATENCY.summary())
+    print(JOURNEY_CACHED_PNR_LATENCY.summary())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated upstream latency in seconds")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.latency, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
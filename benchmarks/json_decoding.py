@@ -0,0 +1,62 @@
+"""
+Compare CPU time per upstream response for each JSON_DECODER backend on the
+bundled train_status.json: from raw response bytes to a validated model, with
+and without reading the (lazily validated) station lists.
+
+    python -m benchmarks.json_decoding [--repeat 2000]
+"""
+
+import argparse
+import importlib
+import importlib.util
+import os
+import time
+from lib.decoding import decode_model
+from lib.schema.train import NewTrainStatusResponse
+
+decoding_module = importlib.import_module("lib.decoding")
+
+EXAMPLE_TRAIN_STATUS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib", "example_api_responses", "train_status.json"
+)
+
+
+def mean_time(fn, repeat: int) -> float:
+    fn()
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(EXAMPLE_TRAIN_STATUS, "rb") as f:
+        content = f.read()
+
+    decoders = ["stdlib", "pydantic"]
+    if importlib.util.find_spec("orjson"):
+        decoding_module.orjson = importlib.import_module("orjson")
+        decoders.append("orjson")
+    else:
+        print("orjson not installed - skipping it (pip install orjson)")
+
+    print(f"{'decoder':<10} {'header':>10} {'+ route':>10}")
+    for decoder in decoders:
+        decoding_module.JSON_DECODER = decoder
+
+        def header():
+            return decode_model(content, NewTrainStatusResponse, failure_flag="success")
+
+        def route():
+            response = decode_model(content, NewTrainStatusResponse, failure_flag="success")
+            return response.previous_stations, response.upcoming_stations
+
+        print(f"{decoder:<10} {mean_time(header, args.repeat) * 1e6:8.1f}us {mean_time(route, args.repeat) * 1e6:8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Measure what deferred station-list validation saves on long routes.
+
+The bundled train_status.json is stretched to --stations halts (each keeping its
+non-stops) and parsed repeatedly. "header only" is what a tool like
+get_current_train_position pays; "full route" additionally reads both station
+lists, which is what every response cost before validation was deferred.
+
+    python -m benchmarks.lazy_routes [--stations 120] [--repeat 300]
+"""
+
+import argparse
+import copy
+import json
+import os
+import time
+from lib.schema.train import NewTrainStatusResponse
+
+EXAMPLE_TRAIN_STATUS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib", "example_api_responses", "train_status.json"
+)
+
+
+def long_route(payload: dict, stations: int) -> dict:
+    """Repeat the example's halts until the route has `stations` of them, split evenly before/after the train."""
+    payload = copy.deepcopy(payload)
+    for key, count in (("previous_stations", stations // 2), ("upcoming_stations", stations - stations // 2)):
+        template = [s for s in payload[key] if s["station_code"]]
+        payload[key] = [copy.deepcopy(template[i % len(template)]) for i in range(count)]
+    return payload
+
+
+def mean_time(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=120, help="Halts on the synthetic route")
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    with open(EXAMPLE_TRAIN_STATUS) as f:
+        payload = long_route(json.load(f), args.stations)
+    non_stops = sum(len(s["non_stops"]) for key in ("previous_stations", "upcoming_stations") for s in payload[key])
+
+    def header_only():
+        response = NewTrainStatusResponse.model_validate(payload)
+        return response.current_station_code, response.delay
+
+    def full_route():
+        response = NewTrainStatusResponse.model_validate(payload)
+        return response.previous_stations, response.upcoming_stations
+
+    header_only()
+    full_route()
+    header = mean_time(header_only, args.repeat)
+    full = mean_time(full_route, args.repeat)
+
+    print(f"route: {args.stations} halts, {non_stops} non-stops")
+    print(f"header only: {header * 1e6:9.1f} us/response")
+    print(f"full route:  {full * 1e6:9.1f} us/response")
+    print(f"saved:       {(full - header) / full:9.1%} for header-only tools")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare parse time and retained memory per response of the lean
+NewTrainStatusResponse against FullTrainStatusResponse, which also validates
+the app's ad/UI payload, on the bundled train_status.json.
+
+Both station lists are read after parsing, as every route-reading tool does;
+--headers-only measures the parse alone, leaving the lazily validated routes
+untouched.
+
+    python -m benchmarks.parse_modes [--repeat 2000] [--keep 200] [--headers-only]
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from lib.schema.train import FullTrainStatusResponse, NewTrainStatusResponse
+
+EXAMPLE_TRAIN_STATUS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib", "example_api_responses", "train_status.json"
+)
+
+
+def parse(model: type[NewTrainStatusResponse], payload: dict, routes: bool) -> NewTrainStatusResponse:
+    """Parse one response, reading both station lists when `routes` is set."""
+    response = model.model_validate(payload)
+    if routes:
+        response.upcoming_stations, response.previous_stations
+    return response
+
+
+def parse_time(model: type[NewTrainStatusResponse], payload: dict, repeat: int, routes: bool) -> float:
+    """Mean seconds per parse."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(model, payload, routes)
+    return (time.perf_counter() - start) / repeat
+
+
+def retained_bytes(model: type[NewTrainStatusResponse], payload: dict, keep: int, routes: bool) -> float:
+    """Mean bytes still allocated per parsed response while `keep` of them are alive."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    responses = [parse(model, payload, routes) for _ in range(keep)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del responses
+    return (after - before) / keep
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="Parses timed per model")
+    parser.add_argument("--keep", type=int, default=200, help="Responses kept alive for the memory measurement")
+    parser.add_argument("--headers-only", action="store_true", help="Do not read the station lists after parsing")
+    args = parser.parse_args()
+    routes = not args.headers_only
+
+    with open(EXAMPLE_TRAIN_STATUS) as f:
+        payload = json.load(f)
+
+    print(f"{'model':<26} {'parse':>10} {'retained':>12}")
+    for model in (FullTrainStatusResponse, NewTrainStatusResponse):
+        parse(model, payload, routes)  # warm up
+        seconds = parse_time(model, payload, args.repeat, routes)
+        size = retained_bytes(model, payload, args.keep, routes)
+        print(f"{model.__name__:<26} {seconds * 1e6:8.1f}us {size / 1024:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
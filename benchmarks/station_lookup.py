@@ -0,0 +1,70 @@
+"""
+Compare per-station lookups on the bundled train_status.json: the linear scan over
+upcoming, previous and non-stop stations the helpers used to do vs. the cached
+station index on NewTrainStatusResponse.
+
+    python -m benchmarks.station_lookup [--repeat 200]
+"""
+
+import argparse
+import os
+import time
+from lib.schema.train import NewTrainStatusResponse
+
+EXAMPLE_TRAIN_STATUS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib", "example_api_responses", "train_status.json"
+)
+
+
+def linear_lookup(data: NewTrainStatusResponse, station_code: str):
+    """The previous lookup: scan upcoming, then previous, then every station's non-stops."""
+    code = station_code.upper()
+    for station in data.upcoming_stations:
+        if station.station_code.upper() == code:
+            return station
+    for station in data.previous_stations:
+        if station.station_code.upper() == code:
+            return station
+    for station in data.upcoming_stations + data.previous_stations:
+        for non_stop in station.non_stops:
+            if non_stop.station_code.upper() == code:
+                return non_stop
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over every station code on the route")
+    args = parser.parse_args()
+
+    with open(EXAMPLE_TRAIN_STATUS, "rb") as f:
+        response = NewTrainStatusResponse.model_validate_json(f.read())
+
+    stations = response.upcoming_stations + response.previous_stations
+    codes = [s.station_code for s in stations if s.station_code]
+    codes += [ns.station_code for s in stations for ns in s.non_stops]
+    codes.append("XXXX")  # a miss costs a full scan
+    lookups = len(codes) * args.repeat
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for code in codes:
+            linear_lookup(response, code)
+    linear = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response.station_index
+    build = time.perf_counter() - start
+    for _ in range(args.repeat):
+        for code in codes:
+            response.station_lookup(code)
+    indexed = time.perf_counter() - start
+
+    print(f"{len(codes)} station codes x {args.repeat} passes = {lookups} lookups")
+    print(f"linear scan:   {linear * 1e6 / lookups:8.2f} us/lookup")
+    print(f"station index: {indexed * 1e6 / lookups:8.2f} us/lookup (build {build * 1e6:.0f} us, once per response)")
+    print(f"speed-up:      {linear / indexed:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    """Counters for a TTLCache."""
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0  # misses that joined an in-flight load instead of starting one
+    evictions: int = 0
+    size: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    expires_at: float  # time.monotonic() deadline
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A bounded in-memory LRU cache whose entries expire after a per-value TTL.
+
+    Concurrent misses for the same key are coalesced into a single load.
+    Loads that return None are not cached.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_for: Callable[[V], float]):
+        """
+        Args:
+            name: Name used when reporting stats
+            max_entries: Maximum number of entries kept before the least recently used is evicted
+            ttl_for: Returns the time-to-live in seconds for a freshly loaded value
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_for = ttl_for
+        self._entries: OrderedDict[K, _Entry[V]] = OrderedDict()
+        self._inflight: dict[K, asyncio.Future[V | None]] = {}
+        self._stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def peek(self, key: K) -> V | None:
+        """Return a fresh value without touching the LRU order or the counters."""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        return entry.value
+
+    def peek_stale(self, key: K, max_age: float) -> V | None:
+        """
+        Return a value that may have expired up to max_age seconds ago, without touching
+        the LRU order or the counters. Expired entries stay until evicted or replaced.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at + max_age <= time.monotonic():
+            return None
+        return entry.value
+
+    def items(self) -> list[tuple[K, V]]:
+        """Snapshot of every fresh (key, value) pair, without touching the LRU order or the counters."""
+        now = time.monotonic()
+        return [(key, entry.value) for key, entry in self._entries.items() if entry.expires_at > now]
+
+    def get(self, key: K) -> V | None:
+        """Return a fresh value, counting the lookup as a hit or a miss."""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            self._stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return entry.value
+
+    def put(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Store a value, evicting the least recently used entries if the cache is full."""
+        if ttl is None:
+            ttl = self.ttl_for(value)
+        self._entries[key] = _Entry(value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        self._entries.clear()
+        self._inflight.clear()
+        self._stats = CacheStats()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            coalesced=self._stats.coalesced,
+            evictions=self._stats.evictions,
+            size=len(self._entries),
+        )
+
+    def summary(self) -> str:
+        """One line: size, hit/miss counts and ratio, coalesced loads and evictions."""
+        stats = self.stats()
+        return (
+            f"{self.name}: size={stats.size}/{self.max_entries} hits={stats.hits} misses={stats.misses} "
+            f"hit_ratio={stats.hit_ratio:.0%} coalesced={stats.coalesced} evictions={stats.evictions}"
+        )
+
+    async def get_or_load(self, key: K, loader: Callable[[], Awaitable[V | None]]) -> V | None:
+        """
+        Return the cached value for key, or load it.
+
+        Only one load per key runs at a time; concurrent callers wait for it.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and not inflight.done() and inflight.get_loop() is asyncio.get_running_loop():
+            self._stats.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.ensure_future(self._load(key, loader))
+        self._inflight[key] = future
+        return await asyncio.shield(future)
+
+    async def _load(self, key: K, loader: Callable[[], Awaitable[V | None]]) -> V | None:
+        try:
+            value = await loader()
+            if value is not None:
+                self.put(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
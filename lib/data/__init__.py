@@ -0,0 +1 @@
+# Bundled offline datasets
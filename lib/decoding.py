@@ -0,0 +1,68 @@
+import importlib.util
+import json
+import os
+from typing import Any, TypeVar
+from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
+
+load_dotenv()
+
+M = TypeVar("M", bound=BaseModel)
+
+# How upstream JSON is turned into models:
+#   "orjson"   - decode with orjson, then validate the dict (needs the optional `orjson` package)
+#   "pydantic" - validate the raw response bytes in one pass (model_validate_json)
+#   "stdlib"   - decode with the json module, then validate the dict
+# orjson falls back to pydantic when the package is not installed
+JSON_DECODER = os.getenv("JSON_DECODER", "orjson")
+if JSON_DECODER == "orjson" and importlib.util.find_spec("orjson") is None:
+    JSON_DECODER = "pydantic"
+
+if JSON_DECODER == "orjson":
+    import orjson
+
+
+def decode_json(content: bytes) -> Any:
+    """Decode a JSON document with the configured decoder."""
+    if JSON_DECODER == "orjson":
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def decode_model(content: bytes, model: type[M], failure_flag: str | None = None) -> M | None:
+    """
+    Parse an upstream JSON response body into a model.
+
+    Args:
+        content: Raw response body
+        model: Pydantic model to validate against
+        failure_flag: Top-level boolean the API sets to false for "not found" style
+            errors (e.g. "success"); such responses return None instead of raising
+
+    Returns:
+        The validated model, or None if the API flagged the request as failed
+
+    Raises:
+        ValueError: If the body is not valid JSON or does not match the model
+    """
+    if JSON_DECODER == "pydantic":
+        try:
+            parsed = model.model_validate_json(content)
+        except ValidationError:
+            # Error payloads rarely match the model - only then pay for a second decode
+            if failure_flag is not None and _is_flagged_failure(json.loads(content), failure_flag):
+                return None
+            raise
+    else:
+        data = decode_json(content)
+        if failure_flag is not None and _is_flagged_failure(data, failure_flag):
+            return None
+        parsed = model.model_validate(data)
+
+    if failure_flag is not None and getattr(parsed, failure_flag, None) is False:
+        return None
+    return parsed
+
+
+def _is_flagged_failure(data: Any, failure_flag: str) -> bool:
+    return isinstance(data, dict) and data.get(failure_flag) is False
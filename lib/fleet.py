@@ -0,0 +1,399 @@
+import asyncio
+import heapq
+import os
+import random
+import sys
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from lib.schema.train import NewTrainStatusResponse
+from lib.train import (
+    TRAIN_STATUS_CACHE,
+    calculate_start_day,
+    fetch_new_train_status,
+    fetch_train_run_status,
+    format_delay,
+    get_train_start_date,
+    train_status_ttl,
+)
+
+load_dotenv()
+
+# Trains whose current run is polled in the background from start-up, e.g. "12301,12951"
+FLEET_TRAINS = os.getenv("FLEET_TRAINS", "")
+# Seconds between checks for the current run of a FLEET_TRAINS train that has none being polled
+FLEET_RESOLVE_INTERVAL = float(os.getenv("FLEET_RESOLVE_INTERVAL", "1800"))
+# Maximum background fetches in flight, and started per second, across all watched trains
+FLEET_CONCURRENCY = int(os.getenv("FLEET_CONCURRENCY", "8"))
+FLEET_MAX_RATE = float(os.getenv("FLEET_MAX_RATE", "5"))
+# Each interval is randomised by up to this fraction so trains added together do not poll in lockstep
+FLEET_JITTER = float(os.getenv("FLEET_JITTER", "0.1"))
+# Interval multiplier for trains still waiting at their source
+FLEET_IDLE_FACTOR = float(os.getenv("FLEET_IDLE_FACTOR", "4"))
+# First retry delay after a failed fetch (doubling per failure up to FLEET_MAX_BACKOFF), and failures before a run is dropped
+FLEET_RETRY_INTERVAL = float(os.getenv("FLEET_RETRY_INTERVAL", "30"))
+FLEET_MAX_BACKOFF = float(os.getenv("FLEET_MAX_BACKOFF", "600"))
+FLEET_MAX_FAILURES = int(os.getenv("FLEET_MAX_FAILURES", "10"))
+
+# Status codes of a train that is moving between stations
+MOVING_STATUSES = ("T", "D")
+
+
+@dataclass
+class StatusUpdate:
+    """A snapshot pushed to the subscribers of a watched train run."""
+    train_status: NewTrainStatusResponse
+    changes: list[str]  # what changed since the previous snapshot; empty for the first one
+    final: bool = False  # the run has reached its destination and will not be polled again
+
+
+def status_changes(previous: NewTrainStatusResponse, current: NewTrainStatusResponse) -> list[str]:
+    """
+    Describe what a subscriber needs to know between two snapshots of a train run.
+
+    Only the current station, the delay and the platform are compared; everything
+    else is either static or follows from these.
+    """
+    changes = []
+    if current.current_station_code != previous.current_station_code:
+        changes.append(f"Now at {current.current_station_name} ({current.current_station_code})")
+    if current.delay != previous.delay:
+        changes.append(f"{format_delay(current.delay)} (was {format_delay(previous.delay).lower()})")
+    if current.platform_number != previous.platform_number and current.platform_number:
+        if current.current_station_code == previous.current_station_code and previous.platform_number:
+            changes.append(
+                f"Platform at {current.current_station_code} changed: {previous.platform_number} → {current.platform_number}"
+            )
+        else:
+            changes.append(f"Platform {current.platform_number} at {current.current_station_code}")
+    if current.at_dstn and not previous.at_dstn:
+        changes.append(f"Reached {current.dest_stn_name} ({current.destination})")
+    return changes
+
+
+@dataclass
+class WatchedRun:
+    """A train run owned by the fleet and its polling state."""
+    train_number: str
+    start_date: date  # the run's date at its source; start_day follows from it on every poll
+    held: bool = False  # watched explicitly (not only for subscribers) until it arrives
+    due: float = 0.0  # loop time of the next poll
+    interval: float = 0.0  # seconds until the next poll, before jitter
+    polls: int = 0
+    failures: int = 0  # consecutive failed fetches
+    latest: NewTrainStatusResponse | None = None
+    subscribers: set[asyncio.Queue[StatusUpdate]] = field(default_factory=set)
+
+    @property
+    def key(self) -> tuple[str, date]:
+        return (self.train_number, self.start_date)
+
+    @property
+    def start_day(self) -> int:
+        return calculate_start_day(self.start_date)
+
+    def publish(self, update: StatusUpdate) -> None:
+        for queue in self.subscribers:
+            queue.put_nowait(update)
+
+
+def run_key(train_number: str, start_day: int) -> tuple[str, date]:
+    """Key of the run of a train that left its source start_day days ago."""
+    return (train_number.strip(), date.today() - timedelta(days=start_day))
+
+
+def poll_interval(train_status: NewTrainStatusResponse) -> float | None:
+    """
+    Seconds until a watched run should be polled again, None once it needs no more polls.
+
+    Moving trains follow the API's cur_refresh_interval, trains at a station its
+    slower refresh_interval, and trains waiting at their source a multiple of that.
+    Runs that have reached their destination are done.
+    """
+    if train_status.at_dstn:
+        return None
+    if train_status.at_src:
+        return max(train_status.refresh_interval, 1) * FLEET_IDLE_FACTOR
+    if train_status.status in MOVING_STATUSES:
+        return train_status_ttl(train_status)
+    return float(max(train_status.refresh_interval, train_status.cur_refresh_interval, 1))
+
+
+class PollerFleet:
+    """
+    Keeps the live status of many watched train runs fresh in the response cache.
+
+    A single scheduler task pops runs off a due-time heap and starts their fetches,
+    at most `concurrency` at once and at most `max_rate` per second. Each run's next
+    poll is set from its latest response (see poll_interval) with jitter; runs that
+    reach their destination or keep failing are dropped. Fetched responses are cached
+    until the next poll is due, so interactive tool calls on watched trains hit the cache.
+
+    Runs are watched explicitly (watch), for as long as someone subscribes to their
+    changes (subscribe), or as the current run of a tracked train (track): a resolver
+    task looks up the active run of every tracked train without one being polled, so
+    a new run is picked up each day once the previous one has arrived.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = FLEET_CONCURRENCY,
+        max_rate: float = FLEET_MAX_RATE,
+        jitter: float = FLEET_JITTER,
+    ):
+        """
+        Args:
+            concurrency: Maximum fetches in flight
+            max_rate: Maximum fetches started per second
+            jitter: Fraction by which each interval is randomised
+        """
+        self.concurrency = concurrency
+        self.max_rate = max_rate
+        self.jitter = jitter
+        self.polls = 0
+        self.failures = 0
+        self.finished = 0  # runs dropped after reaching their destination
+        self._runs: dict[tuple[str, date], WatchedRun] = {}
+        self._tracked: set[str] = set()
+        self._due: list[tuple[float, tuple[str, date]]] = []
+        self._wakeup = asyncio.Event()
+        self._resolve_now = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._next_start = 0.0
+        self._inflight: set[asyncio.Task] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def __contains__(self, key: tuple[str, int]) -> bool:
+        """Whether the run (train_number, start_day) is being polled."""
+        return run_key(*key) in self._runs
+
+    def runs(self) -> list[WatchedRun]:
+        return list(self._runs.values())
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def watch(self, train_number: str, start_day: int = 0) -> None:
+        """Poll a train run until it reaches its destination. Call from the event loop."""
+        self._add(*run_key(train_number, start_day)).held = True
+
+    def unwatch(self, train_number: str, start_day: int = 0) -> None:
+        """Stop polling a train run. Its heap entry is discarded when it comes due."""
+        self._runs.pop(run_key(train_number, start_day), None)
+
+    def track(self, train_number: str) -> None:
+        """Keep polling whichever run of a train is currently active, day after day."""
+        self._tracked.add(train_number.strip())
+        self._resolve_now.set()
+
+    def subscribe(
+        self,
+        train_number: str,
+        start_day: int,
+        latest: NewTrainStatusResponse | None = None,
+    ) -> tuple[tuple[str, date], asyncio.Queue[StatusUpdate]]:
+        """
+        Receive a train run's snapshots: the latest one (if any) right away, then one per change.
+
+        The run is polled for at least as long as it has subscribers.
+
+        Args:
+            train_number: The train number
+            start_day: Days ago the run left its source
+            latest: A response for the run the caller already has; it seeds a run with no
+                snapshot yet, whose next poll then waits for the response's refresh interval
+
+        Returns:
+            The run's key and the queue; pass both to unsubscribe (the key pins the run's
+            date, which start_day would no longer give after midnight)
+        """
+        queue: asyncio.Queue[StatusUpdate] = asyncio.Queue()
+        run = self._add(*run_key(train_number, start_day))
+        run.subscribers.add(queue)
+        if run.latest is None and latest is not None:
+            run.latest = latest
+            interval = poll_interval(latest)
+            if interval is not None:
+                run.interval = interval
+                self._schedule(run, interval)
+        if run.latest is not None:
+            queue.put_nowait(StatusUpdate(run.latest, [], final=bool(run.latest.at_dstn)))
+        return run.key, queue
+
+    def unsubscribe(self, key: tuple[str, date], queue: asyncio.Queue[StatusUpdate]) -> None:
+        """Stop receiving a run's snapshots; a run watched only for subscribers stops being polled."""
+        run = self._runs.get(key)
+        if run is None:
+            return
+        run.subscribers.discard(queue)
+        if not run.subscribers and not run.held:
+            del self._runs[key]
+
+    def start(self) -> None:
+        """Start the scheduler and the resolver on the running loop (no-op if running)."""
+        if self.running:
+            return
+        # Fresh primitives: the fleet may outlive the loop it last ran on
+        self._wakeup = asyncio.Event()
+        self._resolve_now = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._due:
+            self._wakeup.set()
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._resolve())]
+
+    async def stop(self) -> None:
+        """Stop the scheduler and the resolver and cancel the fetches in flight."""
+        tasks = [*self._tasks, *self._inflight]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        self._inflight.clear()
+
+    def _add(self, train_number: str, start_date: date) -> WatchedRun:
+        run = self._runs.get((train_number, start_date))
+        if run is None:
+            run = self._runs[(train_number, start_date)] = WatchedRun(train_number, start_date)
+            # Polled right away; the rate limit spreads a batch of new runs out
+            self._schedule(run, 0.0)
+        return run
+
+    def _schedule(self, run: WatchedRun, delay: float) -> None:
+        run.due = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self._due, (run.due, run.key))
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            if not self._due:
+                await self._wakeup.wait()
+                continue
+            due, key = self._due[0]
+            if due > loop.time():
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), due - loop.time())
+                continue
+            heapq.heappop(self._due)
+            run = self._runs.get(key)
+            if run is None or run.due != due:
+                continue  # unwatched, or rescheduled since this entry was pushed
+
+            # Take a slot first, so time spent waiting for one does not count towards the spacing
+            await self._semaphore.acquire()
+            # Rate limit: space fetch starts at least 1/max_rate apart
+            if self.max_rate > 0:
+                wait = self._next_start - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start = loop.time() + 1 / self.max_rate
+            task = asyncio.create_task(self._poll(run))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _poll(self, run: WatchedRun) -> None:
+        try:
+            response = await fetch_new_train_status(run.train_number, run.start_day, use_cache=False)
+        except Exception as e:
+            print(f"Error polling train {run.train_number}: {e}", file=sys.stderr)
+            response = None
+        finally:
+            self._semaphore.release()
+        if self._runs.get(run.key) is not run:
+            return
+
+        run.polls += 1
+        self.polls += 1
+        if response is None:
+            run.failures += 1
+            self.failures += 1
+            # A run with subscribers keeps retrying at the longest backoff instead
+            if run.failures >= FLEET_MAX_FAILURES and not run.subscribers:
+                print(
+                    f"Stopped polling train {run.train_number} (started {run.start_date}) after {run.failures} failures",
+                    file=sys.stderr,
+                )
+                self._drop(run)
+                return
+            run.interval = min(FLEET_RETRY_INTERVAL * 2 ** (run.failures - 1), FLEET_MAX_BACKOFF)
+        else:
+            run.failures = 0
+            previous, run.latest = run.latest, response
+            final = bool(response.at_dstn)
+            if previous is None:
+                run.publish(StatusUpdate(response, [], final=final))
+            else:
+                changes = status_changes(previous, response)
+                if changes or final:
+                    run.publish(StatusUpdate(response, changes, final=final))
+            interval = poll_interval(response)
+            if interval is None:
+                self.finished += 1
+                self._drop(run)
+                return
+            run.interval = interval
+            # Keep the response cached until the next poll has had time to replace it
+            ttl = max(train_status_ttl(response), interval * (1 + self.jitter) + FLEET_RETRY_INTERVAL)
+            TRAIN_STATUS_CACHE.put((run.train_number, run.start_day), response, ttl=ttl)
+        self._schedule(run, run.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def _drop(self, run: WatchedRun) -> None:
+        del self._runs[run.key]
+        if run.train_number in self._tracked:
+            self._resolve_now.set()
+
+    async def _resolve(self) -> None:
+        """Watch the active run of every tracked train that has none being polled."""
+        while True:
+            self._resolve_now.clear()
+            polled = {run.train_number for run in self._runs.values()}
+            for train_number in sorted(self._tracked - polled):
+                await self._resolve_train(train_number)
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._resolve_now.wait(), FLEET_RESOLVE_INTERVAL)
+
+    async def _resolve_train(self, train_number: str) -> None:
+        try:
+            response = await fetch_train_run_status(train_number, semaphore=self._semaphore)
+        except Exception as e:
+            print(f"Error finding the current run of train {train_number}: {e}", file=sys.stderr)
+            return
+        start_date = get_train_start_date(response) if response is not None else None
+        if start_date is None or response.at_dstn or (train_number, start_date) in self._runs:
+            return  # nothing on its way yet; try again on the next pass
+        run = self._runs[(train_number, start_date)] = WatchedRun(train_number, start_date, held=True, latest=response)
+        run.interval = poll_interval(response) or FLEET_RETRY_INTERVAL
+        self._schedule(run, run.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+def parse_fleet_trains(spec: str) -> list[str]:
+    """
+    Parse FLEET_TRAINS ("12301,12951") into train numbers.
+
+    A ":start_day" suffix from older configurations is ignored; the current run is detected.
+    """
+    numbers = []
+    for item in spec.split(","):
+        number = item.strip().partition(":")[0].strip()
+        if number:
+            numbers.append(number)
+    return numbers
+
+
+_fleet: PollerFleet | None = None
+
+
+def poller_fleet() -> PollerFleet:
+    """The process-wide poller fleet, created on first use."""
+    global _fleet
+    if _fleet is None:
+        _fleet = PollerFleet()
+    return _fleet
@@ -0,0 +1,20 @@
+from typing import Sequence
+
+
+def format_table(rows: Sequence[Sequence[str]]) -> str:
+    """
+    Render rows as a plain-text table with a rule under the header row.
+
+    Columns are padded to their widest cell and separated by " | "; trailing
+    padding is stripped from every line.
+
+    Args:
+        rows: The header row followed by the data rows, all of the same length
+
+    Returns:
+        The table, one line per row plus the rule
+    """
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = [" | ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+    lines.insert(1, "-+-".join("-" * width for width in widths))
+    return "\n".join(lines)
@@ -0,0 +1,170 @@
+import os
+import importlib.util
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import AsyncIterator
+from dotenv import load_dotenv
+import httpx
+from lib.rate_limit import ThrottledTransport, UpstreamLimiter
+from lib.resilience import CircuitBreaker, ResilientTransport
+
+load_dotenv()
+
+
+class Upstream(str, Enum):
+    """The upstream APIs this server talks to. Each one gets its own pooled client."""
+    TRAIN_STATUS = "train_status"  # NEW_TRAIN_STATUS_API_BASE
+    SEARCH = "search"              # TRAIN_STATUS_API_BASE
+    PNR = "pnr"                    # NEW_PNR_API_PATH
+
+
+# Connection pool limits (per upstream)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+
+# HTTP/2 is only negotiated when the optional `h2` package is installed (httpx[http2])
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+# Per-upstream read timeouts in seconds
+UPSTREAM_TIMEOUTS: dict[Upstream, float] = {
+    Upstream.TRAIN_STATUS: float(os.getenv("TRAIN_STATUS_TIMEOUT", "30")),
+    Upstream.SEARCH: float(os.getenv("SEARCH_TIMEOUT", "10")),
+    Upstream.PNR: float(os.getenv("PNR_TIMEOUT", "30")),
+}
+
+# Per-upstream request budget: requests started per second (0 = unlimited), burst size,
+# requests in flight, and seconds a request may queue for a slot before it fails
+UPSTREAM_LIMITS: dict[Upstream, dict] = {
+    Upstream.TRAIN_STATUS: {
+        "rate": float(os.getenv("TRAIN_STATUS_RATE", "10")),
+        "burst": int(os.getenv("TRAIN_STATUS_BURST", "20")),
+        "concurrency": int(os.getenv("TRAIN_STATUS_CONCURRENCY", "16")),
+        "max_wait": float(os.getenv("TRAIN_STATUS_MAX_QUEUE_WAIT", "10")),
+    },
+    Upstream.SEARCH: {
+        "rate": float(os.getenv("SEARCH_RATE", "5")),
+        "burst": int(os.getenv("SEARCH_BURST", "10")),
+        "concurrency": int(os.getenv("SEARCH_CONCURRENCY", "8")),
+        "max_wait": float(os.getenv("SEARCH_MAX_QUEUE_WAIT", "5")),
+    },
+    Upstream.PNR: {
+        "rate": float(os.getenv("PNR_RATE", "5")),
+        "burst": int(os.getenv("PNR_BURST", "20")),
+        "concurrency": int(os.getenv("PNR_CONCURRENCY", "16")),
+        "max_wait": float(os.getenv("PNR_MAX_QUEUE_WAIT", "15")),
+    },
+}
+
+_async_clients: dict[Upstream, httpx.AsyncClient] = {}
+_limiters: dict[Upstream, UpstreamLimiter] = {}
+_breakers: dict[Upstream, CircuitBreaker] = {}
+_transport: httpx.AsyncBaseTransport | None = None
+
+
+def _client_options(upstream: Upstream) -> dict:
+    """Build the client keyword arguments for an upstream."""
+    return {
+        "follow_redirects": True,
+        "timeout": httpx.Timeout(UPSTREAM_TIMEOUTS[upstream], connect=HTTP_CONNECT_TIMEOUT),
+    }
+
+
+def _new_transport() -> httpx.AsyncBaseTransport:
+    """The connection pool of one upstream client (or the transport override)."""
+    if _transport is not None:
+        return _transport
+    return httpx.AsyncHTTPTransport(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def _new_async_client(upstream: Upstream) -> httpx.AsyncClient:
+    transport = _new_transport()
+    limiter = _limiters.get(upstream)
+    if limiter is not None:
+        transport = ThrottledTransport(transport, limiter)
+    breaker = _breakers.get(upstream)
+    if breaker is not None:
+        # Outside the limiter, so every retry and hedge is rate-limited too
+        transport = ResilientTransport(transport, breaker)
+    return httpx.AsyncClient(transport=transport, **_client_options(upstream))
+
+
+def upstream_limiter(upstream: Upstream) -> UpstreamLimiter | None:
+    """The rate limiter of an upstream while the shared clients are open, else None."""
+    return _limiters.get(upstream)
+
+
+def upstream_breaker(upstream: Upstream) -> CircuitBreaker | None:
+    """The circuit breaker of an upstream while the shared clients are open, else None."""
+    return _breakers.get(upstream)
+
+
+def upstream_summaries() -> list[str]:
+    """One line per rate limiter and circuit breaker while the shared clients are open."""
+    return [limiter.summary() for limiter in _limiters.values()] + [
+        f"circuit {breaker.summary()}" for breaker in _breakers.values()
+    ]
+
+
+def circuit_open(upstream: Upstream) -> bool:
+    """Whether requests to an upstream are currently failed fast."""
+    breaker = _breakers.get(upstream)
+    return breaker is not None and breaker.is_open
+
+
+async def open_http_clients(transport: httpx.AsyncBaseTransport | None = None) -> None:
+    """
+    Open one pooled AsyncClient per upstream. Called once at server start-up.
+
+    Every request through a shared client is admitted by that upstream's
+    UpstreamLimiter (see UPSTREAM_LIMITS), so all fetchers share one budget per host,
+    and retried, hedged and failed fast by its CircuitBreaker (see lib.resilience).
+
+    Args:
+        transport: Optional transport override (e.g. httpx.MockTransport in tests)
+    """
+    global _transport
+    await close_http_clients()
+    _transport = transport
+    for upstream in Upstream:
+        _limiters[upstream] = UpstreamLimiter(upstream.value, **UPSTREAM_LIMITS[upstream])
+        _breakers[upstream] = CircuitBreaker(upstream.value)
+        _async_clients[upstream] = _new_async_client(upstream)
+
+
+async def close_http_clients() -> None:
+    """Close every pooled client. Called once at server shutdown."""
+    global _transport
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    _limiters.clear()
+    _breakers.clear()
+    for client in clients:
+        await client.aclose()
+    _transport = None
+
+
+@asynccontextmanager
+async def upstream_client(upstream: Upstream) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Get the shared client for an upstream.
+
+    Outside of the server lifespan (scripts, tests calling asyncio.run) there is no
+    shared client, so a short-lived, unthrottled one with the same settings is used instead.
+    """
+    client = _async_clients.get(upstream)
+    if client is not None:
+        yield client
+        return
+
+    async with _new_async_client(upstream) as client:
+        yield client
+
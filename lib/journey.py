@@ -0,0 +1,108 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import date
+from lib.pnr import (
+    PNR_STATUS_CACHE,
+    fetch_pnr_status_async,
+    get_train_number,
+    get_train_start_date as get_pnr_train_start_date,
+)
+from lib.train import calculate_start_day, fetch_new_train_status, known_start_day
+from lib.timing import latency_tracker
+from lib.schema.pnr import PNRResponse
+from lib.schema.train import NewTrainStatusResponse
+
+# End-to-end latency of full journey lookups, split by whether the train fetch overlapped the PNR fetch;
+# lookups answered from a cached PNR (no PNR fetch to overlap) are kept apart
+JOURNEY_OVERLAPPED_LATENCY = latency_tracker("journey.overlapped")
+JOURNEY_SEQUENTIAL_LATENCY = latency_tracker("journey.sequential")
+JOURNEY_CACHED_PNR_LATENCY = latency_tracker("journey.cached_pnr")
+
+
+@dataclass
+class JourneyStatus:
+    """A PNR together with the live status of the train run it is booked on."""
+    pnr_status: PNRResponse | None
+    train_number: str | None = None
+    train_source_date: date | None = None
+    train_status: NewTrainStatusResponse | None = None
+    overlapped: bool = False  # whether the train fetch was started before the PNR arrived
+    elapsed: float = 0.0  # end-to-end seconds
+
+    @property
+    def not_started(self) -> bool:
+        """Whether the train run is scheduled for a future date."""
+        return self.train_source_date is not None and self.train_source_date > date.today()
+
+
+async def fetch_journey_status(
+    pnr_no: str,
+    train_number: str | None = None,
+    start_day: int | None = None,
+) -> JourneyStatus:
+    """
+    Fetch a PNR and the live status of its train with as much overlap as possible.
+
+    The train fetch only needs the train number and run date, so it is started
+    alongside the PNR fetch when those are already known - from a cached PNR or
+    from the caller. The guess is checked against the PNR once it arrives and the
+    train is re-fetched if it was wrong. Otherwise the train fetch starts as soon
+    as the PNR has been parsed.
+
+    Args:
+        pnr_no: 10-digit PNR code
+        train_number: Train number, if the caller already knows it
+        start_day: Days ago the train left its source, if known (default: a run already seen locally, else 0)
+
+    Returns:
+        JourneyStatus; train_status is None if the PNR could not be fetched,
+        the run has not started yet, or live tracking is unavailable
+    """
+    started = time.perf_counter()
+
+    speculative_key: tuple[str, int] | None = None
+    cached = PNR_STATUS_CACHE.peek(pnr_no)
+    if cached is not None and get_train_number(cached):
+        speculative_key = (get_train_number(cached), calculate_start_day(get_pnr_train_start_date(cached)))
+    elif train_number:
+        if start_day is None:
+            start_day = known_start_day(train_number) or 0
+        speculative_key = (train_number.strip(), start_day)
+
+    speculative: asyncio.Task | None = None
+    if speculative_key is not None:
+        speculative = asyncio.create_task(fetch_new_train_status(*speculative_key))
+
+    try:
+        pnr_status = await fetch_pnr_status_async(pnr_no)
+    except BaseException:
+        if speculative is not None:
+            speculative.cancel()
+        raise
+
+    journey = JourneyStatus(pnr_status=pnr_status, overlapped=speculative is not None)
+    journey.train_number = get_train_number(pnr_status)
+    journey.train_source_date = get_pnr_train_start_date(pnr_status)
+
+    train_task: asyncio.Task | None = None
+    if journey.train_number is not None and not journey.not_started:
+        key = (journey.train_number, calculate_start_day(journey.train_source_date))
+        if speculative is not None and key == speculative_key:
+            train_task = speculative
+        else:
+            train_task = asyncio.create_task(fetch_new_train_status(*key))
+            journey.overlapped = False
+    if speculative is not None and speculative is not train_task:
+        speculative.cancel()
+
+    if train_task is not None:
+        journey.train_status = await train_task
+
+    journey.elapsed = time.perf_counter() - started
+    if cached is not None:
+        tracker = JOURNEY_CACHED_PNR_LATENCY
+    else:
+        tracker = JOURNEY_OVERLAPPED_LATENCY if journey.overlapped else JOURNEY_SEQUENTIAL_LATENCY
+    tracker.record(journey.elapsed)
+    return journey
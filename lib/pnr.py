@@ -1,64 +1,235 @@
-import httpx
-from lib.schema.pnr import PNRResponse
+import asyncio
+from lib.schema.pnr import PNRResponse, PassengerStatus
 import os
+import sys
 from datetime import datetime, date
 from dotenv import load_dotenv
-from urllib.parse import unquote
+import httpx
 from lib.pnr_status_decoders import decode_ticket_status, decode_berth
+from lib.http_client import Upstream, circuit_open, upstream_client
+from lib.resilience import STALE_MAX_AGE
+from lib.pnr_token import XsrfTokenManager, TOKEN_REJECTED_STATUSES
+from lib.cache import TTLCache
+from lib.decoding import decode_model
+from lib.formatting import format_table
 
 load_dotenv()
 
 PNR_API_PATH = os.getenv("NEW_PNR_API_PATH")
 PNR_API_KEY_NAME = os.getenv("NEW_PNR_API_KEY_NAME")
 
+# Process-wide XSRF token cache shared by every PNR lookup
+PNR_TOKENS = XsrfTokenManager()
+
+# PNR status cache bounds and TTLs (seconds)
+PNR_CACHE_MAX_ENTRIES = int(os.getenv("PNR_CACHE_MAX_ENTRIES", "2048"))
+PNR_CACHE_WAITLIST_TTL = float(os.getenv("PNR_CACHE_WAITLIST_TTL", "120"))
+PNR_CACHE_CONFIRMED_TTL = float(os.getenv("PNR_CACHE_CONFIRMED_TTL", "1800"))
+PNR_CACHE_FINAL_TTL = float(os.getenv("PNR_CACHE_FINAL_TTL", str(7 * 24 * 3600)))
+
+# Maximum PNR lookups in flight for a single batch request
+PNR_BATCH_CONCURRENCY = int(os.getenv("PNR_BATCH_CONCURRENCY", "8"))
+
 
 def is_confirmed_or_rac(status: str) -> bool:
     """Check if a status indicates confirmed or RAC."""
     status_upper = status.upper().strip()
     return status_upper.startswith('CNF') or status_upper.startswith('RAC')
 
-def fetch_pnr_status(pnr_no: str) -> PNRResponse | None:
+
+def is_valid_pnr(pnr_no: str) -> bool:
+    """Check that a PNR is exactly 10 digits."""
+    return len(pnr_no) == 10 and pnr_no.isdigit()
+
+def pnr_status_ttl(pnr_status: PNRResponse) -> float:
     """
-    Fetch PNR status from Live API.
+    How long a PNR status stays fresh, in seconds, based on how likely it is to change.
+    
+    - Journey over or train cancelled: the status is final
+    - Chart prepared or every passenger confirmed: changes are rare
+    - Otherwise (waitlisted, chart not prepared): changes are likely
+    """
+    data = pnr_status.data
+    if data is None:
+        return PNR_CACHE_WAITLIST_TTL
+    
+    if data.TrainCancelledFlag:
+        return PNR_CACHE_FINAL_TTL
+    try:
+        if datetime.strptime(data.DestinationDoj, "%d-%m-%Y").date() < date.today():
+            return PNR_CACHE_FINAL_TTL
+    except ValueError:
+        pass
+    
+    all_confirmed = bool(data.PassengerStatus) and all(
+        p.CurrentStatus.upper().strip().startswith('CNF') for p in data.PassengerStatus
+    )
+    if data.ChartPrepared or all_confirmed:
+        return PNR_CACHE_CONFIRMED_TTL
+    
+    return PNR_CACHE_WAITLIST_TTL
+
+
+# PNR responses keyed on PNR number
+PNR_STATUS_CACHE: TTLCache[str, PNRResponse] = TTLCache("pnr_status", PNR_CACHE_MAX_ENTRIES, pnr_status_ttl)
+
+
+async def fetch_pnr_status_async(pnr_no: str, use_cache: bool = True) -> PNRResponse | None:
+    """
+    Fetch PNR status from Live API without blocking the event loop.
+    
+    Responses are cached for as long as the PNR is unlikely to change
+    (see pnr_status_ttl), and concurrent lookups of the same PNR share one request.
+    While the upstream's circuit is open, a failed lookup falls back to the last
+    cached response even if it has expired (up to STALE_MAX_AGE past expiry).
     
     Args:
         pnr_no: The PNR number to check (must be 10 digits)
+        use_cache: Whether a cached response may be returned (default: True)
         
     Returns:
         PNRResponse object containing the PNR status data, or None if PNR is invalid
     """
     # Validate PNR length - must be exactly 10 digits
-    if len(pnr_no) != 10 or not pnr_no.isdigit():
+    if not is_valid_pnr(pnr_no):
         return None
     
+    if not use_cache:
+        response = await _request_pnr_status(pnr_no)
+        if response is not None:
+            PNR_STATUS_CACHE.put(pnr_no, response)
+        return response
+    try:
+        return await PNR_STATUS_CACHE.get_or_load(pnr_no, lambda: _request_pnr_status(pnr_no))
+    except httpx.HTTPError:
+        stale = PNR_STATUS_CACHE.peek_stale(pnr_no, STALE_MAX_AGE) if circuit_open(Upstream.PNR) else None
+        if stale is None:
+            raise
+        print(f"Serving stale PNR status for {pnr_no}: upstream circuit open", file=sys.stderr)
+        return stale
+
+
+async def _request_pnr_status(pnr_no: str) -> PNRResponse | None:
+    """Fetch PNR status from upstream, bypassing the cache."""
     assert PNR_API_PATH is not None
     assert PNR_API_KEY_NAME is not None
     url = PNR_API_PATH
     
-    with httpx.Client() as client:
-        initial_response = client.get(url)
-        api_key = client.cookies.get(PNR_API_KEY_NAME)
-
-        if not api_key:
-            raise ValueError("Failed to retrieve XSRF-TOKEN from cookies", initial_response)
-        
-        decoded_token = unquote(api_key)
-        headers = {
-            f'X-{PNR_API_KEY_NAME}': decoded_token,
-        }
-        
+    async with upstream_client(Upstream.PNR) as client:
+        # Reuse the cached XSRF token; only the first lookup (or an expired token) pays for the GET
+        token = await PNR_TOKENS.get(client, url, PNR_API_KEY_NAME)
         body = {"pnr": pnr_no}
         
-        response = client.post(url, json=body, headers=headers)
+        response = await client.post(url, json=body, headers=token.headers(PNR_API_KEY_NAME))
+        if response.status_code in TOKEN_REJECTED_STATUSES:
+            # Token was revoked upstream - refresh once and retry
+            token = await PNR_TOKENS.refresh(client, url, PNR_API_KEY_NAME, stale=token)
+            response = await client.post(url, json=body, headers=token.headers(PNR_API_KEY_NAME))
         response.raise_for_status()
+        PNR_TOKENS.update_from(response, PNR_API_KEY_NAME)
+        
+        # None if the API returned an error (PNR not found)
+        return decode_model(response.content, PNRResponse, failure_flag="status")
+
+
+def fetch_pnr_status(pnr_no: str) -> PNRResponse | None:
+    """
+    Fetch PNR status from Live API (blocking).
+    
+    Thin wrapper around fetch_pnr_status_async for synchronous callers.
+    Must not be called from inside a running event loop.
+    
+    Args:
+        pnr_no: The PNR number to check (must be 10 digits)
         
-        data = response.json()
+    Returns:
+        PNRResponse object containing the PNR status data, or None if PNR is invalid
+    """
+    # Validate before spinning up an event loop
+    if not is_valid_pnr(pnr_no):
+        return None
+    
+    return asyncio.run(fetch_pnr_status_async(pnr_no))
+
+
+async def fetch_pnr_status_batch(
+    pnr_nos: list[str],
+    concurrency: int = PNR_BATCH_CONCURRENCY,
+) -> dict[str, PNRResponse | None]:
+    """
+    Fetch the status of many PNRs concurrently (e.g., a group booking).
+    
+    Duplicate PNRs are looked up once, malformed PNRs are rejected up front without
+    an API call, and the whole batch shares one XSRF token.
+    
+    Args:
+        pnr_nos: PNR numbers to check
+        concurrency: Maximum number of concurrent upstream lookups
+    
+    Returns:
+        Each distinct PNR (in first-seen order) mapped to its PNRResponse, or None if the
+        PNR is malformed, not found or could not be fetched
+    """
+    unique = list(dict.fromkeys(p.strip() for p in pnr_nos))
+    results: dict[str, PNRResponse | None] = dict.fromkeys(unique)
+    to_fetch = [p for p in unique if is_valid_pnr(p)]
+    if not to_fetch:
+        return results
+    
+    harvest = None
+    if any(PNR_STATUS_CACHE.peek(p) is None for p in to_fetch):
+        # Harvest the token once before fanning out so every lookup reuses it
+        harvest = asyncio.create_task(_harvest_pnr_token())
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def fetch_one(pnr_no: str) -> None:
+        async with semaphore:
+            try:
+                if harvest is not None and PNR_STATUS_CACHE.peek(pnr_no) is None:
+                    # A failed harvest fails only the lookups that needed it, each reported on its own
+                    await harvest
+                results[pnr_no] = await fetch_pnr_status_async(pnr_no)
+            except Exception as e:
+                print(f"Error fetching PNR status for {pnr_no}: {e}", file=sys.stderr)
+    
+    await asyncio.gather(*(fetch_one(p) for p in to_fetch))
+    return results
+
+
+async def _harvest_pnr_token() -> None:
+    assert PNR_API_PATH is not None
+    assert PNR_API_KEY_NAME is not None
+    async with upstream_client(Upstream.PNR) as client:
+        await PNR_TOKENS.get(client, PNR_API_PATH, PNR_API_KEY_NAME)
+
+
+def get_pnr_batch_table(results: dict[str, PNRResponse | None]) -> str:
+    """
+    Format the results of fetch_pnr_status_batch as a compact table with one row per passenger.
+    
+    Args:
+        results: PNR to PNRResponse mapping from fetch_pnr_status_batch
         
-        # Check if API returned an error (PNR not found)
-        if data.get("status") is False:
-            return None
+    Returns:
+        A table of PNR, train, passenger, current status and waitlist position
+    """
+    rows = [("PNR", "Train", "Pax", "Current Status", "Waitlist Position")]
+    for pnr_no, pnr_status in results.items():
+        if not is_valid_pnr(pnr_no):
+            rows.append((pnr_no, "-", "-", "Invalid PNR (must be 10 digits)", "-"))
+            continue
+        if pnr_status is None or pnr_status.data is None:
+            rows.append((pnr_no, "-", "-", "Error fetching PNR status", "-"))
+            continue
         
-        return PNRResponse(**data)
+        passengers = pnr_status.data.PassengerStatus
+        if not passengers:
+            rows.append((pnr_no, pnr_status.data.TrainNo, "-", "No passenger information available.", "-"))
+        for p in passengers:
+            rows.append((pnr_no, pnr_status.data.TrainNo, f"P{p.Number}", p.CurrentStatusNew, _waitlist_position(p)))
+    
+    return format_table(rows)
 
 
 def get_train_start_date(pnr_status: PNRResponse | None) -> date | None:
@@ -172,24 +343,24 @@ def get_waitlist_position(pnr_status: PNRResponse | None) -> str:
     
     response = ""
     for p in passengers:
-        if is_confirmed_or_rac(p.CurrentStatus):
-            position = "Already Confirmed/RAC"
-        else:
-            # Parse booking status to get waitlist position
-            # BookingStatusNew contains the formatted status like "WL/12" or "GNWL/5"
-            booking_parts = p.BookingStatusNew.split('/') if p.BookingStatusNew else []
-            if len(booking_parts) >= 2:
-                status_type = booking_parts[0]
-                position_num = booking_parts[1]
-                position = f"Position {position_num} in {decode_ticket_status(status_type)} ({status_type})"
-            else:
-                position = p.BookingStatusNew or "Unknown"
-        
-        response += f"Passenger-{p.Number}: {position}\n"
+        response += f"Passenger-{p.Number}: {_waitlist_position(p)}\n"
     
     return response if response else "Unable to get waitlist position."
 
 
+def _waitlist_position(p: PassengerStatus) -> str:
+    if is_confirmed_or_rac(p.CurrentStatus):
+        return "Already Confirmed/RAC"
+    # Parse booking status to get waitlist position
+    # BookingStatusNew contains the formatted status like "WL/12" or "GNWL/5"
+    booking_parts = p.BookingStatusNew.split('/') if p.BookingStatusNew else []
+    if len(booking_parts) >= 2:
+        status_type = booking_parts[0]
+        position_num = booking_parts[1]
+        return f"Position {position_num} in {decode_ticket_status(status_type)} ({status_type})"
+    return p.BookingStatusNew or "Unknown"
+
+
 def get_journey_overview(pnr_status: PNRResponse | None) -> str:
     """
     Get basic info about the journey - source/destination stations, ticket fare, date/time of journey.
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from urllib.parse import unquote
+from dotenv import load_dotenv
+import httpx
+
+load_dotenv()
+
+# How long a harvested XSRF token is reused before it is refreshed (seconds)
+PNR_TOKEN_TTL = float(os.getenv("PNR_TOKEN_TTL", "600"))
+
+# Status codes the PNR API uses to reject a stale or missing XSRF token
+TOKEN_REJECTED_STATUSES = frozenset({401, 403, 419})
+
+
+@dataclass(frozen=True)
+class XsrfToken:
+    """A harvested XSRF token together with the cookies it was issued with."""
+    value: str  # URL-decoded token, sent back as the X-<key name> header
+    cookies: tuple[tuple[str, str], ...]
+    expires_at: float  # time.monotonic() deadline
+
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def headers(self, key_name: str) -> dict[str, str]:
+        """Headers that authenticate a POST with this token."""
+        return {
+            f"X-{key_name}": self.value,
+            "Cookie": "; ".join(f"{name}={value}" for name, value in self.cookies),
+        }
+
+
+class XsrfTokenManager:
+    """
+    Caches the PNR API's XSRF token and cookie jar across lookups.
+
+    The token is refreshed lazily, either when it expires or when the API rejects it.
+    Concurrent callers that need a refresh share a single in-flight GET.
+    """
+
+    def __init__(self, ttl: float = PNR_TOKEN_TTL):
+        self.ttl = ttl
+        self.refreshes = 0
+        self._token: XsrfToken | None = None
+        self._refresh_task: asyncio.Future[XsrfToken] | None = None
+
+    def clear(self) -> None:
+        """Forget the cached token."""
+        self._token = None
+        self._refresh_task = None
+
+    async def get(self, client: httpx.AsyncClient, url: str, key_name: str) -> XsrfToken:
+        """Return the cached token, harvesting a new one if there is none or it has expired."""
+        token = self._token
+        if token is not None and not token.is_expired():
+            return token
+        return await self.refresh(client, url, key_name, stale=token)
+
+    async def refresh(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        key_name: str,
+        stale: XsrfToken | None = None,
+    ) -> XsrfToken:
+        """
+        Replace a stale token.
+
+        If another caller has already replaced `stale`, its token is returned without
+        another round trip; if a refresh is in flight, it is awaited instead of starting
+        a second one.
+        """
+        current = self._token
+        if current is not None and current is not stale and not current.is_expired():
+            return current
+
+        task = self._refresh_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._harvest(client, url, key_name))
+            self._refresh_task = task
+        # Shield so one cancelled caller does not cancel the refresh for everybody else
+        return await asyncio.shield(task)
+
+    def update_from(self, response: httpx.Response, key_name: str) -> None:
+        """Pick up a rotated token if the API set a new one on a regular response."""
+        if response.cookies.get(key_name):
+            self._token = self._token_from(response, key_name, previous=self._token)
+
+    async def _harvest(self, client: httpx.AsyncClient, url: str, key_name: str) -> XsrfToken:
+        response = await client.get(url)
+        if not response.cookies.get(key_name):
+            raise ValueError("Failed to retrieve XSRF-TOKEN from cookies", response)
+        token = self._token_from(response, key_name)
+        self._token = token
+        self.refreshes += 1
+        return token
+
+    def _token_from(
+        self,
+        response: httpx.Response,
+        key_name: str,
+        previous: XsrfToken | None = None,
+    ) -> XsrfToken:
+        expires_at = time.monotonic() + self.ttl
+        # Cookies the response did not touch (e.g. the session) carry over
+        cookies = dict(previous.cookies) if previous else {}
+        for cookie in response.cookies.jar:
+            cookies[cookie.name] = cookie.value
+            # Never reuse a token past the expiry the server gave its cookie
+            if cookie.name == key_name and cookie.expires is not None:
+                expires_at = min(expires_at, time.monotonic() + cookie.expires - time.time())
+        return XsrfToken(
+            value=unquote(response.cookies[key_name]),
+            cookies=tuple(cookies.items()),
+            expires_at=expires_at,
+        )
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+import httpx
+from lib.timing import LatencyTracker, latency_tracker
+
+
+class UpstreamQueueTimeout(httpx.PoolTimeout):
+    """A request waited longer than its deadline for a rate limit or concurrency slot."""
+
+
+class UpstreamLimiter:
+    """
+    Token-bucket rate limit plus a concurrency cap for one upstream host.
+
+    Requests queue in arrival order for a concurrency slot and then for a token.
+    A request that cannot start before its deadline gives up instead of adding
+    to a backlog. Time spent queueing is recorded in a LatencyTracker.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, concurrency: int, max_wait: float):
+        """
+        Args:
+            name: Upstream name, used for the queue-wait tracker ("upstream.<name>.queue_wait")
+            rate: Requests started per second on average (0 disables the rate limit)
+            burst: Requests that may start at once after an idle period (bucket size)
+            concurrency: Maximum requests in flight
+            max_wait: Default seconds a request may queue before it is rejected
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self.queue_wait: LatencyTracker = latency_tracker(f"upstream.{name}.queue_wait")
+        self.admitted = 0
+        self.rejected = 0
+        self.queued = 0  # requests waiting right now
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._bucket_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(concurrency)
+
+    @property
+    def in_flight(self) -> int:
+        return self.concurrency - self._slots._value
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    async def _take_token(self, deadline: float) -> None:
+        await asyncio.wait_for(self._bucket_lock.acquire(), max(deadline - time.monotonic(), 0))
+        try:
+            self._refill()
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+                if time.monotonic() + wait > deadline:
+                    raise TimeoutError
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= 1
+        finally:
+            self._bucket_lock.release()
+
+    @asynccontextmanager
+    async def slot(self, max_wait: float | None = None) -> AsyncIterator[None]:
+        """
+        Hold a concurrency slot (and spend a token) for the duration of a request.
+
+        Args:
+            max_wait: Seconds the caller may queue (default: the limiter's max_wait)
+
+        Raises:
+            TimeoutError: If the request could not start within max_wait
+        """
+        started = time.monotonic()
+        deadline = started + (self.max_wait if max_wait is None else max_wait)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), max(deadline - started, 0))
+            try:
+                if self.rate > 0:
+                    await self._take_token(deadline)
+            except BaseException:
+                self._slots.release()
+                raise
+        except TimeoutError:
+            self.rejected += 1
+            raise
+        finally:
+            self.queued -= 1
+            self.queue_wait.record(time.monotonic() - started)
+
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def summary(self) -> str:
+        """One line: admitted/rejected counts, current load and queue-wait percentiles."""
+        return (
+            f"{self.name}: admitted={self.admitted} rejected={self.rejected} "
+            f"in_flight={self.in_flight} queued={self.queued} | {self.queue_wait.summary()}"
+        )
+
+
+class ThrottledTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that admits every request through an UpstreamLimiter before sending it.
+
+    A request may set its own queue deadline with extensions={"queue_timeout": seconds}.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: UpstreamLimiter):
+        self.transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            async with self.limiter.slot(request.extensions.get("queue_timeout")):
+                return await self.transport.handle_async_request(request)
+        except TimeoutError:
+            raise UpstreamQueueTimeout(
+                f"Timed out queueing for the {self.limiter.name} upstream", request=request
+            ) from None
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,214 @@
+import asyncio
+import os
+import random
+import sys
+import time
+from contextlib import suppress
+from dotenv import load_dotenv
+import httpx
+from lib.rate_limit import UpstreamQueueTimeout
+from lib.timing import LatencyTracker, latency_tracker
+
+load_dotenv()
+
+# Retries of idempotent requests after a transport error or a retryable status, and their backoff:
+# a random delay up to HTTP_RETRY_BACKOFF * 2^attempt seconds, capped at HTTP_RETRY_MAX_BACKOFF
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.2"))
+HTTP_RETRY_MAX_BACKOFF = float(os.getenv("HTTP_RETRY_MAX_BACKOFF", "2"))
+# Hedged requests: a second copy of an idempotent request is sent once the first has taken longer
+# than this percentile of the upstream's recent latencies (needs HTTP_HEDGE_MIN_SAMPLES samples)
+HTTP_HEDGE_ENABLED = os.getenv("HTTP_HEDGE_ENABLED", "0") != "0"
+HTTP_HEDGE_PERCENTILE = float(os.getenv("HTTP_HEDGE_PERCENTILE", "95"))
+HTTP_HEDGE_MIN_SAMPLES = int(os.getenv("HTTP_HEDGE_MIN_SAMPLES", "20"))
+# Consecutive failures that open an upstream's circuit, and seconds it stays open before a trial request
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+# Seconds past expiry a cached response may still be served while its upstream's circuit is open
+STALE_MAX_AGE = float(os.getenv("STALE_MAX_AGE", "900"))
+
+# Only these are retried or hedged; the PNR lookup itself is a POST
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+# Response statuses worth another attempt; all but 429 also count as upstream failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """The upstream's circuit is open, so the request was failed without being sent."""
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker.
+
+    Closed: requests flow and consecutive failures are counted. After `failure_threshold`
+    failures the circuit opens and requests fail fast for `reset_timeout` seconds. Then it
+    is half-open: a single trial request is let through, which closes the circuit on
+    success and reopens it on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0  # consecutive
+        self.opened = 0  # times the circuit opened
+        self.rejected = 0  # requests failed fast
+        self._state = self.CLOSED
+        self._changed_at = 0.0  # monotonic time the circuit opened or the trial started
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._changed_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """Whether requests are currently being failed fast."""
+        return self.state != self.CLOSED
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; the first call after the reset timeout becomes the trial."""
+        if self._state == self.CLOSED:
+            return True
+        if time.monotonic() - self._changed_at < self.reset_timeout:
+            self.rejected += 1
+            return False
+        # Let one trial through; a trial that never reported back is replaced after another timeout
+        self._state = self.HALF_OPEN
+        self._changed_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.opened += 1
+                print(f"Circuit for the {self.name} upstream opened after {self.failures} failures", file=sys.stderr)
+            self._state = self.OPEN
+            self._changed_at = time.monotonic()
+
+    def summary(self) -> str:
+        return f"{self.name}: {self.state} failures={self.failures} opened={self.opened} rejected={self.rejected}"
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff before retry number `attempt` (0-based), with full jitter."""
+    return random.uniform(0, min(HTTP_RETRY_BACKOFF * 2 ** attempt, HTTP_RETRY_MAX_BACKOFF))
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """
+    Transport adding retries, hedging and a circuit breaker in front of an upstream's transport.
+
+    Idempotent requests are retried with exponential backoff after transport errors and
+    RETRY_STATUSES responses, and (when hedging is enabled) raced against a second copy
+    once they outlast the upstream's recent p95 latency. Every attempt first asks the
+    circuit breaker; while it is open requests fail with CircuitOpenError. Requests that
+    time out queueing for the rate limiter are neither retried nor counted as failures.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        breaker: CircuitBreaker,
+        retries: int = HTTP_RETRIES,
+        hedge: bool = HTTP_HEDGE_ENABLED,
+    ):
+        self.transport = transport
+        self.breaker = breaker
+        self.retries = retries
+        self.hedge = hedge
+        self.latency: LatencyTracker = latency_tracker(f"upstream.{breaker.name}.latency")
+        self.retried = 0
+        self.hedged = 0
+
+    def hedge_delay(self) -> float | None:
+        """Seconds after which a slow request is hedged, None while hedging is off or unprimed."""
+        if not self.hedge or self.latency.count < HTTP_HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency.percentile(HTTP_HEDGE_PERCENTILE)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        idempotent = request.method in IDEMPOTENT_METHODS
+        retries = self.retries if idempotent else 0
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit for the {self.breaker.name} upstream is open", request=request)
+            try:
+                response = await (self._hedged(request) if idempotent else self._send(request))
+            except UpstreamQueueTimeout:
+                raise
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                if attempt >= retries or self.breaker.is_open:
+                    raise
+            else:
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if response.status_code not in RETRY_STATUSES or attempt >= retries or self.breaker.is_open:
+                    return response
+                await response.aclose()
+
+            await asyncio.sleep(retry_delay(attempt))
+            attempt += 1
+            self.retried += 1
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        if response.status_code < 500:
+            self.latency.record(time.perf_counter() - started)
+        return response
+
+    async def _hedged(self, request: httpx.Request) -> httpx.Response:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._send(request)
+
+        first = asyncio.create_task(self._send(request))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        self.hedged += 1
+        pending = {first, asyncio.create_task(self._send(request))}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                responses = [task.result() for task in done if task.exception() is None]
+                if responses:
+                    for extra in responses[1:]:
+                        await extra.aclose()
+                    return responses[0]
+                error = error or next(iter(done)).exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                # A loser may have finished while being cancelled; release its connection
+                with suppress(BaseException):
+                    await (await task).aclose()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
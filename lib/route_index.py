@@ -0,0 +1,201 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterable, NamedTuple
+from lib.formatting import format_table
+from lib.schema.train import TrainSearchResult
+from lib.timetable import TimetableStop, TrainTimetable, clock_minutes
+
+
+class Posting(NamedTuple):
+    """One train calling at a station."""
+    train_number: str
+    seq: int  # position along the train's route
+    stop: TimetableStop | None  # None when only the train's origin/destination is known
+
+
+@dataclass
+class DirectTrain:
+    """A train that calls at both stations of a query, in that order."""
+    train_number: str
+    train_name: str
+    departure: TimetableStop | None  # at the from-station
+    arrival: TimetableStop | None  # at the to-station
+    run_days: str = ""
+
+    @property
+    def duration(self) -> int | None:
+        """Scheduled minutes from departure to arrival, if the timetable is known."""
+        if self.departure is None or self.arrival is None:
+            return None
+        start = clock_minutes(self.departure.std or self.departure.sta)
+        end = clock_minutes(self.arrival.sta or self.arrival.std)
+        if start is None or end is None:
+            return None
+        days = self.arrival.day - self.departure.departure_day
+        return end - start + days * 24 * 60
+
+
+class RouteIndex:
+    """
+    Inverted index from station code to the trains that halt there.
+
+    Direct trains between two stations are the intersection of the two stations'
+    posting lists, keeping trains that reach the first station before the second.
+    Trains with a stored timetable contribute every halt; trains only known from
+    the offline train list contribute their origin and destination.
+    """
+
+    def __init__(self, timetables: Iterable[TrainTimetable] = (), trains: Iterable[TrainSearchResult] = ()):
+        """
+        Args:
+            timetables: Full timetables (e.g. from the timetable store)
+            trains: Trains known only by origin and destination (e.g. from the offline train index)
+        """
+        self._postings: dict[str, dict[str, Posting]] = {}
+        self._timetables: dict[str, TrainTimetable] = {}
+        self._endpoints: dict[str, TrainSearchResult] = {}
+        for timetable in timetables:
+            self.add_timetable(timetable)
+        for train in trains:
+            self.add_endpoints(train)
+
+    def __len__(self) -> int:
+        return len(self._timetables) + len(self._endpoints)
+
+    def add_timetable(self, timetable: TrainTimetable) -> None:
+        """Index every halt of a timetable, replacing whatever was indexed for the train."""
+        self._remove(timetable.train_number)
+        self._timetables[timetable.train_number] = timetable
+        for stop in timetable.halts:
+            # A train calling twice at a station keeps its first call
+            self._postings.setdefault(stop.station_code, {}).setdefault(
+                timetable.train_number, Posting(timetable.train_number, stop.seq, stop)
+            )
+
+    def add_endpoints(self, train: TrainSearchResult) -> None:
+        """Index a train's origin and destination, unless its full timetable is already indexed."""
+        if train.number in self._timetables or not train.from_stn_code or not train.to_stn_code:
+            return
+        self._remove(train.number)
+        self._endpoints[train.number] = train
+        self._postings.setdefault(train.from_stn_code.upper(), {})[train.number] = Posting(train.number, 0, None)
+        self._postings.setdefault(train.to_stn_code.upper(), {})[train.number] = Posting(train.number, 1, None)
+
+    def between(
+        self,
+        from_station_code: str,
+        to_station_code: str,
+        on: date | None = None,
+        unknown_days: bool = False,
+    ) -> list[DirectTrain]:
+        """
+        Find direct trains from one station to another.
+
+        Args:
+            from_station_code: Boarding station code
+            to_station_code: Destination station code
+            on: Only trains that leave the boarding station on this date (by their running days)
+            unknown_days: With `on`, still include trains without a known timetable, whose
+                running days cannot be checked (they are left out by default)
+
+        Returns:
+            Trains ordered by scheduled departure; trains without a known timetable come last
+        """
+        origin = self._postings.get(from_station_code.strip().upper(), {})
+        destination = self._postings.get(to_station_code.strip().upper(), {})
+        if len(origin) > len(destination):
+            common = [number for number in destination if number in origin]
+        else:
+            common = [number for number in origin if number in destination]
+
+        results = []
+        for number in common:
+            departure, arrival = origin[number], destination[number]
+            if departure.seq >= arrival.seq:
+                continue
+            timetable = self._timetables.get(number)
+            if timetable is not None:
+                if on is not None and not timetable.runs_on(on - timedelta(days=departure.stop.departure_day)):
+                    continue
+                results.append(DirectTrain(number, timetable.train_name, departure.stop, arrival.stop, timetable.run_days))
+            elif on is None or unknown_days:
+                results.append(DirectTrain(number, self._endpoints[number].name, None, None))
+
+        def departure_key(train: DirectTrain) -> tuple[int, int, str]:
+            if train.departure is None:
+                return (1, 0, train.train_number)
+            return (0, clock_minutes(train.departure.std or train.departure.sta) or 0, train.train_number)
+
+        return sorted(results, key=departure_key)
+
+    def _remove(self, train_number: str) -> None:
+        previous = self._timetables.pop(train_number, None)
+        endpoints = self._endpoints.pop(train_number, None)
+        codes = []
+        if previous is not None:
+            codes = [stop.station_code for stop in previous.halts]
+        elif endpoints is not None:
+            codes = [endpoints.from_stn_code.upper(), endpoints.to_stn_code.upper()]
+        for code in codes:
+            postings = self._postings.get(code)
+            if postings is not None:
+                postings.pop(train_number, None)
+
+
+def get_trains_between_table(
+    trains: list[DirectTrain],
+    from_station_code: str,
+    to_station_code: str,
+    on: date | None = None,
+) -> str:
+    """
+    Format direct trains between two stations as a compact table.
+
+    Args:
+        trains: Result of RouteIndex.between
+        from_station_code: Boarding station code
+        to_station_code: Destination station code
+        on: The journey date the trains were filtered by, if any
+
+    Returns:
+        A table of train, departure, arrival, duration and running days
+    """
+    from_code, to_code = from_station_code.strip().upper(), to_station_code.strip().upper()
+    title = f"Direct trains {from_code} → {to_code}"
+    if on is not None:
+        title += f" on {on.strftime('%d-%m-%Y')} ({on.strftime('%A')})"
+    if on is not None:
+        # Trains known only by origin and destination were not checked against the date
+        unknown = [train for train in trains if train.departure is None]
+        trains = [train for train in trains if train.departure is not None]
+    else:
+        unknown = []
+    if not trains and not unknown:
+        return f"{title}: none found in the local timetable."
+
+    rows = [("Train", "Name", f"Dep {from_code}", f"Arr {to_code}", "Duration", "Runs On")]
+    for train in trains:
+        if train.departure is None:
+            rows.append((train.train_number, train.train_name, "?", "?", "?", "origin → destination only"))
+            continue
+        duration = train.duration
+        arrival = train.arrival.sta or train.arrival.std
+        days_later = train.arrival.day - train.departure.departure_day
+        if days_later > 0:
+            arrival += f" (+{days_later})"
+        rows.append((
+            train.train_number,
+            train.train_name,
+            train.departure.std or train.departure.sta,
+            arrival,
+            f"{duration // 60}h {duration % 60}m" if duration is not None else "?",
+            train.run_days,
+        ))
+
+    result = f"{title}: {len(trains)} found"
+    if trains:
+        result += "\n\n" + format_table(rows)
+    if unknown:
+        result += "\n\nRunning days unknown (origin → destination only; check before travelling):\n"
+        result += "\n".join(f"  {train.train_number} {train.train_name}" for train in unknown)
+    return result
@@ -1,5 +1,8 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+import sys
+from dataclasses import dataclass, field
+from functools import cached_property
+from pydantic import BaseModel, Field, ConfigDict, PrivateAttr, TypeAdapter
+from typing import Any, Literal, NamedTuple, Optional
 
 
 class NonStopStation(BaseModel):
@@ -67,6 +70,62 @@ class PreviousStation(BaseModel):
     non_stops: list[NonStopStation] = Field(default_factory=list)
 
 
+@dataclass(slots=True)
+class CompactNonStop:
+    """Slotted stand-in for NonStopStation, used by compacted (cached) responses."""
+    si_no: int
+    station_code: str
+    station_name: str
+    distance_from_source: int
+    sta: str = ""
+    std: str = ""
+
+    def __post_init__(self):
+        # Station codes and names repeat across every cached train
+        self.station_code = sys.intern(self.station_code)
+        self.station_name = sys.intern(self.station_name)
+
+
+@dataclass(slots=True)
+class CompactStation:
+    """
+    Slotted stand-in for UpcomingStation/PreviousStation with just the fields the
+    tools read, used by compacted (cached) responses.
+    """
+    si_no: int
+    station_code: str
+    station_name: str
+    distance_from_source: int
+    distance_from_current_station_txt: str = ""
+    sta: str = ""
+    std: str = ""
+    eta: str = ""
+    etd: str = ""
+    halt: int = 0
+    a_day: int = 0
+    arrival_delay: int = 0
+    platform_number: int = 0
+    station_lat: float = 0.0
+    station_lng: float = 0.0
+    non_stops: list[CompactNonStop] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.station_code = sys.intern(self.station_code)
+        self.station_name = sys.intern(self.station_name)
+
+
+_COMPACT_STATIONS = TypeAdapter(list[CompactStation])
+
+RouteStation = UpcomingStation | PreviousStation | CompactStation
+
+
+class StationLocation(NamedTuple):
+    """Where a station appears in a train's route."""
+    station: RouteStation | NonStopStation | CompactNonStop
+    kind: Literal["upcoming", "previous", "non_stop"]
+    position: int  # order along the route, counting previous halts, upcoming halts and non-stops
+
+
 class BubbleMessage(BaseModel):
     """Bubble message with current train status info."""
     station_name: str
@@ -114,21 +173,25 @@ class DfpCarousel(BaseModel):
     pass
 
 
+_UPCOMING_STATIONS = TypeAdapter(list[UpcomingStation])
+_PREVIOUS_STATIONS = TypeAdapter(list[PreviousStation])
+
+
 class NewTrainStatusResponse(BaseModel):
     """Root response from the new train status API.
     
     Note: This is a flat structure where all train data fields are at the root level
     along with the success flag. We use a property to provide backward compatibility
     with code that expects a 'data' attribute.
+    
+    Only the fields the tools use are modelled; the rest of the header and the app's
+    ad/UI payload are ignored while parsing (see FullTrainStatusResponse). The station lists, by far the largest
+    part of a response, are only validated when a tool first reads them.
     """
     success: bool = Field(alias="success")
-    user_id: int = 0
     train_number: str
     train_name: str
-    gps_unable: bool = False
     train_start_date: str
-    notification_date: str = ""
-    at_src_dstn: bool = False
     at_src: bool = False
     at_dstn: bool = False
     is_run_day: bool = True
@@ -140,27 +203,11 @@ class NewTrainStatusResponse(BaseModel):
     run_days: str = ""
     journey_time: int = 0
     std: str = ""
-    fog_incidence_probability: int = 0
-    pantry_available: bool = False
     cur_refresh_interval: int = 30
-    data_from: str = ""
     halt: int = 0
-    new_alert_id: int = 0
-    new_alert_msg: str = ""
-    diverted_stations: Optional[list] = None
-    primary_alert: int = 0
-    instance_alert: int = 0
-    related_alert: int = 0
-    late_update: bool = False
-    is_ry_eta: bool = False
     update_time: str = ""
-    is_on_train: bool = False
-    on_train_error_msg: str = ""
-    travelling_towards: str = ""
     distance_from_source: int
     total_distance: int
-    avg_speed: int = 0
-    a_min: int = 0
     si_no: int
     current_station_code: str
     current_station_name: str
@@ -168,35 +215,94 @@ class NewTrainStatusResponse(BaseModel):
     eta: str = ""  # estimated / actual arrival time
     etd: str = ""  # estimated / actual departure time
     delay: int  # Delay in minutes
-    ahead_distance: int = 0
     ahead_distance_text: str = ""
     status_as_of: str
-    local_address: str = ""
     platform_number: int = 0
     cur_stn_sta: str = ""  # Current station scheduled arrival
     cur_stn_std: str = ""  # Current station scheduled departure
-    is_possibly_on_train: bool = False
-    stoppage_number: int = 0
-    a_day: int = 0
-    status_as_of_min: int = 0
-    dfp_carousel: Optional[DfpCarousel] = None
-    upcoming_stations: list[UpcomingStation] = Field(default_factory=list)
-    previous_stations: list[PreviousStation] = Field(default_factory=list)
-    personalized_food_deeplink: str = ""
-    travelling_from_lat_lng: list[str] = Field(default_factory=list)
-    travelling_to_lat_lng: list[str] = Field(default_factory=list)
+    # Route lists are kept as received and validated on first access (see upcoming_stations)
+    raw_upcoming_stations: list[Any] = Field(default_factory=list, alias="upcoming_stations", repr=False)
+    raw_previous_stations: list[Any] = Field(default_factory=list, alias="previous_stations", repr=False)
     bubble_message: Optional[BubbleMessage] = None
     next_stoppage_info: Optional[NextStoppageInfo] = None
-    current_location_info: list[CurrentLocationInfo] = Field(default_factory=list)
-    ttb_card: Optional[TtbCard] = None
-    spent_time: float = 0.0
-    disclaimer: str = ""
+
+    # Set by compact(): the route lists are then validated into CompactStation records
+    _compact_routes: bool = PrivateAttr(default=False)
+
+    @cached_property
+    def upcoming_stations(self) -> list[UpcomingStation] | list[CompactStation]:
+        """Stations still ahead, validated on first access."""
+        return self._validate_route("upcoming_stations", _UPCOMING_STATIONS)
+
+    @cached_property
+    def previous_stations(self) -> list[PreviousStation] | list[CompactStation]:
+        """Stations already passed, validated on first access."""
+        return self._validate_route("previous_stations", _PREVIOUS_STATIONS)
+
+    def _validate_route(self, name: str, adapter: TypeAdapter) -> list:
+        stations = (_COMPACT_STATIONS if self._compact_routes else adapter).validate_python(getattr(self, f"raw_{name}"))
+        setattr(self, f"raw_{name}", stations)  # let the raw dicts go
+        return stations
+
+    def compact(self) -> "NewTrainStatusResponse":
+        """
+        Keep both station lists as slotted CompactStation records, in place.
+
+        Used for responses kept in the cache: the formatting functions read the same
+        attributes from the compact records, at a fraction of the memory. Lists not read
+        yet stay unparsed and are validated straight into compact records on first
+        access; lists already validated into full models are converted now.
+
+        Returns:
+            self, for chaining
+        """
+        self._compact_routes = True
+        converted = False
+        for name in ("upcoming_stations", "previous_stations"):
+            stations = self.__dict__.get(name)
+            if stations and not isinstance(stations[0], CompactStation):
+                stations = _COMPACT_STATIONS.validate_python([station.model_dump() for station in stations])
+                setattr(self, f"raw_{name}", stations)
+                self.__dict__[name] = stations
+                converted = True
+        if converted:
+            self.__dict__.pop("station_index", None)
+        return self
 
     @property
     def data(self) -> "NewTrainStatusResponse":
         """Backward compatibility: return self as 'data' for existing code."""
         return self
 
+    @cached_property
+    def station_index(self) -> dict[str, StationLocation]:
+        """
+        Map every station code on the route (halts and non-stops) to its location.
+
+        Built once per response on first use; the response is treated as read-only
+        after parsing. If a code appears more than once (e.g. a reversal), upcoming
+        halts win over previous halts, which win over non-stops.
+        """
+        halts: dict[str, StationLocation] = {}
+        non_stops: dict[str, StationLocation] = {}
+        position = 0
+        for kind, stations in (("previous", self.previous_stations), ("upcoming", self.upcoming_stations)):
+            for station in stations:
+                code = station.station_code.strip().upper()
+                if code and (code not in halts or (kind == "upcoming" and halts[code].kind == "previous")):
+                    # An upcoming halt wins over an earlier pass through the same station
+                    halts[code] = StationLocation(station, kind, position)
+                position += 1
+                for non_stop in station.non_stops:
+                    non_stops.setdefault(non_stop.station_code.strip().upper(), StationLocation(non_stop, "non_stop", position))
+                    position += 1
+        non_stops.pop("", None)
+        return non_stops | halts
+
+    def station_lookup(self, station_code: str) -> StationLocation | None:
+        """Find a station on the route by code in O(1), or None if the train does not pass it."""
+        return self.station_index.get(station_code.strip().upper())
+
     def get_delay_hours_minutes(self) -> tuple[int, int]:
         """Get current delay as (hours, minutes) tuple."""
         hours = self.delay // 60
@@ -213,6 +319,54 @@ class NewTrainStatusResponse(BaseModel):
         """Get remaining distance to destination in km."""
         return self.total_distance - self.distance_from_source
 
+
+class FullTrainStatusResponse(NewTrainStatusResponse):
+    """
+    NewTrainStatusResponse plus the header fields no tool reads and the ad/UI payload
+    the app renders (TRAIN_STATUS_PARSE_MODE=full).
+    """
+    user_id: int = 0
+    gps_unable: bool = False
+    notification_date: str = ""
+    at_src_dstn: bool = False
+    fog_incidence_probability: int = 0
+    pantry_available: bool = False
+    data_from: str = ""
+    new_alert_id: int = 0
+    new_alert_msg: str = ""
+    diverted_stations: Optional[list] = None
+    primary_alert: int = 0
+    instance_alert: int = 0
+    related_alert: int = 0
+    late_update: bool = False
+    is_ry_eta: bool = False
+    is_on_train: bool = False
+    on_train_error_msg: str = ""
+    travelling_towards: str = ""
+    avg_speed: int = 0
+    a_min: int = 0
+    ahead_distance: int = 0
+    local_address: str = ""
+    is_possibly_on_train: bool = False
+    stoppage_number: int = 0
+    a_day: int = 0
+    status_as_of_min: int = 0
+    dfp_carousel: Optional[DfpCarousel] = None
+    personalized_food_deeplink: str = ""
+    travelling_from_lat_lng: list[str] = Field(default_factory=list)
+    travelling_to_lat_lng: list[str] = Field(default_factory=list)
+    current_location_info: list[CurrentLocationInfo] = Field(default_factory=list)
+    ttb_card: Optional[TtbCard] = None
+    spent_time: float = 0.0
+    disclaimer: str = ""
+
+
+class TrainRunQuery(BaseModel):
+    """A single train run to look up: the train number and days since it left its source (detected if omitted)."""
+    train_number: str
+    start_day: Optional[int] = None
+
+
 class StationSearchResult(BaseModel):
     """A station search result."""
     code: str
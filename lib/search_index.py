@@ -0,0 +1,226 @@
+import bisect
+import os
+import re
+from collections import Counter
+from typing import Callable, Generic, Iterable, TypeVar
+
+T = TypeVar("T")
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+# Minimum trigram similarity for a typo-tolerant match
+FUZZY_MIN_SIMILARITY = 0.35
+
+
+def normalize(text: str) -> str:
+    """Lower-case text and collapse punctuation/whitespace into single spaces."""
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    """Character trigrams of each word of a normalized string, padded so short words still match."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def read_tsv(path: str) -> list[list[str]]:
+    """Read a tab-separated data file, skipping blank lines and '#' comments."""
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line and not line.startswith("#"):
+                rows.append(line.split("\t"))
+    return rows
+
+
+def write_tsv(path: str, header: list[str], rows: Iterable[list[str]]) -> None:
+    """Atomically write a tab-separated data file with a '#' header line."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("# " + "\t".join(header) + "\n")
+        for row in rows:
+            f.write("\t".join(row) + "\n")
+    os.replace(tmp_path, path)
+
+
+def merge_search_results(first: list[T], then: list[T], key: Callable[[T], str], limit: int) -> list[T]:
+    """Results of `first` followed by those of `then` not already listed (by key), up to limit."""
+    seen = {key(result) for result in first}
+    merged = list(first)
+    for result in then:
+        if key(result) not in seen:
+            seen.add(key(result))
+            merged.append(result)
+    return merged[:limit]
+
+
+class TextIndex(Generic[T]):
+    """
+    A compact in-memory search index over records that have a short code and a name.
+
+    Supports, from best to worst match:
+    - exact code ("NDLS", "12138")
+    - code prefix ("121")
+    - name prefix ("new del")
+    - token prefixes in any order ("del new")
+    - typo-tolerant trigram matching ("howra", "vadodra")
+    """
+
+    def __init__(self, code: Callable[[T], str], name: Callable[[T], str], records: Iterable[T] = ()):
+        """
+        Args:
+            code: Returns a record's code
+            name: Returns a record's display name
+            records: Initial records
+        """
+        self._code = code
+        self._name = name
+        self._records: list[T] = []
+        self._by_code: dict[str, int] = {}
+        self._codes: list[tuple[str, int]] = []  # sorted (code, id) for prefix search
+        self._names: list[tuple[str, int]] = []  # sorted (normalized name, id)
+        self._tokens: list[tuple[str, int]] = []  # sorted (token, id)
+        self._trigrams: dict[str, list[int]] = {}
+        self._norm_names: list[str] = []
+        self._gram_counts: list[int] = []
+        self._live: set[int] = set()  # ids not replaced by a later add()
+        self._dirty = False
+        for record in records:
+            self.add(record)
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    def __iter__(self):
+        return (self._records[i] for i in sorted(self._by_code.values()))
+
+    def get(self, code: str) -> T | None:
+        """Look up a record by its exact code."""
+        record_id = self._by_code.get(code.strip().upper())
+        return self._records[record_id] if record_id is not None else None
+
+    def add(self, record: T) -> None:
+        """Add a record, replacing any existing record with the same code."""
+        code = self._code(record).strip().upper()
+        existing = self._by_code.get(code)
+        if existing is not None:
+            if self._name(self._records[existing]) == self._name(record):
+                self._records[existing] = record
+                return
+            self._remove(existing)
+
+        record_id = len(self._records)
+        norm = normalize(self._name(record))
+        self._records.append(record)
+        self._norm_names.append(norm)
+        grams = trigrams(norm)
+        self._gram_counts.append(len(grams))
+        self._by_code[code] = record_id
+        self._codes.append((code, record_id))
+        self._names.append((norm, record_id))
+        for token in set(norm.split()):
+            self._tokens.append((token, record_id))
+        for gram in grams:
+            self._trigrams.setdefault(gram, []).append(record_id)
+        self._dirty = True
+
+    def search(
+        self,
+        query: str,
+        limit: int = 8,
+        where: Callable[[T], bool] | None = None,
+        fuzzy: bool = True,
+    ) -> list[T]:
+        """
+        Return up to `limit` records ranked by how well they match the query.
+
+        Args:
+            query: Code or name to look for. May be empty when `where` is given,
+                in which case every record passing the filter matches.
+            limit: Maximum number of records to return
+            where: Optional filter applied before ranking
+            fuzzy: Whether typo-tolerant trigram matches are included. Without them
+                only exact, prefix and token matches are returned.
+        """
+        norm = normalize(query)
+        if limit <= 0 or (not norm and where is None):
+            return []
+        self._sort()
+
+        if not norm:
+            matching = [i for i in sorted(self._live) if where(self._records[i])]
+            return [self._records[i] for i in matching[:limit]]
+
+        scores: dict[int, float] = {}
+
+        def score(record_id: int, value: float) -> None:
+            if record_id not in self._live or value <= scores.get(record_id, 0.0):
+                return
+            if where is not None and not where(self._records[record_id]):
+                return
+            scores[record_id] = value
+
+        code = query.strip().upper()
+        if code in self._by_code:
+            score(self._by_code[code], 100.0)
+        for record_id in self._prefix_ids(self._codes, code):
+            score(record_id, 90.0)
+        for record_id in self._prefix_ids(self._names, norm):
+            score(record_id, 80.0)
+
+        # Every query token must prefix some token of the name
+        token_sets = [set(self._prefix_ids(self._tokens, token)) for token in norm.split()]
+        if token_sets:
+            for record_id in set.intersection(*token_sets):
+                score(record_id, 70.0)
+
+        if fuzzy and len(scores) < limit:
+            for record_id, similarity in self._fuzzy(norm):
+                score(record_id, 60.0 * similarity)
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], len(self._norm_names[i]), self._norm_names[i]))
+        return [self._records[i] for i in ranked[:limit]]
+
+    def _remove(self, record_id: int) -> None:
+        # Removed ids stay in the postings and are filtered out by _live
+        code = self._code(self._records[record_id]).strip().upper()
+        self._by_code.pop(code, None)
+        self._dirty = True
+
+    def _sort(self) -> None:
+        if not self._dirty:
+            return
+        self._codes.sort()
+        self._names.sort()
+        self._tokens.sort()
+        self._live = set(self._by_code.values())
+        self._dirty = False
+
+    @staticmethod
+    def _prefix_ids(entries: list[tuple[str, int]], prefix: str) -> list[int]:
+        start = bisect.bisect_left(entries, (prefix, -1))
+        ids = []
+        for key, record_id in entries[start:]:
+            if not key.startswith(prefix):
+                break
+            ids.append(record_id)
+        return ids
+
+    def _fuzzy(self, norm: str) -> list[tuple[int, float]]:
+        grams = trigrams(norm)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        matches = []
+        for record_id, count in shared.items():
+            # Mostly "how much of the query is in the name", with Dice breaking ties towards shorter names
+            containment = count / len(grams)
+            dice = 2 * count / (len(grams) + self._gram_counts[record_id])
+            similarity = 0.7 * containment + 0.3 * dice
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                matches.append((record_id, similarity))
+        return matches
@@ -0,0 +1,30 @@
+from lib.fleet import poller_fleet
+from lib.http_client import upstream_summaries
+from lib.pnr import PNR_STATUS_CACHE
+from lib.timing import all_trackers
+from lib.train import TRAIN_STATUS_CACHE
+from lib.train_diff import SNAPSHOTS
+
+
+def get_server_stats() -> str:
+    """
+    Report the server's own instrumentation: upstream rate limiters and circuit breakers,
+    latency trackers, response caches and the poller fleet.
+
+    Returns:
+        A formatted string with one line per limiter, breaker, tracker and cache
+    """
+    result = "Upstreams:\n"
+    result += "".join(f"  {line}\n" for line in upstream_summaries()) or "  clients not open\n"
+
+    trackers = [tracker for tracker in all_trackers() if tracker.count]
+    result += "\nLatency:\n"
+    result += "".join(f"  {tracker.summary()}\n" for tracker in trackers) or "  no samples yet\n"
+
+    result += "\nCaches:\n"
+    for cache in (TRAIN_STATUS_CACHE, PNR_STATUS_CACHE, SNAPSHOTS):
+        result += f"  {cache.summary()}\n"
+
+    fleet = poller_fleet()
+    result += f"\nPoller fleet: runs={len(fleet)} polls={fleet.polls} failures={fleet.failures} finished={fleet.finished}\n"
+    return result
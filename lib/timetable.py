@@ -0,0 +1,366 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterator
+from dotenv import load_dotenv
+from lib.formatting import format_table
+from lib.schema.train import NewTrainStatusResponse
+
+load_dotenv()
+
+# SQLite file holding every train route seen in a live status response (":memory:" keeps it in-process);
+# if it cannot be opened the store falls back to ":memory:"
+TIMETABLE_DB_PATH = os.getenv(
+    "TIMETABLE_DB_PATH",
+    os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "irctc-mcp", "timetable.sqlite3"),
+)
+# Seconds a stored timetable is trusted before the next live response rewrites it
+TIMETABLE_MAX_AGE = float(os.getenv("TIMETABLE_MAX_AGE", str(24 * 3600)))
+
+WEEKDAYS = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trains (
+    train_number TEXT PRIMARY KEY,
+    train_name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    source_stn_name TEXT NOT NULL,
+    dest_stn_name TEXT NOT NULL,
+    run_days TEXT NOT NULL,
+    journey_time INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stops (
+    train_number TEXT NOT NULL REFERENCES trains(train_number) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    station_code TEXT NOT NULL,
+    station_name TEXT NOT NULL,
+    halt INTEGER NOT NULL,
+    sta TEXT NOT NULL,
+    std TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    distance INTEGER NOT NULL,
+    PRIMARY KEY (train_number, seq)
+);
+CREATE INDEX IF NOT EXISTS stops_by_station ON stops(station_code);
+"""
+
+
+@dataclass(slots=True)
+class TimetableStop:
+    """One station on a train's scheduled route."""
+    seq: int  # the API's si_no, increasing along the route
+    station_code: str
+    station_name: str
+    halt: bool  # False for stations the train runs through
+    sta: str = ""  # scheduled arrival, HH:MM
+    std: str = ""  # scheduled departure, HH:MM
+    day: int = 0  # days after the departure from source (0 = same day)
+    distance: int = 0  # km from source
+
+    @property
+    def departure_day(self) -> int:
+        """Day of the scheduled departure, which is one later than `day` for halts spanning midnight."""
+        if self.sta and self.std and self.std < self.sta:
+            return self.day + 1
+        return self.day
+
+
+@dataclass
+class TrainTimetable:
+    """A train's static schedule: its stations, times, distances and running days."""
+    train_number: str
+    train_name: str
+    source: str
+    destination: str
+    source_stn_name: str
+    dest_stn_name: str
+    run_days: str  # e.g. "MON,WED,FRI"
+    journey_time: int = 0  # minutes
+    stops: list[TimetableStop] = field(default_factory=list)
+    updated_at: float = 0.0  # time.time() of the response it was built from
+
+    @property
+    def halts(self) -> list[TimetableStop]:
+        return [stop for stop in self.stops if stop.halt]
+
+    def runs_on(self, day: date) -> bool:
+        """Whether the train leaves its source on this date."""
+        days = {d.strip().upper() for d in self.run_days.split(",") if d.strip()}
+        return not days or WEEKDAYS[day.weekday()] in days
+
+
+def clock_minutes(hhmm: str) -> int | None:
+    """Minutes past midnight of an "HH:MM" time, or None if it is empty or malformed."""
+    try:
+        hours, minutes = hhmm.split(":")
+        return int(hours) * 60 + int(minutes)
+    except (ValueError, AttributeError):
+        return None
+
+
+def timetable_from_status(train_status: NewTrainStatusResponse) -> TrainTimetable:
+    """
+    Extract the static schedule from a live status response.
+
+    Day offsets are recomputed from the clock times (the API's own day fields are
+    not consistent between passed and upcoming stations): every time the schedule
+    wraps past midnight the day advances.
+    """
+    data = train_status.data
+    stops: dict[int, TimetableStop] = {}
+    for station in data.previous_stations + data.upcoming_stations:
+        if station.station_code:
+            stops[station.si_no] = TimetableStop(
+                seq=station.si_no,
+                station_code=station.station_code,
+                station_name=station.station_name,
+                halt=True,
+                sta=station.sta,
+                std=station.std,
+                distance=station.distance_from_source,
+            )
+        for non_stop in station.non_stops:
+            stops.setdefault(non_stop.si_no, TimetableStop(
+                seq=non_stop.si_no,
+                station_code=non_stop.station_code,
+                station_name=non_stop.station_name,
+                halt=False,
+                distance=non_stop.distance_from_source,
+            ))
+    # The station the train is at (or passing) may be missing from both lists
+    if data.current_station_code and data.si_no not in stops:
+        stops[data.si_no] = TimetableStop(
+            seq=data.si_no,
+            station_code=data.current_station_code,
+            station_name=data.current_station_name.rstrip("~"),
+            halt=bool(data.halt),
+            sta=data.cur_stn_sta if data.halt else "",
+            std=data.cur_stn_std if data.halt else "",
+            distance=data.distance_from_source,
+        )
+
+    ordered = [stops[seq] for seq in sorted(stops)]
+    day, last = 0, None
+    for stop in ordered:
+        arrival, departure = clock_minutes(stop.sta), clock_minutes(stop.std)
+        if arrival is not None:
+            if last is not None and arrival < last:
+                day += 1
+            last = arrival
+        stop.day = day
+        if departure is not None:
+            if last is not None and departure < last:
+                day += 1
+            last = departure
+
+    return TrainTimetable(
+        train_number=data.train_number,
+        train_name=data.train_name,
+        source=data.source,
+        destination=data.destination,
+        source_stn_name=data.source_stn_name,
+        dest_stn_name=data.dest_stn_name,
+        run_days=data.run_days,
+        journey_time=data.journey_time,
+        stops=ordered,
+        updated_at=time.time(),
+    )
+
+
+class TimetableStore:
+    """
+    Persistent store of train timetables, filled opportunistically from live status responses.
+
+    Writes are skipped while the stored copy of a train is younger than max_age, so
+    polling a train does not rewrite its route on every fetch.
+    """
+
+    def __init__(self, path: str = TIMETABLE_DB_PATH, max_age: float = TIMETABLE_MAX_AGE):
+        """
+        Args:
+            path: SQLite database file, or ":memory:"
+            max_age: Seconds before a stored timetable is refreshed from a newer response
+        """
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(_SCHEMA)
+        self._updated: dict[str, float] = dict(self._db.execute("SELECT train_number, updated_at FROM trains"))
+
+    def __len__(self) -> int:
+        return len(self._updated)
+
+    def __contains__(self, train_number: str) -> bool:
+        return train_number.strip() in self._updated
+
+    def close(self) -> None:
+        self._db.close()
+
+    def record(self, train_status: NewTrainStatusResponse) -> TrainTimetable | None:
+        """
+        Store the route of a live status response unless a fresh copy is already stored.
+
+        Returns:
+            The timetable if it was written, None if it was skipped
+        """
+        updated_at = self._updated.get(train_status.train_number)
+        if updated_at is not None and time.time() - updated_at < self.max_age:
+            return None
+        timetable = timetable_from_status(train_status)
+        if not timetable.stops:
+            return None
+        self.put(timetable)
+        return timetable
+
+    def put(self, timetable: TrainTimetable) -> None:
+        """Insert or replace a train's timetable."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM trains WHERE train_number = ?", (timetable.train_number,))
+            self._db.execute(
+                "INSERT INTO trains VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    timetable.train_number, timetable.train_name, timetable.source, timetable.destination,
+                    timetable.source_stn_name, timetable.dest_stn_name, timetable.run_days,
+                    timetable.journey_time, timetable.updated_at,
+                ),
+            )
+            self._db.executemany(
+                "INSERT INTO stops VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        timetable.train_number, stop.seq, stop.station_code, stop.station_name,
+                        int(stop.halt), stop.sta, stop.std, stop.day, stop.distance,
+                    )
+                    for stop in timetable.stops
+                ],
+            )
+        self._updated[timetable.train_number] = timetable.updated_at
+
+    def get(self, train_number: str) -> TrainTimetable | None:
+        """Look up a train's timetable by number."""
+        train_number = train_number.strip()
+        if train_number not in self._updated:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT train_number, train_name, source, destination, source_stn_name, dest_stn_name, "
+                "run_days, journey_time, updated_at FROM trains WHERE train_number = ?",
+                (train_number,),
+            ).fetchone()
+            if row is None:
+                return None
+            stops = self._db.execute(
+                "SELECT seq, station_code, station_name, halt, sta, std, day, distance "
+                "FROM stops WHERE train_number = ? ORDER BY seq",
+                (train_number,),
+            ).fetchall()
+        timetable = TrainTimetable(*row[:8], updated_at=row[8])
+        timetable.stops = [TimetableStop(seq, code, name, bool(halt), sta, std, day, distance)
+                           for seq, code, name, halt, sta, std, day, distance in stops]
+        return timetable
+
+    def __iter__(self) -> Iterator[TrainTimetable]:
+        for train_number in list(self._updated):
+            timetable = self.get(train_number)
+            if timetable is not None:
+                yield timetable
+
+
+_timetable: TimetableStore | None = None
+
+
+def timetable_store() -> TimetableStore:
+    """
+    The process-wide timetable store, opened on first use.
+
+    If TIMETABLE_DB_PATH cannot be opened the store is kept in memory for this
+    process instead, so lookups still work (and fall back to live fetches).
+    """
+    global _timetable
+    if _timetable is None:
+        try:
+            if TIMETABLE_DB_PATH != ":memory:":
+                os.makedirs(os.path.dirname(TIMETABLE_DB_PATH) or ".", exist_ok=True)
+            _timetable = TimetableStore(TIMETABLE_DB_PATH)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error opening timetable store at {TIMETABLE_DB_PATH}, keeping it in memory: {e}", file=sys.stderr)
+            _timetable = TimetableStore(":memory:")
+    return _timetable
+
+
+def close_timetable_store() -> None:
+    """Close the process-wide timetable store if it was opened. Called at server shutdown."""
+    global _timetable
+    if _timetable is not None:
+        _timetable.close()
+        _timetable = None
+
+
+def get_timetable_route(timetable: TrainTimetable, include_non_stops: bool = False) -> str:
+    """
+    Get the scheduled route of a train with all stations in sequence.
+
+    Args:
+        timetable: The TrainTimetable from the timetable store
+        include_non_stops: Whether to include non-stop stations (default: False)
+
+    Returns:
+        A formatted string showing all stations with names and codes in sequence
+    """
+    entries = []
+    for stop in timetable.stops:
+        if stop.halt:
+            entries.append(f"{stop.station_name} ({stop.station_code})")
+        elif include_non_stops:
+            entries.append(f"[{stop.station_name}] ({stop.station_code})")
+
+    result = f"Train: {timetable.train_name} ({timetable.train_number})\n"
+    if timetable.run_days:
+        result += f"Runs On: {timetable.run_days}\n"
+    result += "\n"
+    result += " -> ".join(entries)
+
+    return result
+
+
+def get_timetable_schedule(timetable: TrainTimetable) -> str:
+    """
+    Get the scheduled arrival and departure of a train at every halt as a table.
+
+    Args:
+        timetable: The TrainTimetable from the timetable store
+
+    Returns:
+        A table of station, scheduled arrival/departure, day of journey and distance
+    """
+    rows = [("#", "Station", "Arr", "Dep", "Day", "Km")]
+    halts = timetable.halts
+    for number, stop in enumerate(halts, start=1):
+        rows.append((
+            str(number),
+            f"{stop.station_name} ({stop.station_code})",
+            stop.sta if number > 1 else "Source",
+            stop.std if number < len(halts) else "Destination",
+            str(stop.day + 1),
+            str(stop.distance),
+        ))
+
+    result = f"Schedule: {timetable.train_name} ({timetable.train_number})\n"
+    result += f"Route: {timetable.source_stn_name} ({timetable.source}) → {timetable.dest_stn_name} ({timetable.destination})\n"
+    if timetable.run_days:
+        result += f"Runs On: {timetable.run_days}\n"
+    if timetable.journey_time:
+        result += f"Journey Time: {timetable.journey_time // 60}h {timetable.journey_time % 60}m\n"
+    result += "\n" + format_table(rows)
+
+    return result
@@ -0,0 +1,68 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class LatencyTracker:
+    """Keeps the most recent latency samples of one operation and reports percentiles."""
+
+    def __init__(self, name: str, max_samples: int = 1024):
+        self.name = name
+        self.count = 0
+        self._samples: deque[float] = deque(maxlen=max_samples)
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self._samples.append(seconds)
+
+    def reset(self) -> None:
+        self.count = 0
+        self._samples.clear()
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Record how long the body of a with-block takes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def percentile(self, p: float) -> float | None:
+        """The p-th percentile (0-100) of the retained samples in seconds, or None without samples."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def mean(self) -> float | None:
+        if not self._samples:
+            return None
+        return sum(self._samples) / len(self._samples)
+
+    def summary(self) -> str:
+        """One line: sample count, mean, p50, p95 and max in milliseconds."""
+        if not self._samples:
+            return f"{self.name}: no samples"
+        return (
+            f"{self.name}: n={self.count} mean={self.mean() * 1000:.1f}ms "
+            f"p50={self.percentile(50) * 1000:.1f}ms p95={self.percentile(95) * 1000:.1f}ms "
+            f"max={max(self._samples) * 1000:.1f}ms"
+        )
+
+
+_trackers: dict[str, LatencyTracker] = {}
+
+
+def latency_tracker(name: str) -> LatencyTracker:
+    """Get (or create) the process-wide tracker with this name."""
+    tracker = _trackers.get(name)
+    if tracker is None:
+        tracker = _trackers[name] = LatencyTracker(name)
+    return tracker
+
+
+def all_trackers() -> list[LatencyTracker]:
+    return list(_trackers.values())
@@ -1,13 +1,29 @@
+import asyncio
 import os
+import sys
+import sqlite3
+import string
+from typing import NamedTuple
 from datetime import datetime, timezone, timedelta, date
 from dotenv import load_dotenv
 import httpx
+from lib.http_client import Upstream, circuit_open, upstream_client
+from lib.resilience import STALE_MAX_AGE
+from lib.cache import TTLCache
+from lib.decoding import decode_model
+from lib.formatting import format_table
+from lib.pnr import PNR_STATUS_CACHE, get_train_number, get_train_start_date as get_pnr_train_start_date
+from lib.search_index import TextIndex, merge_search_results, read_tsv, write_tsv
+from lib.route_index import DirectTrain, RouteIndex
+from lib.timetable import TrainTimetable, timetable_store
 from lib.schema.train import (
+    FullTrainStatusResponse,
     NewTrainStatusResponse,
     StationSearchResponse,
     StationSearchResult,
     TrainSearchResponse,
     TrainSearchResult,
+    TrainRunQuery,
 )
 
 load_dotenv()
@@ -15,10 +31,70 @@ load_dotenv()
 NEW_TRAIN_STATUS_API_BASE = os.getenv("NEW_TRAIN_STATUS_API_BASE")
 TRAIN_STATUS_API_BASE = os.getenv("TRAIN_STATUS_API_BASE")
 
+# Live status cache bounds
+TRAIN_CACHE_MAX_ENTRIES = int(os.getenv("TRAIN_CACHE_MAX_ENTRIES", "1024"))
+TRAIN_CACHE_MIN_TTL = float(os.getenv("TRAIN_CACHE_MIN_TTL", "5"))
+TRAIN_CACHE_MAX_TTL = float(os.getenv("TRAIN_CACHE_MAX_TTL", "300"))
+
+# "lean" parses only the fields the tools use; "full" also validates the app's ad/UI payload
+TRAIN_STATUS_PARSE_MODE = os.getenv("TRAIN_STATUS_PARSE_MODE", "lean")
+TRAIN_STATUS_MODEL: type[NewTrainStatusResponse] = (
+    FullTrainStatusResponse if TRAIN_STATUS_PARSE_MODE == "full" else NewTrainStatusResponse
+)
+
+# Store cached routes as slotted CompactStation records instead of full pydantic models
+TRAIN_CACHE_COMPACT = os.getenv("TRAIN_CACHE_COMPACT", "1") != "0"
+
+# Maximum live status fetches in flight for a single batch request
+TRAIN_BATCH_CONCURRENCY = int(os.getenv("TRAIN_BATCH_CONCURRENCY", "8"))
+
+# Bundled offline station list (code, name)
+STATION_DATA_PATH = os.getenv(
+    "STATION_DATA_PATH", os.path.join(os.path.dirname(__file__), "data", "stations.tsv")
+)
+# Writable copy of the station list with the stations learnt from upstream, overlaid on the bundled one at load
+STATION_INDEX_CACHE_PATH = os.getenv(
+    "STATION_INDEX_CACHE_PATH",
+    os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "irctc-mcp", "stations.tsv"),
+)
+
+# Bundled offline train list (number, name, from_stn_code, to_stn_code)
+TRAIN_DATA_PATH = os.getenv(
+    "TRAIN_DATA_PATH", os.path.join(os.path.dirname(__file__), "data", "trains.tsv")
+)
+# Writable copy of the train list with the trains learnt from upstream, overlaid on the bundled one at load
+TRAIN_INDEX_CACHE_PATH = os.getenv(
+    "TRAIN_INDEX_CACHE_PATH",
+    os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "irctc-mcp", "trains.tsv"),
+)
+# Seconds between background sweeps of the upstream train search (0 disables them)
+TRAIN_INDEX_REFRESH_INTERVAL = float(os.getenv("TRAIN_INDEX_REFRESH_INTERVAL", "600"))
+
+# Runs probed concurrently when a tool is called without start_day (start_day 0 .. N-1)
+TRAIN_START_DAY_PROBES = int(os.getenv("TRAIN_START_DAY_PROBES", "3"))
+
 # Indian Standard Time offset (UTC+5:30)
 IST = timezone(timedelta(hours=5, minutes=30))
 
-async def fetch_new_train_status(train_number: str, start_day: int = 0) -> NewTrainStatusResponse | None:
+
+def train_status_ttl(train_status: NewTrainStatusResponse) -> float:
+    """
+    How long a train status response stays fresh, in seconds.
+    
+    The API tells clients how often to poll through cur_refresh_interval
+    (falling back to refresh_interval), so cache for exactly that long.
+    """
+    interval = train_status.cur_refresh_interval or train_status.refresh_interval
+    return float(min(max(interval, TRAIN_CACHE_MIN_TTL), TRAIN_CACHE_MAX_TTL))
+
+
+# Live status responses keyed on (train_number, start_day)
+TRAIN_STATUS_CACHE: TTLCache[tuple[str, int], NewTrainStatusResponse] = TTLCache(
+    "train_status", TRAIN_CACHE_MAX_ENTRIES, train_status_ttl
+)
+
+
+async def fetch_new_train_status(train_number: str, start_day: int = 0, use_cache: bool = True) -> NewTrainStatusResponse | None:
     """
     Fetch live train status from the RailYatri API.
     
@@ -27,38 +103,300 @@ async def fetch_new_train_status(train_number: str, start_day: int = 0) -> NewTr
     and the current time to get it, every time we call this.
     also mention the date returned in the response to calculate start_day for future response
     
+    Responses are cached for the refresh interval the API asks for, and concurrent
+    requests for the same train run share a single upstream fetch. While the
+    upstream's circuit is open, the last cached response is served even if it has
+    expired (up to STALE_MAX_AGE past expiry).
+    
     Args:
         train_number: The train number (e.g., "12138")
         start_day: Days ago the train started from now (0 = today, 1 = yesterday, 2 = day before yesterday, etc.). mathematically, start_date = current_date - train_start_date  
+        use_cache: Whether a cached response may be returned (default: True)
     
     Returns:
         NewTrainStatusResponse if successful, None otherwise
     """
+    key = (train_number.strip(), start_day)
+    if not use_cache:
+        response = await _request_train_status(*key)
+        if response is not None:
+            TRAIN_STATUS_CACHE.put(key, response)
+        return response
+    response = await TRAIN_STATUS_CACHE.get_or_load(key, lambda: _request_train_status(*key))
+    if response is None and circuit_open(Upstream.TRAIN_STATUS):
+        response = TRAIN_STATUS_CACHE.peek_stale(key, STALE_MAX_AGE)
+        if response is not None:
+            print(f"Serving stale train status for {key[0]} (start_day={start_day}): upstream circuit open", file=sys.stderr)
+    return response
+
+
+def calculate_start_day(train_source_date: date | None) -> int:
+    """
+    Calculate the start_day parameter for train status API.
+    
+    Args:
+        train_source_date: The date when the train departed from its source station
+    
+    Returns:
+        Number of days ago the train started (0 = today, 1 = yesterday, etc.)
+    """
+    if train_source_date is None:
+        return 0  # Default to today if we can't determine
+    
+    today = date.today()
+    delta = today - train_source_date
+    return max(0, delta.days)  # Ensure non-negative
+
+
+def known_start_day(train_number: str) -> int | None:
+    """
+    The start_day of a run of this train that is already known locally, without any request.
+    
+    Looks at fresh live status responses (their train_start_date) and cached PNRs
+    booked on the train (their SourceDoj), and returns the most recent run that has
+    left its source within the last TRAIN_START_DAY_PROBES days and is not known to
+    have reached its destination.
+    
+    Args:
+        train_number: The train number (e.g., "12138")
+    
+    Returns:
+        Days ago that run left its source, or None if no run is known
+    """
+    train_number = train_number.strip()
+    finished: set[date] = set()
+    candidates: set[date] = set()
+    for (number, _), response in TRAIN_STATUS_CACHE.items():
+        if number == train_number:
+            start = get_train_start_date(response)
+            if start is not None:
+                (finished if response.at_dstn else candidates).add(start)
+    for _, pnr_status in PNR_STATUS_CACHE.items():
+        if get_train_number(pnr_status) == train_number:
+            start = get_pnr_train_start_date(pnr_status)
+            if start is not None:
+                candidates.add(start)
+    
+    today = date.today()
+    started = [start for start in candidates - finished if 0 <= (today - start).days < TRAIN_START_DAY_PROBES]
+    if not started:
+        return None
+    return calculate_start_day(max(started))
+
+
+class ActiveRun(NamedTuple):
+    """The run picked for a train on a given day."""
+    start_date: date
+    at_destination: bool  # whether it had already arrived when it was picked
+
+
+# Resolved runs keyed on (train_number, date picked), so later calls that day skip probing
+ACTIVE_RUNS: dict[tuple[str, date], ActiveRun] = {}
+
+
+async def fetch_train_run_status(
+    train_number: str,
+    start_day: int | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+) -> NewTrainStatusResponse | None:
+    """
+    Fetch live train status, working out which run is meant when start_day is not given.
+    
+    The run picked for the train earlier today is reused (see ACTIVE_RUNS) until it
+    reaches its destination. Failing that, a run already known from cached responses
+    or PNRs is used (see known_start_day). Otherwise every run that can still be on
+    its way is fetched concurrently (see probe_days) and the most active one is
+    picked (see pick_active_run).
+    
+    Args:
+        train_number: The train number (e.g., "12138")
+        start_day: Days ago the train started from source, if known
+        semaphore: Bounds the upstream fetches (probes included) when given
+    
+    Returns:
+        NewTrainStatusResponse of the active run, None if no run could be fetched
+    """
+    train_number = train_number.strip()
+    
+    async def fetch(day: int) -> NewTrainStatusResponse | None:
+        if semaphore is None:
+            return await fetch_new_train_status(train_number, day)
+        async with semaphore:
+            return await fetch_new_train_status(train_number, day)
+    
+    if start_day is not None:
+        return await fetch(start_day)
+    
+    today = date.today()
+    resolved = ACTIVE_RUNS.get((train_number, today))
+    if resolved is not None:
+        response = await fetch(calculate_start_day(resolved.start_date))
+        # A run that arrived since it was picked may have been overtaken by a newer one
+        if response is not None and (resolved.at_destination or not response.at_dstn):
+            return response
+    
+    known = known_start_day(train_number)
+    if resolved is None and known is not None:
+        response = await fetch(known)
+        if response is not None and run_rank(response, known) is not None:
+            remember_active_run(train_number, response)
+            return response
+    
+    responses = await asyncio.gather(*(fetch(day) for day in range(probe_days(train_number))))
+    response = pick_active_run(responses)
+    if response is not None:
+        remember_active_run(train_number, response)
+    return response
+
+
+def remember_active_run(train_number: str, train_status: NewTrainStatusResponse) -> None:
+    """Memoize the run picked for a train today, dropping picks from earlier days."""
+    start = get_train_start_date(train_status)
+    if start is None:
+        return
+    today = date.today()
+    for key in [key for key in ACTIVE_RUNS if key[1] != today]:
+        del ACTIVE_RUNS[key]
+    ACTIVE_RUNS[(train_number, today)] = ActiveRun(start, train_status.at_dstn)
+
+
+def probe_days(train_number: str) -> int:
+    """
+    How many runs (start_day 0 .. n-1) can still be on their way.
+    
+    A run is over once it has been longer than its journey since it left its source,
+    allowing one extra day for delays. The journey length comes from the stored
+    timetable; TRAIN_START_DAY_PROBES is used for trains without one.
+    """
+    try:
+        timetable = timetable_store().get(train_number)
+    except sqlite3.Error:
+        timetable = None
+    if timetable is None or not timetable.stops:
+        return TRAIN_START_DAY_PROBES
+    return timetable.stops[-1].day + 2
+
+
+def run_rank(train_status: NewTrainStatusResponse, start_day: int) -> int | None:
+    """
+    How active the run in a probe response is, lower being more active.
+    
+    Args:
+        train_status: Response to a fetch with this start_day
+        start_day: The start_day it was fetched with
+    
+    Returns:
+        0 on its way, 1 waiting at its source, 2 at its destination; None if the
+        train does not run that day (the API then answers with another run)
+    """
+    start = get_train_start_date(train_status)
+    if not train_status.is_run_day or start is None or start != date.today() - timedelta(days=start_day):
+        return None
+    if train_status.at_dstn:
+        return 2
+    if train_status.at_src:
+        return 1
+    return 0
+
+
+def pick_active_run(responses: list[NewTrainStatusResponse | None]) -> NewTrainStatusResponse | None:
+    """
+    Choose the run a traveller most likely means from responses ordered by start_day.
+    
+    Runs on their way beat runs waiting at their source, which beat runs that have
+    arrived; between equals the most recently started wins. Responses that are not
+    for the requested day's run (is_run_day false, or a different train_start_date)
+    are only used when nothing else was fetched.
+    
+    Args:
+        responses: Live status for start_day 0, 1, 2, ... (None where the fetch failed)
+    
+    Returns:
+        The most active run, None if nothing could be fetched
+    """
+    ranked = []
+    for start_day, response in enumerate(responses):
+        if response is not None:
+            rank = run_rank(response, start_day)
+            if rank is not None:
+                ranked.append((rank, start_day, response))
+    if ranked:
+        return min(ranked, key=lambda entry: entry[:2])[2]
+    return next((response for response in responses if response is not None), None)
+
+
+async def _request_train_status(train_number: str, start_day: int) -> NewTrainStatusResponse | None:
+    """Fetch live train status from upstream, bypassing the cache."""
     assert NEW_TRAIN_STATUS_API_BASE is not None
     url = f"{NEW_TRAIN_STATUS_API_BASE}/{train_number}/json"
     params = {
         "start_day": start_day
     }
 
-    async with httpx.AsyncClient(follow_redirects=True) as client:
+    async with upstream_client(Upstream.TRAIN_STATUS) as client:
         try:
-            response = await client.get(url, params=params, timeout=30.0)
+            response = await client.get(url, params=params)
             response.raise_for_status()
-            json_data = response.json()
-            # Check if API returned success=False
-            if json_data.get("success") is False:
+            # None if the API returned success=False
+            train_status = decode_model(response.content, TRAIN_STATUS_MODEL, failure_flag="success")
+            if train_status is None:
                 return None
-            return NewTrainStatusResponse.model_validate(json_data)
+            if TRAIN_CACHE_COMPACT:
+                # Only marks the routes; they are still validated lazily, straight into compact records
+                train_status.compact()
+            remember_train(train_status)
+            remember_timetable(train_status)
+            return train_status
         except httpx.HTTPStatusError as e:
-            print(f"HTTP error fetching train status: {e}")
+            print(f"HTTP error fetching train status: {e}", file=sys.stderr)
             return None
         except httpx.RequestError as e:
-            print(f"Request error fetching train status: {e}")
+            print(f"Request error fetching train status: {e}", file=sys.stderr)
             return None
         except Exception as e:
-            print(f"Error parsing train status response: {e}")
+            print(f"Error parsing train status response: {e}", file=sys.stderr)
             return None
 
+
+def remember_timetable(train_status: NewTrainStatusResponse) -> None:
+    """Store the route of a live status response in the timetable store (and the route index)."""
+    try:
+        timetable = timetable_store().record(train_status)
+    except sqlite3.Error as e:
+        print(f"Error storing timetable: {e}", file=sys.stderr)
+        return
+    if timetable is not None and _route_index is not None:
+        _route_index.add_timetable(timetable)
+
+
+async def get_train_timetable(train_number: str, start_day: int | None = None) -> TrainTimetable | None:
+    """
+    Get a train's scheduled route and timings.
+    
+    Answered from the local timetable store; only a train that has never been seen
+    costs a live status fetch (which then fills the store).
+    
+    Args:
+        train_number: The train number (e.g., "12138")
+        start_day: Run to fetch if the train is not stored yet (0 = today, 1 = yesterday, etc.; detected when omitted)
+    
+    Returns:
+        TrainTimetable if known, None otherwise
+    """
+    timetable = timetable_store().get(train_number)
+    if timetable is not None:
+        return timetable
+    
+    # Every run has the same route, so any run will do: the known one or today's before probing
+    run = start_day if start_day is not None else known_start_day(train_number) or 0
+    response = await fetch_new_train_status(train_number, run)
+    if response is None and start_day is None:
+        response = await fetch_train_run_status(train_number)
+    if response is None:
+        return None
+    return timetable_store().get(train_number)
+
+
 def format_delay(delay_minutes: int) -> str:
     """Format delay in minutes to a human-readable string."""
     if delay_minutes == 0:
@@ -99,46 +437,40 @@ def get_expected_arrival_at_station(train_status: NewTrainStatusResponse, statio
             result += f"  {format_delay(data.delay)}"
         return result
     
-    # Search in upcoming stations
-    for station in data.upcoming_stations:
-        if station.station_code.upper() == station_code_upper:
-            result = f"Arrival at {station.station_name} ({station_code_upper}):\n"
-            result += f"  Train Start Date: {data.train_start_date}\n"
-            if station.sta:
-                result += f"  Scheduled Arrival: {station.sta}\n"
-            if station.eta:
-                result += f"  Expected Arrival: {station.eta}\n"
-            if station.arrival_delay != 0:
-                result += f"  {format_delay(station.arrival_delay)}\n"
-            if station.platform_number:
-                result += f"  Platform: {station.platform_number}\n"
-            if station.distance_from_current_station_txt:
-                result += f"  Distance: {station.distance_from_current_station_txt}"
-            return result
+    location = data.station_lookup(station_code_upper)
+    if location is None:
+        return f"Station {station_code_upper} not found in the train's route (Train Start Date: {data.train_start_date})"
+    station = location.station
     
-    # Search in previous stations
-    for station in data.previous_stations:
-        if station.station_code.upper() == station_code_upper:
-            result = f"Train has already passed {station.station_name} ({station_code_upper}):\n"
-            result += f"  Train Start Date: {data.train_start_date}\n"
-            if station.sta:
-                result += f"  Scheduled Arrival: {station.sta}\n"
-            if station.eta:
-                result += f"  Actual Arrival: {station.eta}\n"
-            if station.arrival_delay != 0:
-                result += f"  {format_delay(station.arrival_delay)}\n"
-            if station.platform_number:
-                result += f"  Platform: {station.platform_number}"
-            return result
+    if location.kind == "upcoming":
+        result = f"Arrival at {station.station_name} ({station_code_upper}):\n"
+        result += f"  Train Start Date: {data.train_start_date}\n"
+        if station.sta:
+            result += f"  Scheduled Arrival: {station.sta}\n"
+        if station.eta:
+            result += f"  Expected Arrival: {station.eta}\n"
+        if station.arrival_delay != 0:
+            result += f"  {format_delay(station.arrival_delay)}\n"
+        if station.platform_number:
+            result += f"  Platform: {station.platform_number}\n"
+        if station.distance_from_current_station_txt:
+            result += f"  Distance: {station.distance_from_current_station_txt}"
+        return result
     
-    # Check in non-stop stations
-    all_stations = data.upcoming_stations + data.previous_stations
-    for station in all_stations:
-        for non_stop in station.non_stops:
-            if non_stop.station_code.upper() == station_code_upper:
-                return f"{non_stop.station_name} ({station_code_upper}) is a non-stop station. Train does not halt here."
+    if location.kind == "previous":
+        result = f"Train has already passed {station.station_name} ({station_code_upper}):\n"
+        result += f"  Train Start Date: {data.train_start_date}\n"
+        if station.sta:
+            result += f"  Scheduled Arrival: {station.sta}\n"
+        if station.eta:
+            result += f"  Actual Arrival: {station.eta}\n"
+        if station.arrival_delay != 0:
+            result += f"  {format_delay(station.arrival_delay)}\n"
+        if station.platform_number:
+            result += f"  Platform: {station.platform_number}"
+        return result
     
-    return f"Station {station_code_upper} not found in the train's route (Train Start Date: {data.train_start_date})"
+    return f"{station.station_name} ({station_code_upper}) is a non-stop station. Train does not halt here."
 
 
 def get_expected_departure_at_station(train_status: NewTrainStatusResponse, station_code: str) -> str:
@@ -168,50 +500,91 @@ def get_expected_departure_at_station(train_status: NewTrainStatusResponse, stat
             result += f"  {format_delay(data.delay)}"
         return result
     
-    # Search in upcoming stations
-    for station in data.upcoming_stations:
-        if station.station_code.upper() == station_code_upper:
-            result = f"Departure from {station.station_name} ({station_code_upper}):\n"
-            result += f"  Train Start Date: {data.train_start_date}\n"
-            if station.std:
-                result += f"  Scheduled Departure: {station.std}\n"
-            if station.etd:
-                result += f"  Expected Departure: {station.etd}\n"
-            if station.arrival_delay != 0:
-                result += f"  {format_delay(station.arrival_delay)}\n"
-            if station.halt:
-                result += f"  Halt Duration: {station.halt} min\n"
-            if station.platform_number:
-                result += f"  Platform: {station.platform_number}\n"
-            if station.distance_from_current_station_txt:
-                result += f"  Distance: {station.distance_from_current_station_txt}"
-            return result
+    location = data.station_lookup(station_code_upper)
+    if location is None:
+        return f"Station {station_code_upper} not found in the train's route (Train Start Date: {data.train_start_date})"
+    station = location.station
     
-    # Search in previous stations
-    for station in data.previous_stations:
-        if station.station_code.upper() == station_code_upper:
-            result = f"Train has already departed from {station.station_name} ({station_code_upper}):\n"
-            result += f"  Train Start Date: {data.train_start_date}\n"
-            if station.std:
-                result += f"  Scheduled Departure: {station.std}\n"
-            if station.etd:
-                result += f"  Actual Departure: {station.etd}\n"
-            if station.arrival_delay != 0:
-                result += f"  {format_delay(station.arrival_delay)}\n"
-            if station.halt:
-                result += f"  Halt Duration: {station.halt} min\n"
-            if station.platform_number:
-                result += f"  Platform: {station.platform_number}"
-            return result
+    if location.kind == "upcoming":
+        result = f"Departure from {station.station_name} ({station_code_upper}):\n"
+        result += f"  Train Start Date: {data.train_start_date}\n"
+        if station.std:
+            result += f"  Scheduled Departure: {station.std}\n"
+        if station.etd:
+            result += f"  Expected Departure: {station.etd}\n"
+        if station.arrival_delay != 0:
+            result += f"  {format_delay(station.arrival_delay)}\n"
+        if station.halt:
+            result += f"  Halt Duration: {station.halt} min\n"
+        if station.platform_number:
+            result += f"  Platform: {station.platform_number}\n"
+        if station.distance_from_current_station_txt:
+            result += f"  Distance: {station.distance_from_current_station_txt}"
+        return result
     
-    # Check in non-stop stations
-    all_stations = data.upcoming_stations + data.previous_stations
-    for station in all_stations:
-        for non_stop in station.non_stops:
-            if non_stop.station_code.upper() == station_code_upper:
-                return f"{non_stop.station_name} ({station_code_upper}) is a non-stop station. Train does not halt here."
+    if location.kind == "previous":
+        result = f"Train has already departed from {station.station_name} ({station_code_upper}):\n"
+        result += f"  Train Start Date: {data.train_start_date}\n"
+        if station.std:
+            result += f"  Scheduled Departure: {station.std}\n"
+        if station.etd:
+            result += f"  Actual Departure: {station.etd}\n"
+        if station.arrival_delay != 0:
+            result += f"  {format_delay(station.arrival_delay)}\n"
+        if station.halt:
+            result += f"  Halt Duration: {station.halt} min\n"
+        if station.platform_number:
+            result += f"  Platform: {station.platform_number}"
+        return result
+    
+    return f"{station.station_name} ({station_code_upper}) is a non-stop station. Train does not halt here."
+
+
+def get_times_at_stations(train_status: NewTrainStatusResponse, station_codes: list[str]) -> str:
+    """
+    Get scheduled and expected times of a train at several stations as one compact table.
+    
+    Args:
+        train_status: The NewTrainStatusResponse object from fetch_new_train_status
+        station_codes: Station codes to report on (e.g., ["BRC", "ST", "BVI"]), in the order to show them
+    
+    Returns:
+        A table of station, state, scheduled/expected arrival and departure, delay and platform
+    """
+    data = train_status.data
+    
+    rows = [("Station", "State", "Sch Arr", "Exp Arr", "Sch Dep", "Exp Dep", "Delay", "PF")]
+    for code in dict.fromkeys(code.strip().upper() for code in station_codes if code.strip()):
+        if data.current_station_code.upper() == code:
+            rows.append((
+                f"{data.current_station_name} ({code})", "Current",
+                data.cur_stn_sta, data.eta, data.cur_stn_std, data.etd,
+                format_delay(data.delay), str(data.platform_number or ""),
+            ))
+            continue
+        
+        location = data.station_lookup(code)
+        if location is None:
+            rows.append((code, "Not on route", "", "", "", "", "", ""))
+            continue
+        
+        station = location.station
+        name = f"{station.station_name} ({code})"
+        if location.kind == "non_stop":
+            rows.append((name, "Non-stop", station.sta, "", station.std, "", "", ""))
+            continue
+        
+        state = "Upcoming" if location.kind == "upcoming" else "Departed"
+        rows.append((
+            name, state, station.sta, station.eta, station.std, station.etd,
+            format_delay(station.arrival_delay), str(station.platform_number or ""),
+        ))
     
-    return f"Station {station_code_upper} not found in the train's route (Train Start Date: {data.train_start_date})"
+    result = f"Train: {data.train_name} ({data.train_number})\n"
+    result += f"Train Start Date: {data.train_start_date}\n\n"
+    result += format_table(rows)
+    
+    return result
 
 
 def get_current_train_position(train_status: NewTrainStatusResponse) -> str:
@@ -429,6 +802,70 @@ def get_train_summary(train_status: NewTrainStatusResponse) -> str:
     return result
 
 
+async def fetch_train_status_batch(
+    runs: list[TrainRunQuery],
+    concurrency: int = TRAIN_BATCH_CONCURRENCY,
+) -> list[tuple[TrainRunQuery, NewTrainStatusResponse | None]]:
+    """
+    Fetch live status for many train runs concurrently.
+    
+    At most `concurrency` fetches are in flight at once, counting the probes for runs
+    given without a start_day (see fetch_train_run_status). A failure for one train
+    yields None for that train only and never fails the batch.
+    
+    Args:
+        runs: The train runs to fetch
+        concurrency: Maximum number of concurrent upstream fetches
+    
+    Returns:
+        (run, response) pairs in the order the runs were given; response is None on failure
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def fetch_one(run: TrainRunQuery) -> NewTrainStatusResponse | None:
+        try:
+            return await fetch_train_run_status(run.train_number, run.start_day, semaphore)
+        except Exception as e:
+            print(f"Error fetching train status for {run.train_number}: {e}", file=sys.stderr)
+            return None
+    
+    responses = await asyncio.gather(*(fetch_one(run) for run in runs))
+    return list(zip(runs, responses))
+
+
+def get_batch_train_summary(results: list[tuple[TrainRunQuery, NewTrainStatusResponse | None]]) -> str:
+    """
+    Format the results of fetch_train_status_batch as one summary per train.
+    
+    Args:
+        results: (run, response) pairs from fetch_train_status_batch
+    
+    Returns:
+        A formatted string with a brief summary (or an error line) for every train
+    """
+    failed = sum(1 for _, response in results if response is None)
+    result = f"Live Status for {len(results)} Trains"
+    if failed:
+        result += f" ({failed} unavailable)"
+    result += "\n"
+    
+    for run, response in results:
+        result += "\n" + "=" * 40 + "\n"
+        if response is None:
+            if run.start_day is None:
+                # Detected: every run that could still be on its way was tried
+                run_label = f"no current run found in the last {probe_days(run.train_number)} days"
+            else:
+                started = date.today() - timedelta(days=run.start_day)
+                run_label = f"run started {started.strftime('%d-%m-%Y')}, start_day={run.start_day}"
+            result += f"{run.train_number} ({run_label}): Error fetching train status. "
+            result += "The train may not be running on this day or the train number may be wrong.\n"
+        else:
+            result += get_train_summary(response) + "\n"
+    
+    return result
+
+
 def get_train_start_date(train_status: NewTrainStatusResponse) -> date | None:
     """
     Get the train start date as a date object.
@@ -486,10 +923,65 @@ def get_last_stop_station(train_status: NewTrainStatusResponse) -> str:
 # UTILITIES:
 
 
+_station_index: TextIndex[StationSearchResult] | None = None
+
+
+def _read_stations(path: str) -> list[StationSearchResult]:
+    return [StationSearchResult(code=code, name=name) for code, name in read_tsv(path)]
+
+
+def station_index() -> TextIndex[StationSearchResult]:
+    """
+    The offline station index, loaded on first use from STATION_DATA_PATH with the
+    stations saved at STATION_INDEX_CACHE_PATH (if any) overlaid on it.
+    """
+    global _station_index
+    if _station_index is None:
+        _station_index = TextIndex(code=lambda s: s.code, name=lambda s: s.name, records=_read_stations(STATION_DATA_PATH))
+        if os.path.exists(STATION_INDEX_CACHE_PATH):
+            try:
+                for station in _read_stations(STATION_INDEX_CACHE_PATH):
+                    _station_index.add(station)
+            except (OSError, ValueError) as e:
+                print(f"Error reading cached station index: {e}", file=sys.stderr)
+    return _station_index
+
+
 async def get_station_codes_from_name(station_name: str, limit: int = 8) -> list[StationSearchResult]:
     """
     Search for station codes by station name.
     
+    Answered from the offline station index when a code, name prefix or name tokens
+    match. The bundled list is far from complete, so a typo-tolerant match alone is
+    not trusted: the upstream search API is asked, its results are listed first and
+    added to the index, and the local near-matches follow. Without an upstream
+    configured the near-matches are returned as they are.
+    
+    Args:
+        station_name: The station name to search for (e.g., "rani kamla")
+        limit: Maximum number of results to return (default: 8)
+    
+    Returns:
+        List of StationSearchResult with code and name
+    """
+    index = station_index()
+    results = index.search(station_name, limit, fuzzy=False)
+    if results:
+        return results
+    
+    near_matches = index.search(station_name, limit)
+    if near_matches and TRAIN_STATUS_API_BASE is None:
+        return near_matches
+    upstream = await search_stations_upstream(station_name, limit)
+    for station in upstream:
+        index.add(station)
+    return merge_search_results(upstream, near_matches, lambda station: station.code, limit)
+
+
+async def search_stations_upstream(station_name: str, limit: int = 8) -> list[StationSearchResult]:
+    """
+    Search for station codes by station name using the remote search API.
+    
     Args:
         station_name: The station name to search for (e.g., "rani kamla")
         limit: Maximum number of results to return (default: 8)
@@ -506,26 +998,205 @@ async def get_station_codes_from_name(station_name: str, limit: int = 8) -> list
         "limit": limit
     }
 
-    async with httpx.AsyncClient(follow_redirects=True) as client:
+    async with upstream_client(Upstream.SEARCH) as client:
         try:
-            response = await client.get(url, params=params, timeout=30.0)
+            response = await client.get(url, params=params)
             response.raise_for_status()
-            result = StationSearchResponse(**response.json())
+            result = decode_model(response.content, StationSearchResponse)
             return result.data
         except httpx.HTTPStatusError as e:
-            print(f"HTTP error searching stations: {e}")
+            print(f"HTTP error searching stations: {e}", file=sys.stderr)
             return []
         except httpx.RequestError as e:
-            print(f"Request error searching stations: {e}")
+            print(f"Request error searching stations: {e}", file=sys.stderr)
             return []
         except Exception as e:
-            print(f"Error parsing station search response: {e}")
+            print(f"Error parsing station search response: {e}", file=sys.stderr)
             return []
 
 
-async def get_train_numbers_from_name(train_name: str, limit: int = 8) -> list[TrainSearchResult]:
+async def refresh_station_index(queries: list[str] | None = None, limit: int = 100, concurrency: int = 8) -> int:
     """
-    Search for train numbers by train name.
+    Rebuild the offline station list from the upstream search API.
+    
+    Every query's results are merged into the in-memory index, which is then saved to
+    STATION_INDEX_CACHE_PATH off the event loop (the bundled list is left untouched).
+    
+    Args:
+        queries: Search terms to sweep (default: every two-letter prefix "aa".."zz")
+        limit: Results requested per query
+        concurrency: Maximum searches in flight at once
+    
+    Returns:
+        Number of stations in the index after the refresh
+    """
+    if queries is None:
+        queries = [a + b for a in string.ascii_lowercase for b in string.ascii_lowercase]
+    
+    index = station_index()
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def sweep(query: str) -> None:
+        async with semaphore:
+            for station in await search_stations_upstream(query, limit):
+                index.add(station)
+    
+    await asyncio.gather(*(sweep(q) for q in queries))
+    await asyncio.to_thread(_write_station_rows, [[s.code, s.name] for s in index])
+    return len(index)
+
+
+def _write_station_rows(rows: list[list[str]]) -> None:
+    os.makedirs(os.path.dirname(STATION_INDEX_CACHE_PATH) or ".", exist_ok=True)
+    write_tsv(STATION_INDEX_CACHE_PATH, ["code", "name"], rows)
+
+
+_train_index: TextIndex[TrainSearchResult] | None = None
+
+
+def _read_trains(path: str) -> list[TrainSearchResult]:
+    return [
+        TrainSearchResult(number=number, name=name, from_stn_code=from_stn, to_stn_code=to_stn)
+        for number, name, from_stn, to_stn in read_tsv(path)
+    ]
+
+
+def train_index() -> TextIndex[TrainSearchResult]:
+    """
+    The offline train index, loaded on first use from TRAIN_DATA_PATH with the
+    trains saved at TRAIN_INDEX_CACHE_PATH (if any) overlaid on it.
+    """
+    global _train_index
+    if _train_index is None:
+        _train_index = TextIndex(code=lambda t: t.number, name=lambda t: t.name, records=_read_trains(TRAIN_DATA_PATH))
+        if os.path.exists(TRAIN_INDEX_CACHE_PATH):
+            try:
+                for train in _read_trains(TRAIN_INDEX_CACHE_PATH):
+                    _train_index.add(train)
+            except (OSError, ValueError) as e:
+                print(f"Error reading cached train index: {e}", file=sys.stderr)
+    return _train_index
+
+
+def remember_train(train_status: NewTrainStatusResponse) -> None:
+    """Add a train seen in a live status response to the offline index if it is not there yet."""
+    if train_index().get(train_status.train_number) is None:
+        add_to_train_index(TrainSearchResult(
+            number=train_status.train_number,
+            name=train_status.train_name,
+            from_stn_code=train_status.source,
+            to_stn_code=train_status.destination,
+        ))
+
+
+def add_to_train_index(train: TrainSearchResult) -> None:
+    """Add or update a train in the offline index (and the route index, if it is built)."""
+    train_index().add(train)
+    if _route_index is not None:
+        _route_index.add_endpoints(train)
+
+
+_route_index: RouteIndex | None = None
+
+
+def route_index() -> RouteIndex:
+    """
+    The station → trains index behind trains-between-stations queries, built on first use
+    from every stored timetable plus the origin/destination of every train in the offline index.
+    """
+    global _route_index
+    if _route_index is None:
+        _route_index = RouteIndex(timetables=timetable_store(), trains=train_index())
+    return _route_index
+
+
+def find_trains_between(
+    from_station_code: str,
+    to_station_code: str,
+    on: date | None = None,
+    unknown_days: bool = False,
+) -> list[DirectTrain]:
+    """
+    Find direct trains between two stations from the local route index.
+    
+    Args:
+        from_station_code: Boarding station code (e.g., "NDLS")
+        to_station_code: Destination station code (e.g., "HWH")
+        on: Only trains that leave the boarding station on this date
+        unknown_days: With `on`, also include trains whose running days are unknown (no stored timetable)
+    
+    Returns:
+        List of DirectTrain ordered by scheduled departure
+    """
+    return route_index().between(from_station_code, to_station_code, on, unknown_days)
+
+
+def _train_rows() -> list[list[str]]:
+    return [[t.number, t.name, t.from_stn_code, t.to_stn_code] for t in train_index()]
+
+
+def _write_train_rows(rows: list[list[str]]) -> None:
+    os.makedirs(os.path.dirname(TRAIN_INDEX_CACHE_PATH) or ".", exist_ok=True)
+    write_tsv(TRAIN_INDEX_CACHE_PATH, ["number", "name", "from_stn_code", "to_stn_code"], rows)
+
+
+def save_train_index() -> None:
+    """Write the in-memory train index to TRAIN_INDEX_CACHE_PATH (the bundled list is left untouched)."""
+    _write_train_rows(_train_rows())
+
+
+async def get_train_numbers_from_name(
+    train_name: str,
+    limit: int = 8,
+    from_station_code: str | None = None,
+    to_station_code: str | None = None,
+) -> list[TrainSearchResult]:
+    """
+    Search for train numbers by train name or number.
+    
+    Answered from the offline train index when the number matches exactly or by
+    prefix, or the name by prefix or tokens. A typo-tolerant name match alone is
+    not trusted (the bundled list is partial): the upstream search API is asked,
+    its results are listed first and added to the index, and the local
+    near-matches follow. Without an upstream configured the near-matches are
+    returned as they are.
+    
+    Args:
+        train_name: The train name or number to search for (e.g., "Punjab", "1213")
+        limit: Maximum number of results to return (default: 8)
+        from_station_code: Only return trains originating at this station (e.g., "HWH")
+        to_station_code: Only return trains terminating at this station (e.g., "NDLS")
+    
+    Returns:
+        List of TrainSearchResult with number, name, fromStnCode, and toStnCode
+    """
+    from_code = from_station_code.strip().upper() if from_station_code else None
+    to_code = to_station_code.strip().upper() if to_station_code else None
+    
+    def route_matches(train: TrainSearchResult) -> bool:
+        return (from_code is None or train.from_stn_code.upper() == from_code) and (
+            to_code is None or train.to_stn_code.upper() == to_code
+        )
+    
+    where = route_matches if from_code or to_code else None
+    index = train_index()
+    results = index.search(train_name, limit, where=where, fuzzy=False)
+    if results or not train_name.strip():
+        return results
+    
+    near_matches = index.search(train_name, limit, where=where)
+    if near_matches and TRAIN_STATUS_API_BASE is None:
+        return near_matches
+    upstream = await search_trains_upstream(train_name, limit)
+    for train in upstream:
+        add_to_train_index(train)
+    upstream = [t for t in upstream if route_matches(t)]
+    return merge_search_results(upstream, near_matches, lambda train: train.number, limit)
+
+
+async def search_trains_upstream(train_name: str, limit: int = 8) -> list[TrainSearchResult]:
+    """
+    Search for train numbers by train name using the remote search API.
     
     Args:
         train_name: The train name to search for (e.g., "Punjab")
@@ -543,19 +1214,68 @@ async def get_train_numbers_from_name(train_name: str, limit: int = 8) -> list[T
         "limit": limit
     }
 
-    async with httpx.AsyncClient(follow_redirects=True) as client:
+    async with upstream_client(Upstream.SEARCH) as client:
         try:
-            response = await client.get(url, params=params, timeout=30.0)
+            response = await client.get(url, params=params)
             response.raise_for_status()
-            result = TrainSearchResponse(**response.json())
+            result = decode_model(response.content, TrainSearchResponse)
             return result.data
         except httpx.HTTPStatusError as e:
-            print(f"HTTP error searching trains: {e}")
+            print(f"HTTP error searching trains: {e}", file=sys.stderr)
             return []
         except httpx.RequestError as e:
-            print(f"Request error searching trains: {e}")
+            print(f"Request error searching trains: {e}", file=sys.stderr)
             return []
         except Exception as e:
-            print(f"Error parsing train search response: {e}")
+            print(f"Error parsing train search response: {e}", file=sys.stderr)
             return []
 
+
+async def refresh_train_index(queries: list[str], limit: int = 100, concurrency: int = 4) -> int:
+    """
+    Merge upstream train search results for the given queries into the offline index
+    and persist it to TRAIN_INDEX_CACHE_PATH (written off the event loop).
+    
+    Args:
+        queries: Search terms to sweep (e.g., number prefixes "120", "121", ...)
+        limit: Results requested per query
+        concurrency: Maximum searches in flight at once
+    
+    Returns:
+        Number of trains in the index after the refresh
+    """
+    index = train_index()
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def sweep(query: str) -> None:
+        async with semaphore:
+            for train in await search_trains_upstream(query, limit):
+                add_to_train_index(train)
+    
+    await asyncio.gather(*(sweep(q) for q in queries))
+    # Snapshot on the loop, write in a thread so the file I/O does not block other requests
+    await asyncio.to_thread(_write_train_rows, _train_rows())
+    return len(index)
+
+
+# Three-digit train number prefixes swept by the background refresh
+TRAIN_NUMBER_PREFIXES = [f"{p:03d}" for p in range(1000)]
+
+
+async def refresh_train_index_forever(interval: float = TRAIN_INDEX_REFRESH_INTERVAL, batch_size: int = 10) -> None:
+    """
+    Background task that incrementally sweeps train number prefixes ("000".."999",
+    so specials numbered 0xxxx are included) against the upstream search, one small
+    batch per interval, so the offline index keeps up with new and renamed trains
+    without a burst of upstream traffic.
+    """
+    prefixes = TRAIN_NUMBER_PREFIXES
+    position = 0
+    while True:
+        await asyncio.sleep(interval)
+        batch = prefixes[position:position + batch_size]
+        position = (position + batch_size) % len(prefixes)
+        try:
+            await refresh_train_index(batch)
+        except Exception as e:
+            print(f"Error refreshing train index: {e}", file=sys.stderr)
@@ -0,0 +1,226 @@
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import Callable
+from dotenv import load_dotenv
+from lib.cache import TTLCache
+from lib.schema.train import NewTrainStatusResponse
+from lib.timetable import clock_minutes
+from lib.train import format_delay
+
+load_dotenv()
+
+# How long a snapshot token stays usable as `since`, in seconds, and how many snapshots are kept
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", str(6 * 3600)))
+SNAPSHOT_MAX_ENTRIES = int(os.getenv("SNAPSHOT_MAX_ENTRIES", "1024"))
+
+
+@dataclass
+class StationChange:
+    """How the forecast for one upcoming station moved between two snapshots."""
+    station_code: str
+    station_name: str
+    old_eta: str
+    new_eta: str
+    old_delay: int
+    new_delay: int
+    old_platform: int
+    new_platform: int
+
+    @property
+    def eta_shift(self) -> int | None:
+        """Minutes the ETA moved (positive = later), None if either ETA is missing."""
+        old, new = clock_minutes(self.old_eta), clock_minutes(self.new_eta)
+        if old is None or new is None:
+            return None
+        shift = (new - old) % (24 * 60)
+        return shift - 24 * 60 if shift > 12 * 60 else shift
+
+
+@dataclass
+class StatusDiff:
+    """What changed between two snapshots of the same train run."""
+    train_number: str
+    train_name: str
+    stations_passed: list[str] = field(default_factory=list)  # "NAME (CODE)" of halts passed since, in order
+    old_station: str = ""
+    new_station: str = ""
+    old_delay: int = 0
+    new_delay: int = 0
+    station_changes: list[StationChange] = field(default_factory=list)
+    reached_destination: bool = False
+
+    @property
+    def empty(self) -> bool:
+        return not (
+            self.stations_passed
+            or self.old_station != self.new_station
+            or self.old_delay != self.new_delay
+            or self.station_changes
+            or self.reached_destination
+        )
+
+
+def same_run(old: NewTrainStatusResponse, new: NewTrainStatusResponse) -> bool:
+    """Whether two snapshots describe the same train run and can be diffed."""
+    return old.train_number == new.train_number and old.train_start_date == new.train_start_date
+
+
+def diff_status(old: NewTrainStatusResponse, new: NewTrainStatusResponse) -> StatusDiff:
+    """
+    Compare two snapshots of the same train run.
+
+    Args:
+        old: The earlier snapshot
+        new: The later snapshot
+
+    Returns:
+        StatusDiff with the halts passed in between, the overall delay change and,
+        for every station still ahead in both, changes to its ETA, delay and platform
+    """
+    old_data, new_data = old.data, new.data
+    diff = StatusDiff(
+        train_number=new_data.train_number,
+        train_name=new_data.train_name,
+        old_station=f"{old_data.current_station_name} ({old_data.current_station_code})",
+        new_station=f"{new_data.current_station_name} ({new_data.current_station_code})",
+        old_delay=old_data.delay,
+        new_delay=new_data.delay,
+        reached_destination=new_data.at_dstn and not old_data.at_dstn,
+    )
+
+    already_passed = {station.station_code for station in old_data.previous_stations}
+    diff.stations_passed = [
+        f"{station.station_name} ({station.station_code})"
+        for station in new_data.previous_stations
+        if station.station_code and station.station_code not in already_passed
+    ]
+
+    old_upcoming = {station.station_code: station for station in old_data.upcoming_stations if station.station_code}
+    for station in new_data.upcoming_stations:
+        before = old_upcoming.get(station.station_code)
+        if before is None:
+            continue
+        if (before.eta, before.arrival_delay, before.platform_number) != (
+            station.eta, station.arrival_delay, station.platform_number
+        ):
+            diff.station_changes.append(StationChange(
+                station_code=station.station_code,
+                station_name=station.station_name,
+                old_eta=before.eta,
+                new_eta=station.eta,
+                old_delay=before.arrival_delay,
+                new_delay=station.arrival_delay,
+                old_platform=before.platform_number,
+                new_platform=station.platform_number,
+            ))
+    return diff
+
+
+def get_status_diff(diff: StatusDiff) -> str:
+    """
+    Format a StatusDiff for the agent, listing only what changed.
+
+    Args:
+        diff: Result of diff_status
+
+    Returns:
+        A formatted string; "No changes" when the snapshots are equivalent
+    """
+    result = f"Changes - {diff.train_name} ({diff.train_number}):\n"
+    if diff.empty:
+        return result + "  No changes since the previous snapshot.\n"
+
+    if diff.stations_passed:
+        result += f"  Passed: {', '.join(diff.stations_passed)}\n"
+    if diff.old_station != diff.new_station:
+        result += f"  Now at: {diff.new_station} (was {diff.old_station})\n"
+    if diff.old_delay != diff.new_delay:
+        delta = diff.new_delay - diff.old_delay
+        result += f"  Delay: {format_delay(diff.new_delay)} ({'+' if delta > 0 else ''}{delta} min)\n"
+    if diff.reached_destination:
+        result += "  Reached destination\n"
+
+    for change in diff.station_changes:
+        parts = []
+        shift = change.eta_shift
+        if change.old_eta != change.new_eta:
+            moved = f", {'+' if shift > 0 else ''}{shift} min" if shift else ""
+            parts.append(f"ETA {change.old_eta or '?'} → {change.new_eta or '?'}{moved}")
+        if change.old_delay != change.new_delay:
+            parts.append(f"delay {change.old_delay} → {change.new_delay} min")
+        if change.old_platform != change.new_platform:
+            parts.append(f"PF {change.old_platform or '?'} → {change.new_platform or '?'}")
+        result += f"  {change.station_name} ({change.station_code}): {'; '.join(parts)}\n"
+    return result
+
+
+# Snapshots handed out to agents, keyed on their token
+SNAPSHOTS: TTLCache[str, NewTrainStatusResponse] = TTLCache(
+    "status_snapshots", SNAPSHOT_MAX_ENTRIES, lambda _: SNAPSHOT_TTL
+)
+
+
+def snapshot_token(train_status: NewTrainStatusResponse) -> str:
+    """
+    Remember a snapshot and return the token an agent can pass back as `since`.
+
+    The token is derived from the snapshot, so the same response always gets the same token.
+    """
+    identity = "|".join((
+        train_status.train_number,
+        train_status.train_start_date,
+        train_status.update_time,
+        train_status.current_station_code,
+        str(train_status.si_no),
+        str(train_status.delay),
+        str(train_status.distance_from_source),
+    ))
+    token = f"{train_status.train_number}-{hashlib.blake2b(identity.encode(), digest_size=6).hexdigest()}"
+    if SNAPSHOTS.peek(token) is None:
+        SNAPSHOTS.put(token, train_status)
+    return token
+
+
+def changes_since(token: str, train_status: NewTrainStatusResponse) -> str | None:
+    """
+    The changes from a snapshot token to the current status, formatted for the agent.
+
+    Args:
+        token: A token from snapshot_token
+        train_status: The current snapshot
+
+    Returns:
+        The formatted diff, or None if the token is unknown, expired or for another run
+    """
+    old = SNAPSHOTS.get(token.strip())
+    if old is None or not same_run(old, train_status):
+        return None
+    return get_status_diff(diff_status(old, train_status))
+
+
+def get_status_or_changes(
+    train_status: NewTrainStatusResponse,
+    since: str | None,
+    formatter: Callable[[NewTrainStatusResponse], str],
+) -> str:
+    """
+    Format a status in full, or only its changes when the agent passes a known snapshot token.
+
+    Args:
+        train_status: The current snapshot
+        since: Token from an earlier response, if any
+        formatter: Formats the full status (e.g. get_current_train_position)
+
+    Returns:
+        The changes since `since` or the full status, followed by the token of this snapshot
+    """
+    token = snapshot_token(train_status)
+    if since:
+        changes = changes_since(since, train_status)
+        if changes is not None:
+            return changes + f"\nSnapshot: {token}"
+    result = formatter(train_status)
+    if since:
+        result = "Snapshot unknown, expired or for another run; full status follows.\n\n" + result
+    return result + f"\n\nSnapshot: {token} (pass as `since` to get only the changes next time)"
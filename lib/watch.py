@@ -0,0 +1,57 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from lib.fleet import StatusUpdate, poller_fleet
+from lib.schema.train import NewTrainStatusResponse
+from lib.train import get_train_summary
+
+
+def get_watch_log(updates: list[StatusUpdate]) -> str:
+    """
+    Summarise a watch: the status at the start, then only the changes, one line per snapshot.
+
+    Args:
+        updates: The StatusUpdates received, first snapshot first
+
+    Returns:
+        A formatted string; the full summary is not repeated for later snapshots
+    """
+    if not updates:
+        return "No status received."
+    first, later = updates[0], [update for update in updates[1:] if update.changes]
+
+    result = get_train_summary(first.train_status) + "\n"
+    result += "\nChanges:\n" if later else "\nNo changes while watching.\n"
+    for update in later:
+        stamp = update.train_status.update_time or update.train_status.status_as_of
+        result += f"  [{stamp}] " + "; ".join(update.changes) + "\n"
+    if updates[-1].final:
+        result += "\nThe train has reached its destination; watching stopped.\n"
+    return result
+
+
+@asynccontextmanager
+async def subscribe_train_status(
+    train_number: str,
+    start_day: int,
+    latest: NewTrainStatusResponse | None = None,
+) -> AsyncIterator[asyncio.Queue[StatusUpdate]]:
+    """
+    Watch a train run through the background poller fleet, which polls each run once
+    however many watchers (and FLEET_TRAINS entries) share it.
+
+    Args:
+        train_number: The train number (e.g., "12138")
+        start_day: Days ago the train started from source
+        latest: The run's status if the caller has already fetched it; saves the first poll
+
+    Yields:
+        A queue of StatusUpdate: the current snapshot first, then one per change
+    """
+    fleet = poller_fleet()
+    fleet.start()
+    key, queue = fleet.subscribe(train_number, start_day, latest)
+    try:
+        yield queue
+    finally:
+        fleet.unsubscribe(key, queue)
@@ -1,7 +1,14 @@
-from fastmcp import FastMCP
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastmcp import Context, FastMCP
 from datetime import date, datetime, timezone, timedelta
+from lib.fleet import FLEET_TRAINS, parse_fleet_trains, poller_fleet
+from lib.http_client import open_http_clients, close_http_clients
+from lib.schema.train import TrainRunQuery
 from lib.pnr import (
-    fetch_pnr_status,
+    fetch_pnr_status_async,
+    fetch_pnr_status_batch,
+    get_pnr_batch_table,
     get_train_start_date as get_pnr_train_start_date,
     get_train_number,
     check_confirm_status,
@@ -11,41 +18,75 @@ from lib.pnr import (
     get_passenger_summary,
     get_pnr_summary,
 )
+from lib.journey import fetch_journey_status
+from lib.route_index import get_trains_between_table
+from lib.stats import get_server_stats
+from lib.timetable import close_timetable_store, get_timetable_route, get_timetable_schedule
+from lib.train_diff import get_status_or_changes
+from lib.watch import StatusUpdate, get_watch_log, subscribe_train_status
 from lib.train import (
+    calculate_start_day,
     fetch_new_train_status,
+    fetch_train_run_status,
     get_expected_arrival_at_station,
     get_expected_departure_at_station,
+    get_times_at_stations,
+    get_train_timetable,
     get_current_train_position,
-    get_train_route,
     get_upcoming_stations,
     get_train_summary,
+    get_train_start_date,
     get_last_stop_station,
+    fetch_train_status_batch,
+    get_batch_train_summary,
     get_station_codes_from_name,
     get_train_numbers_from_name,
+    find_trains_between,
+    train_index,
+    refresh_train_index_forever,
+    TRAIN_STATUS_API_BASE,
+    TRAIN_INDEX_REFRESH_INTERVAL,
 )
 
-mcp = FastMCP("Indian Railway Live Info (New)")
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """
+    Open the pooled upstream HTTP clients and load the offline train index on start-up;
+    keep the index and the FLEET_TRAINS statuses fresh in the background and close
+    everything on shutdown.
+    """
+    await open_http_clients()
+    train_index()
+    background: list[asyncio.Task] = []
+    if TRAIN_STATUS_API_BASE and TRAIN_INDEX_REFRESH_INTERVAL > 0:
+        background.append(asyncio.create_task(refresh_train_index_forever()))
+    fleet = poller_fleet()
+    for train_number in parse_fleet_trains(FLEET_TRAINS):
+        fleet.track(train_number)
+    fleet.start()
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await fleet.stop()
+        await close_http_clients()
+        close_timetable_store()
+
+
+mcp = FastMCP("Indian Railway Live Info (New)", lifespan=lifespan)
 
 # Indian Standard Time offset (UTC+5:30)
 IST = timezone(timedelta(hours=5, minutes=30))
 
+# Maximum number of items accepted by the batch tools
+MAX_BATCH_SIZE = 50
 
-def calculate_start_day(train_source_date: date | None) -> int:
-    """
-    Calculate the start_day parameter for train status API.
-    
-    Args:
-        train_source_date: The date when the train departed from its source station
-        
-    Returns:
-        Number of days ago the train started (0 = today, 1 = yesterday, etc.)
-    """
-    if train_source_date is None:
-        return 0  # Default to today if we can't determine
-    
-    today = date.today()
-    delta = today - train_source_date
-    return max(0, delta.days)  # Ensure non-negative
+# Longest a single watch_train_status call may stream for, in minutes
+MAX_WATCH_MINUTES = 60
 
 
 # ==================== Utility Tools ====================
@@ -55,6 +96,7 @@ def get_current_date_time() -> str:
     """
     Get the current date and time in Indian Standard Time (IST).
     Useful for calculating days until journey, checking if a train has departed, etc.
+    Not needed before the train tools: their start_day is detected when omitted.
     """
     now_ist = datetime.now(IST)
     return (
@@ -85,17 +127,26 @@ def get_date_difference(date1: str, date2: str) -> str:
         return f"Error: Invalid date format. Please use dd-mm-yyyy format. Details: {e}"
 
 
+@mcp.tool(annotations={"readOnlyHint": True})
+def get_server_statistics() -> str:
+    """
+    Get the server's own counters: upstream rate limiter queueing and circuit breaker state,
+    request latencies, response cache hit ratios and the background poller fleet.
+    """
+    return get_server_stats()
+
+
 # ==================== PNR Status Tools ====================
 
 @mcp.tool(annotations={"readOnlyHint": True})
-def get_confirm_status(pnr_no: str) -> str:
+async def get_confirm_status(pnr_no: str) -> str:
     """
     Get Indian Railways ticket confirmation status of all passengers corresponding to a PNR Number.
     
     Args:
         pnr_no: 10-digit PNR code. (example: 8341223680)
     """
-    response = fetch_pnr_status(pnr_no)
+    response = await fetch_pnr_status_async(pnr_no)
     if response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
@@ -103,14 +154,14 @@ def get_confirm_status(pnr_no: str) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-def get_coaches_and_berths(pnr_no: str) -> str:
+async def get_coaches_and_berths(pnr_no: str) -> str:
     """
     Get the Coach IDs (or numbers) and the Seat/Berth Details of all passengers corresponding to a PNR Number.
 
     Args: 
         pnr_no: 10-digit PNR code.
     """
-    response = fetch_pnr_status(pnr_no)
+    response = await fetch_pnr_status_async(pnr_no)
     if response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
@@ -118,14 +169,14 @@ def get_coaches_and_berths(pnr_no: str) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-def get_pnr_waitlist_position(pnr_no: str) -> str:
+async def get_pnr_waitlist_position(pnr_no: str) -> str:
     """
     Get the updated position of passengers in waiting list corresponding to a PNR Number.
 
     Args:
         pnr_no: 10-digit PNR Code.
     """
-    response = fetch_pnr_status(pnr_no)
+    response = await fetch_pnr_status_async(pnr_no)
     if response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
@@ -133,14 +184,14 @@ def get_pnr_waitlist_position(pnr_no: str) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-def get_train_no_from_pnr_no(pnr_no: str) -> str:
+async def get_train_no_from_pnr_no(pnr_no: str) -> str:
     """
     Get the train number and name from a PNR Number.
 
     Args:
         pnr_no: 10-digit PNR Code.
     """
-    response = fetch_pnr_status(pnr_no)
+    response = await fetch_pnr_status_async(pnr_no)
     if response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
@@ -153,7 +204,7 @@ def get_train_no_from_pnr_no(pnr_no: str) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-def get_pnr_journey_overview(pnr_no: str) -> str:
+async def get_pnr_journey_overview(pnr_no: str) -> str:
     """
     Get basic journey information for a PNR - 
     source/destination stations, ticket fare, date/time of journey,
@@ -162,7 +213,7 @@ def get_pnr_journey_overview(pnr_no: str) -> str:
     Args:
         pnr_no: 10-digit PNR Code.
     """
-    response = fetch_pnr_status(pnr_no)
+    response = await fetch_pnr_status_async(pnr_no)
     if response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
@@ -170,14 +221,14 @@ def get_pnr_journey_overview(pnr_no: str) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-def get_pnr_passenger_summary(pnr_no: str) -> str:
+async def get_pnr_passenger_summary(pnr_no: str) -> str:
     """
     Get a summary of all passengers with their current status, coach, and berth information.
 
     Args:
         pnr_no: 10-digit PNR Code.
     """
-    response = fetch_pnr_status(pnr_no)
+    response = await fetch_pnr_status_async(pnr_no)
     if response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
@@ -185,7 +236,7 @@ def get_pnr_passenger_summary(pnr_no: str) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-def get_complete_pnr_summary(pnr_no: str) -> str:
+async def get_complete_pnr_summary(pnr_no: str) -> str:
     """
     Get a complete summary of the PNR including journey details and all passenger information.
     This is a comprehensive view of the entire PNR.
@@ -193,29 +244,48 @@ def get_complete_pnr_summary(pnr_no: str) -> str:
     Args:
         pnr_no: 10-digit PNR Code.
     """
-    response = fetch_pnr_status(pnr_no)
+    response = await fetch_pnr_status_async(pnr_no)
     if response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
     return get_pnr_summary(response)
 
 
+@mcp.tool(annotations={"readOnlyHint": True})
+async def get_pnr_status_batch(pnr_nos: list[str]) -> str:
+    """
+    Get the confirmation status and waitlist position of every passenger across many PNRs
+    in one call (e.g., all PNRs of a group booking). Duplicates are checked once.
+
+    Args:
+        pnr_nos: List of 10-digit PNR codes. At most 50 PNRs per call.
+    """
+    if not pnr_nos:
+        return "No PNR numbers provided."
+    if len(pnr_nos) > MAX_BATCH_SIZE:
+        return f"Too many PNRs ({len(pnr_nos)}). Please request at most {MAX_BATCH_SIZE} PNRs per call."
+    
+    results = await fetch_pnr_status_batch(pnr_nos)
+    return get_pnr_batch_table(results)
+
+
 # ==================== Train Status Tools ====================
 
 @mcp.tool(annotations={"readOnlyHint": True})
-async def get_live_train_status(train_number: str, start_day: int = 0) -> str:
+async def get_live_train_status(train_number: str, start_day: int | None = None, since: str | None = None) -> str:
     """
     Get the current live status and position of an Indian Railways train.
     
     Args:
         train_number: The train number (e.g., "12618")
-        start_day: Days ago the train started from source (0 = today, 1 = yesterday, 2 = day before, etc.)
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, 2 = day before, etc.). Omit to use the run currently on its way.
+        since: Snapshot token from an earlier answer about this train; only what changed since then is returned
     """
-    response = await fetch_new_train_status(train_number, start_day)
+    response = await fetch_train_run_status(train_number, start_day)
     if response is None:
         return "Error fetching train status. Please check the train number and start_day."
     
-    return get_current_train_position(response)
+    return get_status_or_changes(response, since, get_current_train_position)
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
@@ -231,7 +301,7 @@ async def get_train_status_using_pnr(pnr_no: str) -> str:
         pnr_no: 10-digit PNR code
     """
     # First fetch PNR status to get train number and source date
-    pnr_response = fetch_pnr_status(pnr_no)
+    pnr_response = await fetch_pnr_status_async(pnr_no)
     if pnr_response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
@@ -259,16 +329,16 @@ async def get_train_status_using_pnr(pnr_no: str) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-async def get_train_arrival_at_station(train_number: str, station_code: str, start_day: int = 0) -> str:
+async def get_train_arrival_at_station(train_number: str, station_code: str, start_day: int | None = None) -> str:
     """
     Get the expected arrival time of a train at a specific station.
     
     Args:
         train_number: The train number (e.g., "12618")
         station_code: The station code to check arrival for (e.g., "HWH", "NDLS")
-        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.)
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.). Omit to use the run currently on its way.
     """
-    response = await fetch_new_train_status(train_number, start_day)
+    response = await fetch_train_run_status(train_number, start_day)
     if response is None:
         return "Error fetching train status. Please check the train number and start_day."
     
@@ -276,22 +346,45 @@ async def get_train_arrival_at_station(train_number: str, station_code: str, sta
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-async def get_train_departure_at_station(train_number: str, station_code: str, start_day: int = 0) -> str:
+async def get_train_departure_at_station(train_number: str, station_code: str, start_day: int | None = None) -> str:
     """
     Get the expected departure time of a train from a specific station.
     
     Args:
         train_number: The train number (e.g., "12618")
         station_code: The station code to check departure for (e.g., "HWH", "NDLS")
-        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.)
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.). Omit to use the run currently on its way.
     """
-    response = await fetch_new_train_status(train_number, start_day)
+    response = await fetch_train_run_status(train_number, start_day)
     if response is None:
         return "Error fetching train status. Please check the train number and start_day."
     
     return get_expected_departure_at_station(response, station_code)
 
 
+@mcp.tool(annotations={"readOnlyHint": True})
+async def get_train_times_at_stations(train_number: str, station_codes: list[str], start_day: int | None = None) -> str:
+    """
+    Get scheduled and expected arrival/departure times, delay and platform of a train
+    at several stations in one call (e.g., "when does it reach BRC, ST and BVI?").
+    
+    Args:
+        train_number: The train number (e.g., "12618")
+        station_codes: Station codes to check (e.g., ["BRC", "ST", "BVI"]). At most 50 stations per call.
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.). Omit to use the run currently on its way.
+    """
+    if not station_codes:
+        return "No station codes provided."
+    if len(station_codes) > MAX_BATCH_SIZE:
+        return f"Too many stations ({len(station_codes)}). Please request at most {MAX_BATCH_SIZE} stations per call."
+    
+    response = await fetch_train_run_status(train_number, start_day)
+    if response is None:
+        return "Error fetching train status. Please check the train number and start_day."
+    
+    return get_times_at_stations(response, station_codes)
+
+
 @mcp.tool(annotations={"readOnlyHint": True})
 async def get_train_arrival_using_pnr(pnr_no: str, station_code: str) -> str:
     """
@@ -303,7 +396,7 @@ async def get_train_arrival_using_pnr(pnr_no: str, station_code: str) -> str:
         station_code: The station code to check arrival for (e.g., "HWH", "NDLS")
     """
     # Fetch PNR to get train number and source date
-    pnr_response = fetch_pnr_status(pnr_no)
+    pnr_response = await fetch_pnr_status_async(pnr_no)
     if pnr_response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
@@ -324,49 +417,68 @@ async def get_train_arrival_using_pnr(pnr_no: str, station_code: str) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-async def get_train_complete_route(train_number: str, start_day: int = 0, include_non_stops: bool = False) -> str:
+async def get_train_complete_route(train_number: str, start_day: int | None = None, include_non_stops: bool = False) -> str:
     """
-    Get the complete route of a train showing all stations in sequence.
+    Get the complete scheduled route of a train showing all stations in sequence.
+    Answered from the local timetable; use get_live_train_status for the train's current position.
     
     Args:
         train_number: The train number (e.g., "12618")
-        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.)
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.). Only used if the train's timetable is not known yet; detected when omitted.
         include_non_stops: Whether to include non-stop stations in the route
     """
-    response = await fetch_new_train_status(train_number, start_day)
-    if response is None:
+    timetable = await get_train_timetable(train_number, start_day)
+    if timetable is None:
         return "Error fetching train status. Please check the train number and start_day."
     
-    return get_train_route(response, include_non_stops)
+    return get_timetable_route(timetable, include_non_stops)
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-async def get_next_stations(train_number: str, start_day: int = 0, limit: int = 5) -> str:
+async def get_train_schedule(train_number: str, start_day: int | None = None) -> str:
+    """
+    Get the timetable of a train: scheduled arrival/departure, day of journey and distance at every halt,
+    plus the days it runs. Answered from the local timetable without a live fetch.
+    
+    Args:
+        train_number: The train number (e.g., "12618")
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.). Only used if the train's timetable is not known yet; detected when omitted.
+    """
+    timetable = await get_train_timetable(train_number, start_day)
+    if timetable is None:
+        return "Error fetching train status. Please check the train number and start_day."
+    
+    return get_timetable_schedule(timetable)
+
+
+@mcp.tool(annotations={"readOnlyHint": True})
+async def get_next_stations(train_number: str, start_day: int | None = None, limit: int = 5, since: str | None = None) -> str:
     """
     Get the next upcoming stations for a train with arrival times and delays.
     
     Args:
         train_number: The train number (e.g., "12618")
-        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.)
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.). Omit to use the run currently on its way.
         limit: Maximum number of upcoming stations to show (default: 5)
+        since: Snapshot token from an earlier answer about this train; only what changed since then is returned
     """
-    response = await fetch_new_train_status(train_number, start_day)
+    response = await fetch_train_run_status(train_number, start_day)
     if response is None:
         return "Error fetching train status. Please check the train number and start_day."
     
-    return get_upcoming_stations(response, limit)
+    return get_status_or_changes(response, since, lambda status: get_upcoming_stations(status, limit))
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-async def get_last_halt_station(train_number: str, start_day: int = 0) -> str:
+async def get_last_halt_station(train_number: str, start_day: int | None = None) -> str:
     """
     Get the last station where the train made a stop (excluding non-halt/passing stations).
     
     Args:
         train_number: The train number (e.g., "12618")
-        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.)
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.). Omit to use the run currently on its way.
     """
-    response = await fetch_new_train_status(train_number, start_day)
+    response = await fetch_train_run_status(train_number, start_day)
     if response is None:
         return "Error fetching train status. Please check the train number and start_day."
     
@@ -374,19 +486,88 @@ async def get_last_halt_station(train_number: str, start_day: int = 0) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-async def get_brief_train_summary(train_number: str, start_day: int = 0) -> str:
+async def get_brief_train_summary(train_number: str, start_day: int | None = None, since: str | None = None) -> str:
     """
     Get a brief summary of the train's current status.
     
     Args:
         train_number: The train number (e.g., "12618")
-        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.)
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.). Omit to use the run currently on its way.
+        since: Snapshot token from an earlier answer about this train; only what changed since then is returned
     """
-    response = await fetch_new_train_status(train_number, start_day)
+    response = await fetch_train_run_status(train_number, start_day)
     if response is None:
         return "Error fetching train status. Please check the train number and start_day."
     
-    return get_train_summary(response)
+    return get_status_or_changes(response, since, get_train_summary)
+
+
+@mcp.tool(annotations={"readOnlyHint": True})
+async def get_live_train_status_batch(trains: list[TrainRunQuery]) -> str:
+    """
+    Get a brief live status summary for many trains in one call (e.g., every Rajdhani into NDLS).
+    Trains are fetched concurrently; a train that cannot be fetched is reported
+    individually without failing the others.
+    
+    Args:
+        trains: Train runs to check, each with train_number (e.g., "12301") and
+            optional start_day (0 = today, 1 = yesterday, etc.; omit to use the run currently
+            on its way). At most 50 trains per call.
+    """
+    if not trains:
+        return "No trains provided."
+    if len(trains) > MAX_BATCH_SIZE:
+        return f"Too many trains ({len(trains)}). Please request at most {MAX_BATCH_SIZE} trains per call."
+    
+    results = await fetch_train_status_batch(trains)
+    return get_batch_train_summary(results)
+
+
+@mcp.tool(annotations={"readOnlyHint": True})
+async def watch_train_status(
+    train_number: str,
+    ctx: Context,
+    start_day: int | None = None,
+    duration_minutes: int = 10,
+) -> str:
+    """
+    Watch a train for a while instead of calling get_live_train_status repeatedly.
+    Each change (new current station, changed delay, platform) is streamed as a progress
+    notification as soon as it is seen; the result is the starting status followed by
+    only the changes. The run is polled by the background poller fleet, once for all its watchers.
+    
+    Args:
+        train_number: The train number (e.g., "12618")
+        start_day: Days ago the train started from source (0 = today, 1 = yesterday, etc.). Omit to use the run currently on its way.
+        duration_minutes: How long to watch (default: 10, at most 60). Ends early when the train reaches its destination.
+    """
+    if not 1 <= duration_minutes <= MAX_WATCH_MINUTES:
+        return f"duration_minutes must be between 1 and {MAX_WATCH_MINUTES}."
+    
+    response = await fetch_train_run_status(train_number, start_day)
+    if response is None:
+        return "Error fetching train status. Please check the train number and start_day."
+    if start_day is None:
+        start_day = calculate_start_day(get_train_start_date(response))
+    
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    total = duration_minutes * 60
+    updates: list[StatusUpdate] = []
+    # Seeded with the status just fetched, so the fleet does not fetch the run again right away
+    async with subscribe_train_status(train_number, start_day, response) as queue:
+        while (remaining := started + total - loop.time()) > 0:
+            try:
+                update = await asyncio.wait_for(queue.get(), remaining)
+            except TimeoutError:
+                break
+            updates.append(update)
+            if update.changes:
+                await ctx.report_progress(loop.time() - started, total, "; ".join(update.changes))
+            if update.final:
+                break
+    
+    return get_watch_log(updates)
 
 
 # ==================== Search Tools ====================
@@ -410,14 +591,23 @@ async def search_station_codes(station_name: str) -> str:
 
 
 @mcp.tool(annotations={"readOnlyHint": True})
-async def search_train_numbers(train_name: str) -> str:
+async def search_train_numbers(
+    train_name: str,
+    from_station_code: str | None = None,
+    to_station_code: str | None = None,
+) -> str:
     """
-    Search for Indian Railways train numbers by train name.
+    Search for Indian Railways train numbers by train name or number,
+    optionally only trains running from and/or to given stations.
     
     Args:
-        train_name: The train name to search for (e.g., "Rajdhani", "Punjab Mail", "Shatabdi")
+        train_name: The train name or number to search for (e.g., "Rajdhani", "Punjab Mail", "1230"). May be empty when filtering by stations.
+        from_station_code: Only trains originating at this station code (e.g., "HWH")
+        to_station_code: Only trains terminating at this station code (e.g., "NDLS")
     """
-    results = await get_train_numbers_from_name(train_name)
+    results = await get_train_numbers_from_name(
+        train_name, from_station_code=from_station_code, to_station_code=to_station_code
+    )
     if not results:
         return f"No trains found matching '{train_name}'"
     
@@ -427,10 +617,38 @@ async def search_train_numbers(train_name: str) -> str:
     return response
 
 
+@mcp.tool(annotations={"readOnlyHint": True})
+async def get_trains_between_stations(
+    from_station_code: str,
+    to_station_code: str,
+    journey_date: str | None = None,
+) -> str:
+    """
+    Find direct trains from one station to another, with scheduled departure, arrival and duration.
+    Answered from the local timetable of trains seen so far; trains known only by their
+    origin and destination are listed last without times (separately, as running days
+    unknown, when a date is given).
+    
+    Args:
+        from_station_code: Boarding station code (e.g., "NDLS")
+        to_station_code: Destination station code (e.g., "HWH")
+        journey_date: Optional date of boarding in dd-mm-yyyy format (e.g., "09-01-2026"); only trains running that day are listed
+    """
+    on = None
+    if journey_date:
+        try:
+            on = datetime.strptime(journey_date, "%d-%m-%Y").date()
+        except ValueError as e:
+            return f"Error: Invalid date format. Please use dd-mm-yyyy format. Details: {e}"
+    
+    trains = find_trains_between(from_station_code, to_station_code, on, unknown_days=True)
+    return get_trains_between_table(trains, from_station_code, to_station_code, on)
+
+
 # ==================== Combined PNR + Train Status Tools ====================
 
 @mcp.tool(annotations={"readOnlyHint": True})
-async def get_full_journey_status(pnr_no: str) -> str:
+async def get_full_journey_status(pnr_no: str, train_number: str | None = None, start_day: int | None = None) -> str:
     """
     Get complete journey status including PNR details and live train position.
     This is the most comprehensive tool that combines PNR information with 
@@ -438,9 +656,11 @@ async def get_full_journey_status(pnr_no: str) -> str:
     
     Args:
         pnr_no: 10-digit PNR code
+        train_number: Optional train number, if already known. Lets the live status be fetched in parallel with the PNR.
+        start_day: Optional days ago the train started from its source (used with train_number; by default the most recent run known from cached live statuses or PNRs, else 0)
     """
-    # Fetch PNR status
-    pnr_response = fetch_pnr_status(pnr_no)
+    journey = await fetch_journey_status(pnr_no, train_number=train_number, start_day=start_day)
+    pnr_response = journey.pnr_status
     if pnr_response is None:
         return "Error fetching PNR status. Please double check the PNR number provided."
     
@@ -450,25 +670,20 @@ async def get_full_journey_status(pnr_no: str) -> str:
     result += "LIVE TRAIN STATUS\n"
     result += "=" * 40 + "\n\n"
     
-    # Get train status
-    train_no = get_train_number(pnr_response)
+    train_no = journey.train_number
     if train_no is None:
         result += "Train number not available in PNR data."
         return result
     
-    # Calculate start_day
-    train_source_date = get_pnr_train_start_date(pnr_response)
-    start_day = calculate_start_day(train_source_date)
-    
     # Check if the journey date is in the future
-    if train_source_date and train_source_date > date.today():
+    train_source_date = journey.train_source_date
+    if journey.not_started:
         result += f"🚂 Train has not started yet.\n"
         result += f"📅 Scheduled departure from source: {train_source_date.strftime('%d-%m-%Y')}\n"
         result += f"⏳ Days until departure: {(train_source_date - date.today()).days}"
         return result
     
-    # Fetch live train status
-    train_response = await fetch_new_train_status(train_no, start_day)
+    train_response = journey.train_status
     if train_response is None:
         result += f"Unable to fetch live status for train {train_no}.\n"
         result += f"Train source date: {train_source_date.strftime('%d-%m-%Y') if train_source_date else 'Unknown'}\n"
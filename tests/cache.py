@@ -0,0 +1,141 @@
+"""Tests for the TTL response cache."""
+
+import asyncio
+import time
+import httpx
+from lib.cache import TTLCache
+from lib.http_client import open_http_clients, close_http_clients
+from lib.schema.train import CompactStation, NewTrainStatusResponse
+from tests.conftest import train_module, train_status_transport
+
+
+class TestTTLCache:
+    """Tests for the generic TTLCache."""
+
+    def test_hit_and_miss_counters(self):
+        cache: TTLCache[str, str] = TTLCache("test", 4, lambda v: 60)
+        assert cache.get("a") is None
+        cache.put("a", "A")
+        assert cache.get("a") == "A"
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+        assert stats.hit_ratio == 0.5
+
+    def test_entries_expire(self):
+        cache: TTLCache[str, str] = TTLCache("test", 4, lambda v: 0.05)
+        cache.put("a", "A")
+        assert cache.peek("a") == "A"
+        assert cache.items() == [("a", "A")]
+        time.sleep(0.06)
+        assert cache.get("a") is None
+        assert cache.items() == []
+
+    def test_stale_values_until_max_age(self):
+        cache: TTLCache[str, str] = TTLCache("test", 4, lambda v: 0.02)
+        cache.put("a", "A")
+        time.sleep(0.03)
+        assert cache.peek("a") is None
+        assert cache.peek_stale("a", 0.05) == "A"
+        time.sleep(0.05)
+        assert cache.peek_stale("a", 0.05) is None
+
+    def test_lru_eviction(self):
+        cache: TTLCache[str, str] = TTLCache("test", 2, lambda v: 60)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", "C")
+        assert cache.peek("b") is None
+        assert cache.peek("a") == "A"
+        assert cache.stats().evictions == 1
+
+    def test_concurrent_misses_coalesce(self):
+        cache: TTLCache[str, str] = TTLCache("test", 4, lambda v: 60)
+        loads = 0
+
+        async def loader():
+            nonlocal loads
+            loads += 1
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def run():
+            return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+        assert asyncio.run(run()) == ["value"] * 5
+        assert loads == 1
+        assert cache.stats().coalesced == 4
+
+    def test_none_is_not_cached(self):
+        cache: TTLCache[str, str] = TTLCache("test", 4, lambda v: 60)
+
+        async def loader():
+            return None
+
+        assert asyncio.run(cache.get_or_load("k", loader)) is None
+        assert len(cache) == 0
+
+
+class TestTrainStatusCache:
+    """Tests for caching of live train status responses."""
+
+    def test_ttl_follows_refresh_interval(self):
+        response = NewTrainStatusResponse.model_validate({
+            "success": True, "train_number": "1", "train_name": "T", "train_start_date": "2026-01-04",
+            "source": "A", "destination": "B", "source_stn_name": "A", "dest_stn_name": "B",
+            "distance_from_source": 0, "total_distance": 1, "si_no": 1, "current_station_code": "A",
+            "current_station_name": "A", "status": "T", "delay": 0, "status_as_of": "",
+            "cur_refresh_interval": 45,
+        })
+        assert train_module.train_status_ttl(response) == 45
+
+    def test_repeated_tool_calls_share_one_fetch(self, train_api):
+        calls: list[httpx.Request] = []
+
+        async def run():
+            await open_http_clients(transport=train_status_transport(calls))
+            try:
+                first = await asyncio.gather(*(train_module.fetch_new_train_status("19309", 0) for _ in range(4)))
+                second = await train_module.fetch_new_train_status("19309", 0)
+                return first + [second]
+            finally:
+                await close_http_clients()
+
+        results = asyncio.run(run())
+        assert all(r is results[0] for r in results)
+        assert len(calls) == 1
+
+    def test_use_cache_false_refreshes(self, train_api):
+        calls: list[httpx.Request] = []
+
+        async def run():
+            await open_http_clients(transport=train_status_transport(calls))
+            try:
+                await train_module.fetch_new_train_status("19309", 0)
+                await train_module.fetch_new_train_status("19309", 0, use_cache=False)
+            finally:
+                await close_http_clients()
+
+        asyncio.run(run())
+        assert len(calls) == 2
+
+    def test_cached_routes_are_compact(self, train_api):
+        calls: list[httpx.Request] = []
+
+        async def run():
+            await open_http_clients(transport=train_status_transport(calls))
+            try:
+                # The first sighting reads the route into the timetable store; a refresh does not
+                first = await train_module.fetch_new_train_status("19309", 0)
+                return first, await train_module.fetch_new_train_status("19309", 0, use_cache=False)
+            finally:
+                await close_http_clients()
+
+        first, response = asyncio.run(run())
+        assert all(isinstance(s, CompactStation) for s in first.upcoming_stations + first.previous_stations)
+        # Compacting keeps the routes lazy: nothing is validated until a tool reads them
+        assert "upcoming_stations" not in response.__dict__
+        assert all(isinstance(s, dict) for s in response.raw_upcoming_stations + response.raw_previous_stations)
+        assert all(isinstance(s, CompactStation) for s in response.upcoming_stations + response.previous_stations)
+        assert all(isinstance(s, CompactStation) for s in response.raw_upcoming_stations)
+        assert "ADI" in train_module.get_train_route(response)
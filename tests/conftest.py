@@ -0,0 +1,70 @@
+"""Shared fixtures for offline tests against mocked upstream APIs."""
+
+import asyncio
+import importlib
+import os
+import httpx
+import pytest
+from lib.http_client import open_http_clients, close_http_clients
+
+# `lib` star-imports its schema package, which shadows the `lib.train` attribute
+train_module = importlib.import_module("lib.train")
+timetable_module = importlib.import_module("lib.timetable")
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(TEST_DIR)
+EXAMPLE_TRAIN_STATUS = os.path.join(PROJECT_ROOT, "lib", "example_api_responses", "train_status.json")
+
+
+def train_status_transport(calls: list[httpx.Request]) -> httpx.MockTransport:
+    """A mock upstream that serves the example train status for every request."""
+    with open(EXAMPLE_TRAIN_STATUS, "rb") as f:
+        body = f.read()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, content=body, headers={"content-type": "application/json"})
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def timetable(monkeypatch):
+    """An empty in-memory timetable store in place of the on-disk one."""
+    store = timetable_module.TimetableStore(":memory:")
+    monkeypatch.setattr(timetable_module, "_timetable", store)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def train_api(monkeypatch, timetable):
+    """Point the train status fetcher at a fake host and start from an empty cache."""
+    monkeypatch.setattr(train_module, "NEW_TRAIN_STATUS_API_BASE", "https://trains.example")
+    train_module.TRAIN_STATUS_CACHE.clear()
+    train_module.ACTIVE_RUNS.clear()
+    yield
+    train_module.TRAIN_STATUS_CACHE.clear()
+    train_module.ACTIVE_RUNS.clear()
+
+
+@pytest.fixture
+def mock_upstream():
+    """
+    Run a coroutine with the shared HTTP clients pointed at a mock upstream.
+
+    Returns a function taking the upstream's request handler and a factory for the
+    coroutine to run; it opens the clients, runs the coroutine in a fresh event loop,
+    closes the clients and returns the coroutine's result.
+    """
+    def run(handler, coro_factory):
+        async def main():
+            await open_http_clients(transport=httpx.MockTransport(handler))
+            try:
+                return await coro_factory()
+            finally:
+                await close_http_clients()
+
+        return asyncio.run(main())
+
+    return run
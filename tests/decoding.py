@@ -0,0 +1,61 @@
+"""Tests for upstream JSON decoding."""
+
+import importlib
+import importlib.util
+import json
+import os
+import pytest
+from lib.decoding import decode_model
+from lib.schema.pnr import PNRResponse
+from lib.schema.train import NewTrainStatusResponse
+
+decoding_module = importlib.import_module("lib.decoding")
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(TEST_DIR)
+EXAMPLES = os.path.join(PROJECT_ROOT, "lib", "example_api_responses")
+
+DECODERS = ["pydantic", "stdlib"] + (["orjson"] if importlib.util.find_spec("orjson") else [])
+
+
+def read_example(name: str) -> bytes:
+    with open(os.path.join(EXAMPLES, name), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(params=DECODERS)
+def decoder(request, monkeypatch):
+    monkeypatch.setattr(decoding_module, "JSON_DECODER", request.param)
+    if request.param == "orjson":
+        monkeypatch.setattr(decoding_module, "orjson", importlib.import_module("orjson"), raising=False)
+    return request.param
+
+
+class TestDecodeModel:
+    """Tests for decode_model with every available decoder."""
+
+    def test_matches_validating_a_dict(self, decoder):
+        content = read_example("train_status.json")
+        expected = NewTrainStatusResponse.model_validate(json.loads(content))
+        parsed = decode_model(content, NewTrainStatusResponse, failure_flag="success")
+        assert parsed == expected
+        assert parsed.upcoming_stations == expected.upcoming_stations
+
+    def test_pnr_example(self, decoder):
+        parsed = decode_model(read_example("pnr.json"), PNRResponse, failure_flag="status")
+        assert parsed.data.TrainNo == "19309"
+
+    def test_flagged_failure_returns_none(self, decoder):
+        assert decode_model(b'{"success": false}', NewTrainStatusResponse, failure_flag="success") is None
+        body = b'{"status": false, "message": "PNR not found", "timestamp": 0}'
+        assert decode_model(body, PNRResponse, failure_flag="status") is None
+
+    def test_mismatched_payload_raises(self, decoder):
+        with pytest.raises(ValueError):
+            decode_model(b'{"success": true}', NewTrainStatusResponse, failure_flag="success")
+        with pytest.raises(ValueError):
+            decode_model(b"<html>bad gateway</html>", NewTrainStatusResponse, failure_flag="success")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
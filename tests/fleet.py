@@ -0,0 +1,226 @@
+"""Tests for the background poller fleet (mocked upstream)."""
+
+import asyncio
+import json
+from datetime import date, timedelta
+import httpx
+import pytest
+from lib.fleet import PollerFleet, WatchedRun, parse_fleet_trains, poll_interval, run_key
+from lib.schema.train import NewTrainStatusResponse
+import lib.fleet as fleet_module
+from tests.conftest import EXAMPLE_TRAIN_STATUS, train_module
+
+INTERVAL = 0.02
+
+with open(EXAMPLE_TRAIN_STATUS) as f:
+    EXAMPLE = json.load(f)
+
+
+class MockTrains:
+    """A train status API serving a list of snapshots per train, one per request."""
+
+    def __init__(self, steps: dict[str, list[dict]] | None = None, latency: float = 0.0):
+        self.steps = steps or {}
+        self.latency = latency
+        self.requests: dict[str, int] = {}
+        self.started: list[float] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        number = request.url.path.split("/")[-2]
+        self.started.append(asyncio.get_running_loop().time())
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        count = self.requests[number] = self.requests.get(number, 0) + 1
+        steps = self.steps.get(number, [{}])
+        step = steps[min(count - 1, len(steps) - 1)]
+        if step is None:
+            return httpx.Response(200, json={"success": False})
+        return httpx.Response(200, json={**EXAMPLE, "train_number": number, **step})
+
+
+async def run_fleet(fleet: PollerFleet, keys: list[tuple[str, int]], seconds: float) -> None:
+    """Watch the runs and let the fleet poll them for a while."""
+    try:
+        for key in keys:
+            fleet.watch(*key)
+        fleet.start()
+        await asyncio.sleep(seconds)
+    finally:
+        await fleet.stop()
+
+
+@pytest.fixture
+def fast_fleet(monkeypatch, train_api):
+    monkeypatch.setattr(train_module, "TRAIN_CACHE_MIN_TTL", 0)
+    monkeypatch.setattr(train_module, "TRAIN_CACHE_MAX_TTL", INTERVAL)
+    monkeypatch.setattr(fleet_module, "FLEET_RETRY_INTERVAL", INTERVAL)
+
+
+def snapshot(**fields) -> NewTrainStatusResponse:
+    return NewTrainStatusResponse.model_validate({**EXAMPLE, **fields})
+
+
+def test_poll_interval():
+    assert poll_interval(snapshot(status="T", cur_refresh_interval=30)) == 30
+    assert poll_interval(snapshot(status="A", cur_refresh_interval=30, refresh_interval=60)) == 60
+    assert poll_interval(snapshot(at_src=True, refresh_interval=60)) == 60 * fleet_module.FLEET_IDLE_FACTOR
+    assert poll_interval(snapshot(at_dstn=True)) is None
+
+
+def test_parse_fleet_trains():
+    assert parse_fleet_trains("12301, 12951:1,") == ["12301", "12951"]
+    assert parse_fleet_trains("") == []
+
+
+class TestPollerFleet:
+    """Tests for PollerFleet."""
+
+    def test_polls_until_destination_and_feeds_cache(self, fast_fleet, mock_upstream):
+        api = MockTrains({"12301": [{}, {"delay": 9}, {"at_dstn": True}]})
+        fleet = PollerFleet(max_rate=0)
+        mock_upstream(api.handler, lambda: run_fleet(fleet, [("12301", 0), ("12951", 0)], 0.3))
+
+        assert api.requests["12301"] == 3
+        assert ("12301", 0) not in fleet and fleet.finished == 1
+        assert api.requests["12951"] > 3
+        # Kept warm between polls even though the API's refresh interval is shorter
+        assert train_module.TRAIN_STATUS_CACHE.peek(("12951", 0)) is not None
+
+    def test_concurrency_and_rate_are_bounded(self, monkeypatch, fast_fleet):
+        # A stub fetcher with no parsing work, so start times reflect the scheduler alone.
+        # The first fetches hold their slots until released together, which queues the rest.
+        response = snapshot()
+        started: list[float] = []
+        in_flight = peak = 0
+        gate: asyncio.Event | None = None
+
+        async def fetch(train_number: str, start_day: int = 0, use_cache: bool = True):
+            nonlocal in_flight, peak
+            started.append(asyncio.get_running_loop().time())
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await gate.wait()
+            in_flight -= 1
+            return response
+
+        async def run():
+            nonlocal gate
+            gate = asyncio.Event()
+            fleet = PollerFleet(concurrency=3, max_rate=50)
+            try:
+                for i in range(12):
+                    fleet.watch(str(12000 + i))
+                fleet.start()
+                await asyncio.sleep(0.1)
+                assert len(started) == 3
+                gate.set()
+                await asyncio.sleep(0.25)
+            finally:
+                await fleet.stop()
+
+        monkeypatch.setattr(fleet_module, "fetch_new_train_status", fetch)
+        asyncio.run(run())
+
+        assert peak <= 3
+        assert len(started) >= 12
+        gaps = [b - a for a, b in zip(started, started[1:])]
+        assert min(gaps) >= 0.02 * 0.95
+
+    def test_failing_runs_back_off_and_are_dropped(self, monkeypatch, fast_fleet, mock_upstream):
+        monkeypatch.setattr(fleet_module, "FLEET_MAX_FAILURES", 3)
+        api = MockTrains({"99999": [None]})
+        fleet = PollerFleet(max_rate=0)
+        mock_upstream(api.handler, lambda: run_fleet(fleet, [("99999", 0)], 0.3))
+
+        assert api.requests["99999"] == 3
+        assert len(fleet) == 0 and fleet.failures == 3
+
+    def test_tracked_train_moves_on_to_the_next_run(self, fast_fleet, timetable, mock_upstream):
+        # Yesterday's run is on its way and arrives on its fourth request; today's waits at its source
+        requests = {0: 0, 1: 0}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            start_day = int(request.url.params["start_day"])
+            requests[start_day] = requests.get(start_day, 0) + 1
+            start = (date.today() - timedelta(days=start_day)).isoformat()
+            fields = {"train_start_date": start, "is_run_day": start_day in (0, 1)}
+            if start_day == 1:
+                fields["at_dstn"] = requests[1] >= 4
+            elif start_day == 0:
+                fields["at_src"] = True
+            return httpx.Response(200, json={**EXAMPLE, **fields})
+
+        async def run():
+            fleet = PollerFleet(max_rate=0)
+            try:
+                fleet.track("19309")
+                fleet.start()
+                await asyncio.sleep(0.3)
+                return fleet
+            finally:
+                await fleet.stop()
+
+        fleet = mock_upstream(handler, run)
+        assert fleet.finished == 1
+        assert ("19309", 1) not in fleet
+        assert ("19309", 0) in fleet
+        [current] = fleet.runs()
+        assert current.start_date == date.today() and current.held
+
+    def test_start_day_follows_the_run_date(self):
+        # A run watched yesterday as start_day 1 is polled as start_day 2 today
+        watched = WatchedRun("12301", date.today() - timedelta(days=2))
+        assert watched.start_day == 2
+        assert run_key("12301", 2) == watched.key
+
+    def test_unsubscribe_after_midnight_releases_the_run(self, monkeypatch):
+        today = date(2026, 10, 17)
+
+        class FakeDate(date):
+            @classmethod
+            def today(cls):
+                return today
+
+        monkeypatch.setattr(fleet_module, "date", FakeDate)
+
+        async def run():
+            nonlocal today
+            fleet = PollerFleet(max_rate=0)
+            key, queue = fleet.subscribe("12138", 0)
+            today += timedelta(days=1)  # the watch crosses midnight
+            fleet.unsubscribe(key, queue)
+            return fleet
+
+        fleet = asyncio.run(run())
+        assert len(fleet) == 0
+
+    def test_unwatch_stops_polling(self, fast_fleet, mock_upstream):
+        api = MockTrains()
+        fleet = PollerFleet(max_rate=0)
+
+        async def unwatch_soon():
+            await asyncio.sleep(0.05)
+            fleet.unwatch("12301")
+
+        async def run():
+            try:
+                fleet.watch("12301")
+                fleet.start()
+                await unwatch_soon()
+                polled = api.requests.get("12301", 0)
+                await asyncio.sleep(0.1)
+                return polled
+            finally:
+                await fleet.stop()
+
+        polled = mock_upstream(api.handler, run)
+        assert polled >= 1
+        assert api.requests["12301"] <= polled + 1  # at most the fetch already in flight
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
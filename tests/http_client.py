@@ -0,0 +1,61 @@
+"""Tests for the shared upstream HTTP client layer."""
+
+import asyncio
+import httpx
+from lib.http_client import (
+    Upstream,
+    open_http_clients,
+    close_http_clients,
+    upstream_client,
+)
+from lib.schema.train import NewTrainStatusResponse
+from tests.conftest import train_module, train_status_transport
+
+
+class TestSharedClients:
+    """Tests for the lifespan-managed client pool."""
+
+    def test_same_client_is_reused(self):
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+            try:
+                async with upstream_client(Upstream.TRAIN_STATUS) as first:
+                    pass
+                async with upstream_client(Upstream.TRAIN_STATUS) as second:
+                    pass
+                async with upstream_client(Upstream.PNR) as other:
+                    pass
+                return first, second, other
+            finally:
+                await close_http_clients()
+
+        first, second, other = asyncio.run(run())
+        assert first is second
+        assert first is not other
+        assert first.is_closed
+
+    def test_temporary_client_outside_lifespan(self):
+        async def run():
+            async with upstream_client(Upstream.SEARCH) as client:
+                pass
+            return client
+
+        client = asyncio.run(run())
+        assert client.is_closed
+
+    def test_fetchers_share_pooled_client(self, train_api):
+        calls: list[httpx.Request] = []
+
+        async def run():
+            await open_http_clients(transport=train_status_transport(calls))
+            try:
+                return await asyncio.gather(
+                    train_module.fetch_new_train_status("19309", 0),
+                    train_module.fetch_new_train_status("19309", 1),
+                )
+            finally:
+                await close_http_clients()
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, NewTrainStatusResponse) for r in results)
+        assert [c.url.params["start_day"] for c in calls] == ["0", "1"]
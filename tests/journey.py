@@ -0,0 +1,113 @@
+"""Tests for the combined PNR + live train status fetch (mocked upstreams)."""
+
+import asyncio
+from datetime import date, timedelta
+import httpx
+import pytest
+from lib.journey import fetch_journey_status, JOURNEY_CACHED_PNR_LATENCY, JOURNEY_OVERLAPPED_LATENCY
+from lib.train import calculate_start_day
+from tests.conftest import EXAMPLE_TRAIN_STATUS, train_module
+from tests.pnr import MockPnrApi, MOCK_PNR_API, MOCK_KEY_NAME, TEST_PNR, pnr_module
+
+LATENCY = 0.2
+
+
+class MockJourneyApis:
+    """The mock PNR API plus a train status API, both answering after LATENCY seconds."""
+
+    def __init__(self, source_date: date):
+        self.pnr_api = MockPnrApi(latency=LATENCY)
+        self.pnr_api.example["data"]["SourceDoj"] = source_date.strftime("%d-%m-%Y")
+        self.train_requests: list[httpx.Request] = []
+        with open(EXAMPLE_TRAIN_STATUS, "rb") as f:
+            self.train_body = f.read()
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host == "trains.example":
+            self.train_requests.append(request)
+            await asyncio.sleep(LATENCY)
+            return httpx.Response(200, content=self.train_body)
+        return await self.pnr_api.handler(request)
+
+
+@pytest.fixture
+def journey_apis(monkeypatch, train_api):
+    monkeypatch.setattr(pnr_module, "PNR_API_PATH", MOCK_PNR_API)
+    monkeypatch.setattr(pnr_module, "PNR_API_KEY_NAME", MOCK_KEY_NAME)
+    pnr_module.PNR_TOKENS.clear()
+    pnr_module.PNR_STATUS_CACHE.clear()
+    yield MockJourneyApis(source_date=date.today() - timedelta(days=1))
+    pnr_module.PNR_TOKENS.clear()
+    pnr_module.PNR_STATUS_CACHE.clear()
+
+
+class TestFetchJourneyStatus:
+    """Tests for fetch_journey_status."""
+
+    def test_cold_lookup_fetches_train_after_pnr(self, journey_apis, mock_upstream):
+        journey = mock_upstream(journey_apis.handler, lambda: fetch_journey_status(TEST_PNR))
+        assert journey.pnr_status is not None
+        assert journey.train_status is not None
+        assert journey.overlapped is False
+        assert journey.train_number == "19309"
+        assert [r.url.params["start_day"] for r in journey_apis.train_requests] == ["1"]
+
+    def test_known_train_is_fetched_in_parallel(self, journey_apis, mock_upstream):
+        async def run():
+            sequential = await fetch_journey_status(TEST_PNR)
+            pnr_module.PNR_STATUS_CACHE.clear()
+            train_module.TRAIN_STATUS_CACHE.clear()
+            overlapped = await fetch_journey_status(TEST_PNR, train_number="19309", start_day=1)
+            return sequential, overlapped
+
+        sequential, overlapped = mock_upstream(journey_apis.handler, run)
+        assert overlapped.overlapped is True
+        assert overlapped.train_status is not None
+        # Token GET + PNR POST + train GET in sequence vs. the train GET hidden behind the PNR lookup
+        assert overlapped.elapsed < sequential.elapsed - LATENCY / 2
+        assert JOURNEY_OVERLAPPED_LATENCY.count >= 1
+
+    def test_cached_pnr_starts_train_fetch_immediately(self, journey_apis, mock_upstream):
+        async def run():
+            await fetch_journey_status(TEST_PNR)
+            train_module.TRAIN_STATUS_CACHE.clear()
+            return await fetch_journey_status(TEST_PNR)
+
+        cached_pnr_lookups = JOURNEY_CACHED_PNR_LATENCY.count
+        overlapped_lookups = JOURNEY_OVERLAPPED_LATENCY.count
+        journey = mock_upstream(journey_apis.handler, run)
+        assert journey.overlapped is True
+        assert journey.train_status is not None
+        assert len(journey_apis.train_requests) == 2
+        # No PNR fetch was overlapped, so the lookup is not counted as one
+        assert JOURNEY_CACHED_PNR_LATENCY.count == cached_pnr_lookups + 1
+        assert JOURNEY_OVERLAPPED_LATENCY.count == overlapped_lookups
+
+    def test_wrong_guess_is_refetched_for_the_booked_run(self, journey_apis, mock_upstream):
+        journey = mock_upstream(journey_apis.handler, lambda: fetch_journey_status(TEST_PNR, train_number="19309", start_day=0))
+        assert journey.overlapped is False
+        assert journey.train_status is not None
+        assert journey_apis.train_requests[-1].url.params["start_day"] == "1"
+
+    def test_future_run_skips_train_fetch(self, journey_apis, mock_upstream):
+        journey_apis.pnr_api.example["data"]["SourceDoj"] = (date.today() + timedelta(days=3)).strftime("%d-%m-%Y")
+        journey = mock_upstream(journey_apis.handler, lambda: fetch_journey_status(TEST_PNR))
+        assert journey.not_started is True
+        assert journey.train_status is None
+        assert journey_apis.train_requests == []
+
+    def test_invalid_pnr(self, journey_apis, mock_upstream):
+        journey = mock_upstream(journey_apis.handler, lambda: fetch_journey_status("123"))
+        assert journey.pnr_status is None
+        assert journey.train_status is None
+
+
+def test_calculate_start_day():
+    assert calculate_start_day(None) == 0
+    assert calculate_start_day(date.today()) == 0
+    assert calculate_start_day(date.today() - timedelta(days=2)) == 2
+    assert calculate_start_day(date.today() + timedelta(days=2)) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
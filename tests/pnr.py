@@ -1,5 +1,15 @@
+import asyncio
+import importlib
+import json
+import os
+import time
+import httpx
+import pytest
 from lib.pnr import (
     fetch_pnr_status,
+    fetch_pnr_status_async,
+    fetch_pnr_status_batch,
+    get_pnr_batch_table,
     get_train_start_date,
     get_train_number,
     check_confirm_status,
@@ -10,12 +20,62 @@ from lib.pnr import (
     get_pnr_summary,
 )
 from lib.schema.pnr import PNRResponse
-from datetime import date
+from datetime import date, timedelta
 
 
+# `lib` star-imports its schema package, which shadows the `lib.pnr` attribute
+pnr_module = importlib.import_module("lib.pnr")
+
 # Test PNR number
 TEST_PNR = "8641842491"
 
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(TEST_DIR)
+EXAMPLE_PNR = os.path.join(PROJECT_ROOT, "lib", "example_api_responses", "pnr.json")
+
+MOCK_PNR_API = "https://pnr.example/api"
+MOCK_KEY_NAME = "XSRF-TOKEN"
+MOCK_LATENCY = 0.2
+
+
+class MockPnrApi:
+    """A fake PNR upstream: GET hands out an XSRF cookie, POST returns the example PNR."""
+
+    def __init__(self, latency: float = MOCK_LATENCY):
+        self.latency = latency
+        self.gets = 0
+        self.posts = 0
+        self.valid_tokens: set[str] = set()
+        with open(EXAMPLE_PNR) as f:
+            self.example = json.load(f)
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.latency)
+        if request.method == "GET":
+            self.gets += 1
+            token = f"token-{self.gets}"
+            self.valid_tokens.add(token)
+            return httpx.Response(200, headers={"set-cookie": f"{MOCK_KEY_NAME}={token}; Path=/"})
+        self.posts += 1
+        token = request.headers.get(f"X-{MOCK_KEY_NAME}")
+        if token not in self.valid_tokens or f"{MOCK_KEY_NAME}={token}" not in request.headers.get("cookie", ""):
+            return httpx.Response(419)
+        pnr_no = json.loads(request.content)["pnr"]
+        body = json.loads(json.dumps(self.example))
+        body["data"]["Pnr"] = pnr_no
+        return httpx.Response(200, json=body)
+
+
+@pytest.fixture
+def mock_pnr_api(monkeypatch):
+    monkeypatch.setattr(pnr_module, "PNR_API_PATH", MOCK_PNR_API)
+    monkeypatch.setattr(pnr_module, "PNR_API_KEY_NAME", MOCK_KEY_NAME)
+    pnr_module.PNR_TOKENS.clear()
+    pnr_module.PNR_STATUS_CACHE.clear()
+    yield MockPnrApi()
+    pnr_module.PNR_TOKENS.clear()
+    pnr_module.PNR_STATUS_CACHE.clear()
+
 
 def test_fetch_pnr_status():
     """Test fetching PNR status from the API."""
@@ -246,6 +306,177 @@ def test_get_pnr_summary_none():
     print("✓ get_pnr_summary(None) returns appropriate message")
 
 
+def test_fetch_pnr_status_async(mock_pnr_api, mock_upstream):
+    """Test the async fetcher against the mock upstream."""
+    result = mock_upstream(mock_pnr_api.handler, lambda: fetch_pnr_status_async(TEST_PNR))
+
+    assert isinstance(result, PNRResponse)
+    assert result.data is not None
+    assert result.data.Pnr == TEST_PNR
+
+
+def test_fetch_pnr_status_async_invalid_length():
+    """Test that the async fetcher rejects malformed PNRs without an API call."""
+    assert asyncio.run(fetch_pnr_status_async("123")) is None
+    assert asyncio.run(fetch_pnr_status_async("abcdefghij")) is None
+
+
+def test_parallel_pnr_lookups_do_not_block(mock_pnr_api, mock_upstream):
+    """Test that N concurrent PNR lookups finish in roughly the time of one."""
+    pnrs = [f"{8341223680 + i}" for i in range(10)]
+
+    async def single():
+        return await fetch_pnr_status_async(pnrs[0])
+
+    async def parallel():
+        return await asyncio.gather(*(fetch_pnr_status_async(p) for p in pnrs))
+
+    start = time.perf_counter()
+    mock_upstream(mock_pnr_api.handler, single)
+    single_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = mock_upstream(mock_pnr_api.handler, parallel)
+    parallel_elapsed = time.perf_counter() - start
+
+    assert [r.data.Pnr for r in results] == pnrs
+    assert parallel_elapsed < single_elapsed * 2
+    print(f"✓ 1 lookup: {single_elapsed:.2f}s, {len(pnrs)} parallel lookups: {parallel_elapsed:.2f}s")
+
+
+def test_xsrf_token_reused_across_lookups(mock_pnr_api, mock_upstream):
+    """Test that steady-state lookups skip the XSRF GET (1 RTT instead of 2)."""
+    async def run():
+        for _ in range(3):
+            await fetch_pnr_status_async(TEST_PNR, use_cache=False)
+
+    mock_upstream(mock_pnr_api.handler, run)
+    assert mock_pnr_api.gets == 1
+    assert mock_pnr_api.posts == 3
+
+
+def test_xsrf_token_single_refresh_for_concurrent_callers(mock_pnr_api, mock_upstream):
+    """Test that a cold burst of lookups harvests only one token."""
+    async def run():
+        return await asyncio.gather(*(fetch_pnr_status_async(TEST_PNR, use_cache=False) for _ in range(10)))
+
+    results = mock_upstream(mock_pnr_api.handler, run)
+    assert all(r is not None for r in results)
+    assert mock_pnr_api.gets == 1
+
+
+def test_xsrf_token_refreshed_after_rejection(mock_pnr_api, mock_upstream):
+    """Test that a revoked token is refreshed once and the lookup retried."""
+    async def run():
+        await fetch_pnr_status_async(TEST_PNR)
+        mock_pnr_api.valid_tokens.clear()
+        return await fetch_pnr_status_async(TEST_PNR, use_cache=False)
+
+    result = mock_upstream(mock_pnr_api.handler, run)
+    assert result is not None
+    assert mock_pnr_api.gets == 2
+    assert mock_pnr_api.posts == 3
+
+
+def load_example_pnr(**updates) -> PNRResponse:
+    """Load the example PNR response, overriding fields of its data."""
+    with open(EXAMPLE_PNR) as f:
+        response = PNRResponse(**json.load(f))
+    response.data = response.data.model_copy(update=updates)
+    return response
+
+
+def test_pnr_cache_serves_repeat_lookups(mock_pnr_api, mock_upstream):
+    """Test that several PNR tools asking about one PNR cost one upstream lookup."""
+    async def run():
+        return await asyncio.gather(*(fetch_pnr_status_async(TEST_PNR) for _ in range(4)))
+
+    results = mock_upstream(mock_pnr_api.handler, run)
+    assert all(r is results[0] for r in results)
+    assert mock_pnr_api.posts == 1
+    assert pnr_module.PNR_STATUS_CACHE.stats().coalesced == 3
+
+
+def test_pnr_ttl_waitlisted_before_chart():
+    """Test the short TTL while the chart is pending and passengers are waitlisted."""
+    future = (date.today() + timedelta(days=10)).strftime("%d-%m-%Y")
+    pnr = load_example_pnr(ChartPrepared=False, DestinationDoj=future)
+    pnr.data.PassengerStatus[0].CurrentStatus = "GNWL 12"
+    assert pnr_module.pnr_status_ttl(pnr) == pnr_module.PNR_CACHE_WAITLIST_TTL
+
+
+def test_pnr_ttl_confirmed_or_chart_prepared():
+    """Test the long TTL once everybody is confirmed or the chart is out."""
+    future = (date.today() + timedelta(days=10)).strftime("%d-%m-%Y")
+    confirmed = load_example_pnr(ChartPrepared=False, DestinationDoj=future)
+    assert pnr_module.pnr_status_ttl(confirmed) == pnr_module.PNR_CACHE_CONFIRMED_TTL
+
+    charted = load_example_pnr(ChartPrepared=True, DestinationDoj=future)
+    charted.data.PassengerStatus[0].CurrentStatus = "RAC 3"
+    assert pnr_module.pnr_status_ttl(charted) == pnr_module.PNR_CACHE_CONFIRMED_TTL
+
+
+def test_pnr_ttl_final_after_journey_or_cancellation():
+    """Test the effectively permanent TTL for completed journeys and cancelled trains."""
+    past = (date.today() - timedelta(days=1)).strftime("%d-%m-%Y")
+    future = (date.today() + timedelta(days=10)).strftime("%d-%m-%Y")
+    assert pnr_module.pnr_status_ttl(load_example_pnr(DestinationDoj=past)) == pnr_module.PNR_CACHE_FINAL_TTL
+    cancelled = load_example_pnr(DestinationDoj=future, TrainCancelledFlag=True)
+    assert pnr_module.pnr_status_ttl(cancelled) == pnr_module.PNR_CACHE_FINAL_TTL
+
+
+def test_pnr_batch_dedupes_validates_and_shares_token(mock_pnr_api, mock_upstream):
+    """Test a group lookup: one XSRF harvest, one POST per distinct valid PNR."""
+    pnrs = ["8341223680", "8341223681", "8341223680", "12345", "8341223682"]
+
+    results = mock_upstream(mock_pnr_api.handler, lambda: fetch_pnr_status_batch(pnrs))
+
+    assert list(results) == ["8341223680", "8341223681", "12345", "8341223682"]
+    assert results["12345"] is None
+    assert all(results[p] is not None for p in ["8341223680", "8341223681", "8341223682"])
+    assert mock_pnr_api.gets == 1
+    assert mock_pnr_api.posts == 3
+
+
+def test_pnr_batch_token_failure_is_reported_per_pnr(mock_pnr_api, mock_upstream):
+    """Test that a failed token harvest fails the lookups that needed it, not the batch."""
+    cached = PNRResponse(**mock_pnr_api.example)
+    pnr_module.PNR_STATUS_CACHE.put("8341223680", cached, ttl=60)
+
+    results = mock_upstream(
+        lambda request: httpx.Response(503), lambda: fetch_pnr_status_batch(["8341223680", "8341223681"])
+    )
+    assert results == {"8341223680": cached, "8341223681": None}
+
+
+def test_pnr_batch_table():
+    """Test the compact batch table built from the per-passenger helpers."""
+    with open(EXAMPLE_PNR) as f:
+        example = PNRResponse(**json.load(f))
+
+    table = get_pnr_batch_table({"8341223680": example, "12345": None, "0000000000": None})
+    lines = table.splitlines()
+
+    assert lines[0].startswith("PNR")
+    assert "8341223680 | 19309 | P1" in table
+    assert "Already Confirmed/RAC" in table
+    assert "Invalid PNR" in lines[3]
+    assert "Error fetching PNR status" in lines[4]
+
+
+def test_pnr_batch_table_without_passengers():
+    """Test that a PNR without passengers gets one row with the message in the status column."""
+    with open(EXAMPLE_PNR) as f:
+        body = json.load(f)
+    body["data"]["PassengerStatus"] = []
+
+    table = get_pnr_batch_table({"8341223680": PNRResponse(**body)})
+    row = [cell.strip() for cell in table.splitlines()[2].split(" | ")]
+
+    assert row[2] == "-"
+    assert row[3] == "No passenger information available."
+
+
 if __name__ == "__main__":
     print("=" * 50)
     print("Test 1: Valid PNR Fetch")
@@ -0,0 +1,156 @@
+"""Tests for the per-upstream rate limiter and concurrency cap."""
+
+import asyncio
+import time
+import httpx
+import pytest
+import lib.http_client as http_client_module
+from lib.http_client import Upstream, open_http_clients, close_http_clients, upstream_limiter
+from lib.rate_limit import ThrottledTransport, UpstreamLimiter, UpstreamQueueTimeout
+from lib.stats import get_server_stats
+from tests.conftest import train_module, train_status_transport
+
+
+class SlowApi:
+    """Counts requests in flight and their start times."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.started: list[float] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.started.append(time.monotonic())
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        return httpx.Response(200)
+
+
+def fetch_all(limiter: UpstreamLimiter, api: SlowApi, count: int, **extensions) -> list:
+    async def run():
+        transport = ThrottledTransport(httpx.MockTransport(api.handler), limiter)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await asyncio.gather(
+                *(client.get("https://api.example/", extensions=extensions) for _ in range(count)),
+                return_exceptions=True,
+            )
+
+    return asyncio.run(run())
+
+
+class TestUpstreamLimiter:
+    """Tests for UpstreamLimiter behind a ThrottledTransport."""
+
+    def test_concurrency_is_capped(self):
+        api = SlowApi(latency=0.02)
+        limiter = UpstreamLimiter("test.cap", rate=0, burst=1, concurrency=3, max_wait=5)
+        results = fetch_all(limiter, api, 10)
+
+        assert all(r.status_code == 200 for r in results)
+        assert api.peak == 3
+        assert limiter.admitted == 10 and limiter.in_flight == 0 and limiter.queued == 0
+
+    def test_rate_after_burst(self):
+        api = SlowApi()
+        limiter = UpstreamLimiter("test.rate", rate=50, burst=2, concurrency=10, max_wait=5)
+        fetch_all(limiter, api, 6)
+
+        # Two start at once, the rest about 1/rate apart
+        gaps = [b - a for a, b in zip(api.started, api.started[1:])]
+        assert gaps[0] < 0.01
+        assert min(gaps[1:]) >= 0.02 * 0.8
+        assert api.started[-1] - api.started[0] >= 4 * 0.02 * 0.8
+
+    def test_deadline_rejects_instead_of_queueing(self):
+        api = SlowApi(latency=0.1)
+        limiter = UpstreamLimiter("test.deadline", rate=0, burst=1, concurrency=1, max_wait=0.02)
+        results = fetch_all(limiter, api, 3)
+
+        assert sum(isinstance(r, httpx.Response) for r in results) == 1
+        rejected = [r for r in results if isinstance(r, UpstreamQueueTimeout)]
+        assert len(rejected) == 2 and limiter.rejected == 2
+        assert isinstance(rejected[0], httpx.RequestError)
+        assert limiter.queue_wait.count == 3
+
+    def test_request_sets_its_own_deadline(self):
+        api = SlowApi(latency=0.05)
+        limiter = UpstreamLimiter("test.extension", rate=0, burst=1, concurrency=1, max_wait=0.01)
+        results = fetch_all(limiter, api, 2, queue_timeout=1)
+
+        assert all(isinstance(r, httpx.Response) for r in results)
+        assert limiter.queue_wait.percentile(100) >= 0.05 * 0.8
+
+    def test_rate_limit_deadline(self):
+        api = SlowApi()
+        limiter = UpstreamLimiter("test.bucket", rate=1, burst=1, concurrency=10, max_wait=0.05)
+        results = fetch_all(limiter, api, 2)
+
+        # The second request would need a token a second later
+        assert isinstance(results[0], httpx.Response)
+        assert isinstance(results[1], UpstreamQueueTimeout)
+        assert limiter.in_flight == 0
+
+
+class TestSharedLimiters:
+    """Tests for the limiters installed on the shared clients."""
+
+    def test_limiters_follow_client_lifespan(self):
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+            try:
+                return {upstream: upstream_limiter(upstream) for upstream in Upstream}
+            finally:
+                await close_http_clients()
+
+        limiters = asyncio.run(run())
+        assert all(isinstance(limiter, UpstreamLimiter) for limiter in limiters.values())
+        assert limiters[Upstream.PNR].concurrency == http_client_module.UPSTREAM_LIMITS[Upstream.PNR]["concurrency"]
+        assert upstream_limiter(Upstream.PNR) is None
+
+    def test_train_fetcher_queue_timeout_returns_none(self, monkeypatch, train_api):
+        monkeypatch.setitem(
+            http_client_module.UPSTREAM_LIMITS,
+            Upstream.TRAIN_STATUS,
+            {"rate": 0, "burst": 1, "concurrency": 1, "max_wait": 0.01},
+        )
+        calls: list[httpx.Request] = []
+        inner = train_status_transport(calls)
+
+        async def slow(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.1)
+            return await inner.handle_async_request(request)
+
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(slow))
+            try:
+                results = await asyncio.gather(
+                    train_module.fetch_new_train_status("19309", 0),
+                    train_module.fetch_new_train_status("19309", 1),
+                )
+                return results, upstream_limiter(Upstream.TRAIN_STATUS).rejected
+            finally:
+                await close_http_clients()
+
+        results, rejected = asyncio.run(run())
+        assert sum(r is None for r in results) == 1
+        assert rejected == 1 and len(calls) == 1
+
+
+def test_server_stats_report_limiters_and_caches(train_api, mock_upstream):
+    async def run():
+        await train_module.fetch_new_train_status("19309", 0)
+        await train_module.fetch_new_train_status("19309", 0)
+        return get_server_stats()
+
+    stats = mock_upstream(train_status_transport([]).handle_async_request, run)
+    assert "train_status: admitted=1 rejected=0" in stats
+    assert "upstream.train_status.queue_wait: n=" in stats
+    assert "circuit train_status: closed" in stats
+    assert "train_status: size=1/" in stats and "hits=1 misses=1" in stats
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
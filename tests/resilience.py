@@ -0,0 +1,218 @@
+"""Tests for upstream retries, hedged requests and the circuit breaker."""
+
+import asyncio
+import time
+import httpx
+import pytest
+import lib.resilience as resilience_module
+from lib.http_client import Upstream, open_http_clients, close_http_clients, upstream_breaker
+from lib.rate_limit import ThrottledTransport, UpstreamLimiter, UpstreamQueueTimeout
+from lib.resilience import CircuitBreaker, CircuitOpenError, ResilientTransport
+from tests.conftest import train_module, train_status_transport
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(resilience_module, "HTTP_RETRY_BACKOFF", 0.001)
+
+
+class ScriptedApi:
+    """Answers each request with the next step: a status code, an exception, or (status, delay)."""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.requests: list[httpx.Request] = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        step = self.steps[min(len(self.requests) - 1, len(self.steps) - 1)]
+        if isinstance(step, Exception):
+            raise step
+        status, delay = step if isinstance(step, tuple) else (step, 0)
+        await asyncio.sleep(delay)
+        return httpx.Response(status)
+
+
+def send(transport: ResilientTransport, method: str = "GET", count: int = 1) -> list:
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            results = []
+            for _ in range(count):
+                try:
+                    results.append(await client.request(method, "https://api.example/"))
+                except httpx.HTTPError as e:
+                    results.append(e)
+            return results
+
+    return asyncio.run(run())
+
+
+def resilient(api: ScriptedApi, name: str, **kwargs) -> ResilientTransport:
+    breaker = CircuitBreaker(name, failure_threshold=kwargs.pop("threshold", 5), reset_timeout=kwargs.pop("reset", 30))
+    return ResilientTransport(httpx.MockTransport(api.handler), breaker, **kwargs)
+
+
+class TestRetries:
+    """Tests for retries of idempotent requests."""
+
+    def test_get_is_retried_until_success(self):
+        api = ScriptedApi(503, httpx.ConnectError("refused"), 200)
+        transport = resilient(api, "test.retry", retries=2)
+        [response] = send(transport)
+        assert response.status_code == 200
+        assert len(api.requests) == 3 and transport.retried == 2
+        assert transport.breaker.failures == 0
+
+    def test_retries_are_bounded(self):
+        api = ScriptedApi(502)
+        [response] = send(resilient(api, "test.bounded", retries=2))
+        assert response.status_code == 502
+        assert len(api.requests) == 3
+
+    def test_post_is_not_retried(self):
+        api = ScriptedApi(503, 200)
+        [response] = send(resilient(api, "test.post", retries=2), method="POST")
+        assert response.status_code == 503
+        assert len(api.requests) == 1
+
+    def test_client_errors_are_not_retried(self):
+        api = ScriptedApi(404)
+        transport = resilient(api, "test.404", retries=2)
+        [response] = send(transport)
+        assert response.status_code == 404 and len(api.requests) == 1
+        assert transport.breaker.failures == 0
+
+    def test_queue_timeout_is_not_retried_or_counted(self):
+        api = ScriptedApi((200, 0.1))
+        limiter = UpstreamLimiter("test.queued", rate=0, burst=1, concurrency=1, max_wait=0.01)
+        breaker = CircuitBreaker("test.queued", failure_threshold=1)
+        transport = ResilientTransport(ThrottledTransport(httpx.MockTransport(api.handler), limiter), breaker)
+
+        async def run():
+            async with httpx.AsyncClient(transport=transport) as client:
+                return await asyncio.gather(
+                    client.get("https://api.example/"), client.get("https://api.example/"), return_exceptions=True
+                )
+
+        results = asyncio.run(run())
+        assert sum(isinstance(r, UpstreamQueueTimeout) for r in results) == 1
+        assert len(api.requests) == 1 and not breaker.is_open
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker and fail-fast requests."""
+
+    def test_opens_fails_fast_and_recovers(self):
+        api = ScriptedApi(500, 500, 500, 200)
+        transport = resilient(api, "test.breaker", retries=0, threshold=3, reset=0.05)
+        results = send(transport, count=5)
+
+        assert [r.status_code for r in results[:3]] == [500, 500, 500]
+        assert all(isinstance(r, CircuitOpenError) for r in results[3:])
+        assert len(api.requests) == 3
+        assert transport.breaker.state == CircuitBreaker.OPEN and transport.breaker.rejected == 2
+
+        time.sleep(0.06)
+        assert transport.breaker.state == CircuitBreaker.HALF_OPEN
+        [response] = send(transport)
+        assert response.status_code == 200
+        assert transport.breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker("test.trial", failure_threshold=1, reset_timeout=0.02)
+        breaker.record_failure()
+        assert not breaker.allow()
+        time.sleep(0.03)
+        assert breaker.allow()  # the trial
+        assert not breaker.allow()  # everyone else waits for it
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN and breaker.opened == 2
+
+    def test_open_circuit_stops_retries(self):
+        api = ScriptedApi(503)
+        [response] = send(resilient(api, "test.stop", retries=5, threshold=2))
+        assert response.status_code == 503
+        assert len(api.requests) == 2
+
+
+class TestHedging:
+    """Tests for hedged requests."""
+
+    def test_slow_request_is_hedged(self, monkeypatch):
+        monkeypatch.setattr(resilience_module, "HTTP_HEDGE_MIN_SAMPLES", 5)
+        api = ScriptedApi((200, 0.5), (200, 0))
+        transport = resilient(api, "test.hedge", hedge=True)
+        transport.latency.reset()
+        assert transport.hedge_delay() is None
+        for _ in range(5):
+            transport.latency.record(0.02)
+
+        started = time.perf_counter()
+        [response] = send(transport)
+        assert response.status_code == 200
+        assert time.perf_counter() - started < 0.3
+        assert len(api.requests) == 2 and transport.hedged == 1
+
+    def test_fast_request_is_not_hedged(self, monkeypatch):
+        monkeypatch.setattr(resilience_module, "HTTP_HEDGE_MIN_SAMPLES", 5)
+        api = ScriptedApi(200)
+        transport = resilient(api, "test.nohedge", hedge=True)
+        transport.latency.reset()
+        for _ in range(5):
+            transport.latency.record(0.2)
+        send(transport)
+        assert len(api.requests) == 1 and transport.hedged == 0
+
+
+class TestStaleResponses:
+    """Tests for serving expired cache entries while a circuit is open."""
+
+    def test_stale_train_status_while_circuit_open(self, monkeypatch, train_api):
+        monkeypatch.setattr(train_module, "TRAIN_CACHE_MIN_TTL", 0)
+        monkeypatch.setattr(train_module, "TRAIN_CACHE_MAX_TTL", 0.01)
+        calls: list[httpx.Request] = []
+        healthy = train_status_transport(calls)
+        down = {"value": False}
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if down["value"]:
+                calls.append(request)
+                return httpx.Response(503)
+            return await healthy.handle_async_request(request)
+
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(handler))
+            upstream_breaker(Upstream.TRAIN_STATUS).failure_threshold = 1
+            try:
+                fresh = await train_module.fetch_new_train_status("19309", 0)
+                await asyncio.sleep(0.02)
+                down["value"] = True
+                stale = await train_module.fetch_new_train_status("19309", 0)
+                failed_fast = await train_module.fetch_new_train_status("19309", 0)
+                return fresh, stale, failed_fast, upstream_breaker(Upstream.TRAIN_STATUS)
+            finally:
+                await close_http_clients()
+
+        fresh, stale, failed_fast, breaker = asyncio.run(run())
+        assert fresh is not None
+        assert stale is fresh and failed_fast is fresh
+        assert breaker.rejected == 1
+        assert len(calls) == 2  # one good fetch, one failure that opened the circuit
+
+    def test_no_stale_response_while_circuit_closed(self, monkeypatch, train_api):
+        monkeypatch.setattr(train_module, "TRAIN_CACHE_MIN_TTL", 0)
+        monkeypatch.setattr(train_module, "TRAIN_CACHE_MAX_TTL", 0.01)
+        train_module.TRAIN_STATUS_CACHE.put(("19309", 0), object(), ttl=0)
+
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(lambda r: httpx.Response(404)))
+            try:
+                return await train_module.fetch_new_train_status("19309", 0)
+            finally:
+                await close_http_clients()
+
+        assert asyncio.run(run()) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,124 @@
+"""Tests for the trains-between-stations route index."""
+
+import asyncio
+from datetime import date
+import pytest
+from lib.http_client import open_http_clients, close_http_clients
+from lib.route_index import RouteIndex, get_trains_between_table
+from lib.schema.train import TrainSearchResult
+from lib.timetable import TimetableStop, TrainTimetable, timetable_from_status
+from tests.conftest import train_module, train_status_transport
+from tests.timetable import load_example_response
+
+
+def make_timetable(number: str, stops: list[tuple[str, str, str, int]], run_days: str = "") -> TrainTimetable:
+    """A timetable from (code, sta, std, day) tuples."""
+    return TrainTimetable(
+        train_number=number,
+        train_name=f"TRAIN {number}",
+        source=stops[0][0],
+        destination=stops[-1][0],
+        source_stn_name=stops[0][0],
+        dest_stn_name=stops[-1][0],
+        run_days=run_days,
+        stops=[
+            TimetableStop(seq, code, code, True, sta, std, day)
+            for seq, (code, sta, std, day) in enumerate(stops, start=1)
+        ],
+    )
+
+
+@pytest.fixture
+def index() -> RouteIndex:
+    return RouteIndex(
+        timetables=[
+            make_timetable("1", [("AAA", "", "08:00", 0), ("BBB", "09:00", "09:05", 0), ("CCC", "11:00", "", 0)]),
+            make_timetable("2", [("CCC", "", "06:00", 0), ("BBB", "08:00", "08:05", 0), ("AAA", "09:00", "", 0)]),
+            make_timetable("3", [("XXX", "", "22:00", 0), ("AAA", "23:55", "00:05", 0), ("CCC", "03:00", "", 1)], "MON"),
+        ],
+        trains=[
+            TrainSearchResult(number="4", name="ENDPOINTS ONLY", from_stn_code="aaa", to_stn_code="CCC"),
+            TrainSearchResult(number="1", name="TRAIN 1", from_stn_code="AAA", to_stn_code="CCC"),
+        ],
+    )
+
+
+class TestRouteIndex:
+    """Tests for RouteIndex.between."""
+
+    def test_direction_and_departure_order(self, index):
+        trains = index.between("AAA", "CCC")
+        assert [t.train_number for t in trains] == ["3", "1", "4"]
+        assert [t.train_number for t in index.between("ccc", "aaa")] == ["2"]
+        assert [t.train_number for t in index.between("BBB", "CCC")] == ["1"]
+        assert index.between("AAA", "ZZZ") == []
+
+    def test_run_days_are_checked_at_the_boarding_station(self, index):
+        # Train 3 leaves its source on Mondays, so it leaves AAA (just after midnight) on Tuesdays
+        tuesday, monday = date(2026, 1, 6), date(2026, 1, 5)
+        assert "3" in [t.train_number for t in index.between("AAA", "CCC", on=tuesday)]
+        assert "3" not in [t.train_number for t in index.between("AAA", "CCC", on=monday)]
+        assert "3" in [t.train_number for t in index.between("XXX", "CCC", on=monday)]
+
+    def test_unknown_running_days_are_not_matched_to_a_date(self, index):
+        # Train 4 is known only by its endpoints, so it cannot be said to run on any date
+        tuesday = date(2026, 1, 6)
+        assert "4" not in [t.train_number for t in index.between("AAA", "CCC", on=tuesday)]
+        trains = index.between("AAA", "CCC", on=tuesday, unknown_days=True)
+        assert [t.train_number for t in trains] == ["3", "1", "4"]
+
+    def test_duration_spans_days(self, index):
+        overnight = next(t for t in index.between("AAA", "CCC") if t.train_number == "3")
+        assert overnight.duration == 2 * 60 + 55
+
+    def test_timetable_replaces_previous_postings(self, index):
+        index.add_timetable(make_timetable("1", [("AAA", "", "08:00", 0), ("DDD", "10:00", "", 0)]))
+        assert [t.train_number for t in index.between("AAA", "DDD")] == ["1"]
+        assert "1" not in [t.train_number for t in index.between("AAA", "CCC")]
+        # Origin/destination records never override a known timetable
+        index.add_endpoints(TrainSearchResult(number="1", name="TRAIN 1", from_stn_code="AAA", to_stn_code="CCC"))
+        assert "1" not in [t.train_number for t in index.between("AAA", "CCC")]
+
+    def test_example_timetable(self):
+        index = RouteIndex(timetables=[timetable_from_status(load_example_response())])
+        trains = index.between("ANND", "UJN")
+        assert [t.train_number for t in trains] == ["19309"]
+        assert trains[0].departure.std == "20:22"
+        # Non-stop stations are not boarding points
+        assert index.between("KKF", "UJN") == []
+
+    def test_table(self, index):
+        table = get_trains_between_table(index.between("AAA", "CCC"), "aaa", "ccc")
+        assert "Direct trains AAA → CCC: 3 found" in table
+        assert "origin → destination only" in table
+
+        tuesday = date(2026, 1, 6)
+        table = get_trains_between_table(index.between("AAA", "CCC", tuesday, unknown_days=True), "aaa", "ccc", tuesday)
+        assert "Direct trains AAA → CCC on 06-01-2026 (Tuesday): 2 found" in table
+        # Train 3 leaves AAA after midnight, so it arrives at CCC the same day it boards
+        assert "00:05" in table and "2h 55m" in table and "(+1)" not in table
+        assert "Running days unknown" in table and "4 ENDPOINTS ONLY" in table
+        assert "origin → destination only |" not in table
+        assert "none found" in get_trains_between_table([], "AAA", "ZZZ")
+
+
+class TestRouteIndexAccessor:
+    """Tests for the process-wide route index in lib.train."""
+
+    def test_live_responses_feed_the_built_index(self, monkeypatch, train_api):
+        monkeypatch.setattr(train_module, "_route_index", RouteIndex())
+        assert train_module.find_trains_between("ADI", "INDB") == []
+
+        async def run():
+            await open_http_clients(transport=train_status_transport([]))
+            try:
+                await train_module.fetch_new_train_status("19309")
+            finally:
+                await close_http_clients()
+
+        asyncio.run(run())
+        assert [t.train_number for t in train_module.find_trains_between("ADI", "INDB")] == ["19309"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
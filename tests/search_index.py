@@ -0,0 +1,264 @@
+"""Tests for the offline station and train search indexes."""
+
+import asyncio
+import httpx
+from lib.http_client import open_http_clients, close_http_clients
+from lib.schema.train import StationSearchResult
+from lib.search_index import TextIndex
+from tests.conftest import train_module
+
+
+def make_station_index() -> TextIndex[StationSearchResult]:
+    stations = [
+        ("NDLS", "NEW DELHI"),
+        ("DLI", "DELHI JN"),
+        ("HWH", "HOWRAH JN"),
+        ("BRC", "VADODARA JN"),
+        ("RKMP", "RANI KAMLAPATI"),
+        ("ST", "SURAT"),
+    ]
+    return TextIndex(
+        code=lambda s: s.code,
+        name=lambda s: s.name,
+        records=(StationSearchResult(code=c, name=n) for c, n in stations),
+    )
+
+
+def codes(results) -> list[str]:
+    return [r.code for r in results]
+
+
+class TestTextIndex:
+    """Tests for the generic TextIndex."""
+
+    def test_exact_code_ranks_first(self):
+        index = make_station_index()
+        assert codes(index.search("st"))[0] == "ST"
+        assert codes(index.search("NDLS")) == ["NDLS"]
+
+    def test_name_prefix(self):
+        index = make_station_index()
+        assert codes(index.search("rani kamla")) == ["RKMP"]
+
+    def test_token_search_any_order(self):
+        index = make_station_index()
+        assert codes(index.search("delhi new"))[0] == "NDLS"
+        assert set(codes(index.search("delhi"))) == {"NDLS", "DLI"}
+
+    def test_typo_tolerant(self):
+        index = make_station_index()
+        assert codes(index.search("howra"))[0] == "HWH"
+        assert codes(index.search("vadodra"))[0] == "BRC"
+
+    def test_fuzzy_matches_can_be_left_out(self):
+        index = make_station_index()
+        assert index.search("vadodra", fuzzy=False) == []
+        assert codes(index.search("howrah", fuzzy=False)) == ["HWH"]
+
+    def test_no_match(self):
+        index = make_station_index()
+        assert index.search("xyzzy") == []
+        assert index.search("") == []
+
+    def test_add_replaces_same_code(self):
+        index = make_station_index()
+        index.add(StationSearchResult(code="RKMP", name="HABIBGANJ"))
+        assert codes(index.search("habib")) == ["RKMP"]
+        assert index.search("rani kamla") == []
+        assert len(index) == 6
+
+
+class TestStationLookup:
+    """Tests for get_station_codes_from_name."""
+
+    def test_bundled_index_answers_offline(self, monkeypatch):
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", None)
+        results = asyncio.run(train_module.get_station_codes_from_name("howrah"))
+        assert codes(results)[0] == "HWH"
+
+    def test_falls_back_to_upstream_and_learns(self, monkeypatch):
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", "https://search.example")
+        monkeypatch.setattr(train_module, "_station_index", make_station_index())
+        calls: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(200, json={
+                "success": True,
+                "data": [{"code": "QLN", "name": "KOLLAM JN"}],
+                "total": 1,
+                "query": request.url.params["q"],
+            })
+
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(handler))
+            try:
+                first = await train_module.get_station_codes_from_name("kollam")
+                second = await train_module.get_station_codes_from_name("kollam")
+                return first, second
+            finally:
+                await close_http_clients()
+
+        first, second = asyncio.run(run())
+        assert codes(first) == codes(second) == ["QLN"]
+        assert len(calls) == 1
+
+
+    def test_near_match_is_checked_upstream(self, monkeypatch):
+        index = make_station_index()
+        index.add(StationSearchResult(code="VDA", name="VASAD JN"))
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", "https://search.example")
+        monkeypatch.setattr(train_module, "_station_index", index)
+        calls: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(200, json={
+                "success": True,
+                "data": [{"code": "BSR", "name": "VASAI ROAD"}],
+                "total": 1,
+                "query": request.url.params["q"],
+            })
+
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(handler))
+            try:
+                first = await train_module.get_station_codes_from_name("Vasai Road")
+                second = await train_module.get_station_codes_from_name("Vasai Road")
+                return first, second
+            finally:
+                await close_http_clients()
+
+        first, second = asyncio.run(run())
+        assert codes(first) == ["BSR", "VDA"]
+        assert codes(second)[0] == "BSR"
+        assert len(calls) == 1  # learnt: the second lookup is a local name match
+
+    def test_near_match_offline(self, monkeypatch):
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", None)
+        monkeypatch.setattr(train_module, "_station_index", make_station_index())
+        results = asyncio.run(train_module.get_station_codes_from_name("vadodra"))
+        assert codes(results)[0] == "BRC"
+
+    def test_refresh_persists_to_cache(self, monkeypatch, tmp_path):
+        path = tmp_path / "stations.tsv"
+        path.write_text("# code\tname\nNDLS\tNEW DELHI\n")
+        bundled = path.read_text()
+        cache_path = tmp_path / "cache" / "stations.tsv"
+        monkeypatch.setattr(train_module, "STATION_DATA_PATH", str(path))
+        monkeypatch.setattr(train_module, "STATION_INDEX_CACHE_PATH", str(cache_path))
+        monkeypatch.setattr(train_module, "_station_index", None)
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", "https://search.example")
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={
+                "success": True,
+                "data": [{"code": "QLN", "name": "KOLLAM JN"}],
+                "total": 1,
+                "query": request.url.params["q"],
+            })
+
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(handler))
+            try:
+                return await train_module.refresh_station_index(["ko"])
+            finally:
+                await close_http_clients()
+
+        assert asyncio.run(run()) == 2
+        assert path.read_text() == bundled
+        assert "QLN\tKOLLAM JN" in cache_path.read_text()
+
+        # The next start loads the bundled list with the cached stations overlaid
+        monkeypatch.setattr(train_module, "_station_index", None)
+        assert {s.code for s in train_module.station_index()} == {"NDLS", "QLN"}
+
+
+class TestTrainLookup:
+    """Tests for get_train_numbers_from_name."""
+
+    def test_fuzzy_name_match_offline(self, monkeypatch):
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", None)
+        results = asyncio.run(train_module.get_train_numbers_from_name("punjab mial"))
+        assert {t.number for t in results[:2]} == {"12137", "12138"}
+
+    def test_near_match_is_checked_upstream(self, monkeypatch):
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", "https://search.example")
+        monkeypatch.setattr(train_module, "_train_index", None)
+        calls: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(200, json={
+                "success": True,
+                "data": [{"number": "12649", "name": "KARNATAKA SAMPARK KRANTI", "fromStnCode": "YPR", "toStnCode": "NZM"}],
+                "total": 1,
+                "query": request.url.params["q"],
+            })
+
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(handler))
+            try:
+                return await train_module.get_train_numbers_from_name("Sampark Kranti")
+            finally:
+                await close_http_clients()
+
+        results = asyncio.run(run())
+        assert results[0].number == "12649"
+        assert len(calls) == 1
+
+    def test_number_exact_and_prefix(self, monkeypatch):
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", None)
+        assert asyncio.run(train_module.get_train_numbers_from_name("12301"))[0].name == "HOWRAH RAJDHANI"
+        results = asyncio.run(train_module.get_train_numbers_from_name("1230", limit=20))
+        assert {t.number for t in results} >= {"12301", "12302", "12309"}
+
+    def test_filter_by_route(self, monkeypatch):
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", None)
+        results = asyncio.run(train_module.get_train_numbers_from_name(
+            "rajdhani", from_station_code="hwh", to_station_code="NDLS"
+        ))
+        assert [t.number for t in results] == ["12301"]
+
+    def test_route_only_query(self, monkeypatch):
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", None)
+        results = asyncio.run(train_module.get_train_numbers_from_name("", to_station_code="NDLS", limit=50))
+        assert results
+        assert all(t.to_stn_code == "NDLS" for t in results)
+
+    def test_refresh_merges_and_persists(self, monkeypatch, tmp_path):
+        path = tmp_path / "trains.tsv"
+        path.write_text("# number\tname\tfrom_stn_code\tto_stn_code\n12138\tPUNJAB MAIL\tFZR\tCSMT\n")
+        bundled = path.read_text()
+        cache_path = tmp_path / "cache" / "trains.tsv"
+        monkeypatch.setattr(train_module, "TRAIN_DATA_PATH", str(path))
+        monkeypatch.setattr(train_module, "TRAIN_INDEX_CACHE_PATH", str(cache_path))
+        monkeypatch.setattr(train_module, "_train_index", None)
+        monkeypatch.setattr(train_module, "TRAIN_STATUS_API_BASE", "https://search.example")
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={
+                "success": True,
+                "data": [{"number": "12137", "name": "PUNJAB MAIL", "fromStnCode": "CSMT", "toStnCode": "FZR"}],
+                "total": 1,
+                "query": request.url.params["q"],
+            })
+
+        async def run():
+            await open_http_clients(transport=httpx.MockTransport(handler))
+            try:
+                return await train_module.refresh_train_index(["121"])
+            finally:
+                await close_http_clients()
+
+        assert asyncio.run(run()) == 2
+        assert path.read_text() == bundled
+        assert "12137\tPUNJAB MAIL\tCSMT\tFZR" in cache_path.read_text()
+
+        # The next start loads the bundled list with the cached trains overlaid
+        monkeypatch.setattr(train_module, "_train_index", None)
+        assert {t.number for t in train_module.train_index()} == {"12137", "12138"}
+
+    def test_sweep_covers_leading_zero_numbers(self):
+        prefixes = train_module.TRAIN_NUMBER_PREFIXES
+        assert prefixes[0] == "000" and "012" in prefixes and prefixes[-1] == "999"
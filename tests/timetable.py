@@ -0,0 +1,131 @@
+"""Tests for the local timetable store."""
+
+import asyncio
+import os
+from datetime import date
+import httpx
+import pytest
+from lib.http_client import open_http_clients, close_http_clients
+from lib.schema.train import NewTrainStatusResponse
+from lib.timetable import (
+    TimetableStore,
+    timetable_from_status,
+    get_timetable_route,
+    get_timetable_schedule,
+)
+from tests.conftest import EXAMPLE_TRAIN_STATUS, timetable_module, train_module, train_status_transport
+
+
+def load_example_response() -> NewTrainStatusResponse:
+    with open(EXAMPLE_TRAIN_STATUS, "rb") as f:
+        return NewTrainStatusResponse.model_validate_json(f.read())
+
+
+class TestTimetableFromStatus:
+    """Tests for extracting a timetable from a live status response."""
+
+    def test_route_in_order_with_non_stops(self):
+        timetable = timetable_from_status(load_example_response())
+        seqs = [stop.seq for stop in timetable.stops]
+        assert seqs == sorted(seqs)
+        assert timetable.stops[0].station_code == "ADI"
+        assert timetable.stops[-1].station_code == "INDB"
+        assert [stop.station_code for stop in timetable.halts][:3] == ["ADI", "MHD", "ND"]
+        assert any(stop.station_code == "KKF" and not stop.halt for stop in timetable.stops)
+
+    def test_current_station_is_kept(self):
+        timetable = timetable_from_status(load_example_response())
+        assert any(stop.station_code == "BIO" for stop in timetable.stops)
+
+    def test_day_advances_past_midnight(self):
+        halts = {stop.station_code: stop for stop in timetable_from_status(load_example_response()).halts}
+        assert halts["ADI"].day == 0
+        assert halts["MGN"].day == 0
+        assert halts["RTM"].day == 1
+        assert halts["INDB"].day == 1
+
+    def test_runs_on(self):
+        timetable = timetable_from_status(load_example_response())
+        timetable.run_days = "MON,WED"
+        assert timetable.runs_on(date(2026, 1, 5))  # Monday
+        assert not timetable.runs_on(date(2026, 1, 6))
+
+
+class TestTimetableStore:
+    """Tests for TimetableStore."""
+
+    def test_round_trip(self):
+        store = TimetableStore(":memory:")
+        expected = timetable_from_status(load_example_response())
+        assert store.record(load_example_response())
+        stored = store.get("19309")
+        assert stored.stops == expected.stops
+        assert stored.run_days == expected.run_days
+        assert "19309" in store and len(store) == 1
+        assert store.get("99999") is None
+
+    def test_fresh_timetable_is_not_rewritten(self):
+        store = TimetableStore(":memory:", max_age=3600)
+        assert store.record(load_example_response())
+        assert not store.record(load_example_response())
+        store.max_age = 0
+        assert store.record(load_example_response())
+        assert len(store.get("19309").stops) == len(timetable_from_status(load_example_response()).stops)
+
+    def test_persists_across_restarts(self, tmp_path):
+        path = os.path.join(tmp_path, "timetable.sqlite3")
+        store = TimetableStore(path)
+        store.record(load_example_response())
+        store.close()
+
+        reopened = TimetableStore(path)
+        assert [t.train_number for t in reopened] == ["19309"]
+        reopened.close()
+
+    def test_unopenable_path_falls_back_to_memory(self, monkeypatch, tmp_path):
+        blocker = os.path.join(tmp_path, "file")
+        open(blocker, "w").close()
+        monkeypatch.setattr(timetable_module, "TIMETABLE_DB_PATH", os.path.join(blocker, "timetable.sqlite3"))
+        monkeypatch.setattr(timetable_module, "_timetable", None)
+        store = timetable_module.timetable_store()
+        assert store.path == ":memory:"
+        assert store.record(load_example_response())
+        store.close()
+
+    def test_formatting(self):
+        timetable = timetable_from_status(load_example_response())
+        route = get_timetable_route(timetable)
+        assert "AHMEDABAD JN (ADI) -> MHMDVD KHEDA RD (MHD)" in route
+        assert "KANKARIA" not in route
+        assert "[KANKARIA] (KKF)" in get_timetable_route(timetable, include_non_stops=True)
+
+        schedule = get_timetable_schedule(timetable)
+        assert "Runs On: MON,TUE,WED,THU,FRI,SAT,SUN" in schedule
+        assert "RATLAM JN (RTM)" in schedule
+        assert "Destination" in schedule
+
+
+class TestGetTrainTimetable:
+    """Tests for get_train_timetable (mocked upstream)."""
+
+    def test_live_fetch_only_for_unknown_trains(self, train_api, timetable):
+        calls: list[httpx.Request] = []
+
+        async def run():
+            await open_http_clients(transport=train_status_transport(calls))
+            try:
+                first = await train_module.get_train_timetable("19309")
+                train_module.TRAIN_STATUS_CACHE.clear()
+                second = await train_module.get_train_timetable("19309")
+                return first, second
+            finally:
+                await close_http_clients()
+
+        first, second = asyncio.run(run())
+        assert len(calls) == 1
+        assert first.stops == second.stops
+        assert "19309" in timetable
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
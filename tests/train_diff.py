@@ -0,0 +1,116 @@
+"""Tests for diffs between live status snapshots."""
+
+import copy
+import json
+import pytest
+from lib.schema.train import NewTrainStatusResponse
+from lib.train_diff import (
+    SNAPSHOTS,
+    changes_since,
+    diff_status,
+    get_status_diff,
+    get_status_or_changes,
+    snapshot_token,
+)
+from lib.train import get_current_train_position
+from tests.conftest import EXAMPLE_TRAIN_STATUS
+
+with open(EXAMPLE_TRAIN_STATUS) as f:
+    EXAMPLE = json.load(f)
+
+
+def later_snapshot() -> dict:
+    """The example run after it has passed MGN: later, with a platform change at RTM."""
+    data = copy.deepcopy(EXAMPLE)
+    upcoming = [s for s in data["upcoming_stations"] if s["station_code"]]
+    mgn, rtm = upcoming[0], upcoming[1]
+    data["previous_stations"].append(mgn)
+    data["upcoming_stations"] = upcoming[1:]
+    rtm.update(eta="01:50", arrival_delay=15, platform_number=3)
+    data.update(
+        current_station_code="MGN",
+        current_station_name="MEGHNAGAR",
+        delay=15,
+        si_no=mgn["si_no"],
+        update_time="2026-01-05 00:10:00 +0530",
+    )
+    return data
+
+
+@pytest.fixture
+def snapshots():
+    SNAPSHOTS.clear()
+    yield (
+        NewTrainStatusResponse.model_validate(copy.deepcopy(EXAMPLE)),
+        NewTrainStatusResponse.model_validate(later_snapshot()),
+    )
+    SNAPSHOTS.clear()
+
+
+class TestDiffStatus:
+    """Tests for diff_status and get_status_diff."""
+
+    def test_same_snapshot_is_empty(self, snapshots):
+        old, _ = snapshots
+        diff = diff_status(old, NewTrainStatusResponse.model_validate(copy.deepcopy(EXAMPLE)))
+        assert diff.empty
+        assert "No changes" in get_status_diff(diff)
+
+    def test_passed_stations_delay_eta_and_platform(self, snapshots):
+        old, new = snapshots
+        diff = diff_status(old, new)
+        assert diff.stations_passed == ["MEGHNAGAR (MGN)"]
+        assert (diff.old_delay, diff.new_delay) == (7, 15)
+        [rtm] = diff.station_changes
+        assert rtm.station_code == "RTM"
+        assert rtm.eta_shift == 15
+        assert (rtm.old_platform, rtm.new_platform) == (6, 3)
+
+        text = get_status_diff(diff)
+        assert "Passed: MEGHNAGAR (MGN)" in text
+        assert "Delay: Delayed by 15 mins (+8 min)" in text
+        assert "RATLAM JN (RTM): ETA 01:35 → 01:50, +15 min; delay 0 → 15 min; PF 6 → 3" in text
+
+    def test_eta_shift_across_midnight(self, snapshots):
+        old, new = snapshots
+        [rtm] = diff_status(old, new).station_changes
+        rtm.old_eta, rtm.new_eta = "23:50", "00:20"
+        assert rtm.eta_shift == 30
+
+
+class TestSnapshotTokens:
+    """Tests for snapshot tokens and the `since` responses."""
+
+    def test_token_is_stable_per_snapshot(self, snapshots):
+        old, new = snapshots
+        assert snapshot_token(old) == snapshot_token(old)
+        assert snapshot_token(old) != snapshot_token(new)
+        assert snapshot_token(old).startswith("19309-")
+
+    def test_changes_since_token(self, snapshots):
+        old, new = snapshots
+        token = snapshot_token(old)
+        assert "Passed: MEGHNAGAR (MGN)" in changes_since(token, new)
+        assert changes_since("19309-unknown", new) is None
+
+        other_run = NewTrainStatusResponse.model_validate({**EXAMPLE, "train_start_date": "2026-01-05"})
+        assert changes_since(token, other_run) is None
+
+    def test_full_answer_then_changes(self, snapshots):
+        old, new = snapshots
+        first = get_status_or_changes(old, None, get_current_train_position)
+        assert "Current Train Position" in first
+        token = first.rsplit("Snapshot: ", 1)[1].split()[0]
+
+        second = get_status_or_changes(new, token, get_current_train_position)
+        assert "Current Train Position" not in second
+        assert second.startswith("Changes - SHANTI EXPRESS (19309)")
+        assert f"Snapshot: {snapshot_token(new)}" in second
+
+        stale = get_status_or_changes(new, "19309-expired", get_current_train_position)
+        assert stale.startswith("Snapshot unknown")
+        assert "Current Train Position" in stale
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,150 @@
+"""Tests for picking the train run when start_day is omitted (mocked upstream)."""
+
+import asyncio
+import json
+from datetime import date, timedelta
+import httpx
+import pytest
+from lib.schema.pnr import PNRResponse
+from lib.schema.train import TrainRunQuery
+from tests.conftest import EXAMPLE_TRAIN_STATUS, train_module
+from tests.pnr import EXAMPLE_PNR, pnr_module
+
+
+class MockRunsApi:
+    """A train status API serving one run per start_day, each with its own state."""
+
+    def __init__(self, runs: dict[int, dict]):
+        """
+        Args:
+            runs: Overrides of the example response per start_day; start_days not listed fail
+        """
+        with open(EXAMPLE_TRAIN_STATUS) as f:
+            self.example = json.load(f)
+        self.runs = runs
+        self.requests: list[int] = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        start_day = int(request.url.params["start_day"])
+        self.requests.append(start_day)
+        await asyncio.sleep(0.01)
+        if start_day not in self.runs:
+            return httpx.Response(200, json={"success": False})
+        body = dict(self.example)
+        body["train_start_date"] = (date.today() - timedelta(days=start_day)).isoformat()
+        body.update(self.runs[start_day])
+        return httpx.Response(200, json=body)
+
+
+@pytest.fixture
+def clean_pnr_cache():
+    pnr_module.PNR_STATUS_CACHE.clear()
+    yield
+    pnr_module.PNR_STATUS_CACHE.clear()
+
+
+def started(response) -> int:
+    return (date.today() - train_module.get_train_start_date(response)).days
+
+
+class TestFetchTrainRunStatus:
+    """Tests for fetch_train_run_status."""
+
+    def test_explicit_start_day_is_not_probed(self, train_api, mock_upstream):
+        api = MockRunsApi({0: {}, 1: {}, 2: {}})
+        response = mock_upstream(api.handler, lambda: train_module.fetch_train_run_status("19309", 2))
+        assert started(response) == 2
+        assert api.requests == [2]
+
+    def test_probes_concurrently_and_skips_finished_runs(self, train_api, mock_upstream):
+        api = MockRunsApi({0: {"at_dstn": True}, 1: {}, 2: {}})
+        response = mock_upstream(api.handler, lambda: train_module.fetch_train_run_status("19309"))
+        assert started(response) == 1
+        assert sorted(api.requests) == [0, 1, 2]
+
+    def test_run_not_on_any_day(self, train_api, mock_upstream):
+        api = MockRunsApi({})
+        assert mock_upstream(api.handler, lambda: train_module.fetch_train_run_status("19309")) is None
+
+    def test_cached_run_is_reused(self, train_api, clean_pnr_cache, mock_upstream):
+        api = MockRunsApi({0: {}, 1: {}, 2: {}})
+
+        async def run():
+            await train_module.fetch_new_train_status("19309", 1)
+            return await train_module.fetch_train_run_status("19309")
+
+        assert started(mock_upstream(api.handler, run)) == 1
+        assert api.requests == [1]
+
+    def test_pnr_source_date_is_used(self, train_api, clean_pnr_cache, mock_upstream):
+        api = MockRunsApi({0: {}, 1: {}, 2: {}})
+        with open(EXAMPLE_PNR) as f:
+            pnr = PNRResponse.model_validate_json(f.read())
+        pnr.data.TrainNo = "19309"
+        pnr.data.SourceDoj = (date.today() - timedelta(days=2)).strftime("%d-%m-%Y")
+        pnr_module.PNR_STATUS_CACHE.put("1234567890", pnr, ttl=60)
+
+        assert train_module.known_start_day("19309") == 2
+        assert started(mock_upstream(api.handler, lambda: train_module.fetch_train_run_status("19309"))) == 2
+        assert api.requests == [2]
+
+    def test_batch_resolves_runs_within_the_concurrency_limit(self, train_api, mock_upstream):
+        api = MockRunsApi({0: {"at_dstn": True}, 1: {}})
+        runs = [TrainRunQuery(train_number="19309"), TrainRunQuery(train_number="19309", start_day=0)]
+        results = mock_upstream(api.handler, lambda: train_module.fetch_train_status_batch(runs, concurrency=1))
+        assert started(results[0][1]) == 1
+        assert started(results[1][1]) == 0
+
+
+
+class TestActiveRunResolution:
+    """Tests for picking among probed runs and memoizing the pick."""
+
+    def test_run_on_its_way_beats_run_waiting_at_source(self, train_api, mock_upstream):
+        api = MockRunsApi({0: {"at_src": True}, 1: {}, 2: {"at_dstn": True}})
+        assert started(mock_upstream(api.handler, lambda: train_module.fetch_train_run_status("19309"))) == 1
+
+    def test_responses_for_other_runs_are_ignored(self, train_api, mock_upstream):
+        # The API answers a day the train does not run with a different run
+        other_run = {"train_start_date": (date.today() - timedelta(days=1)).isoformat(), "is_run_day": False}
+        api = MockRunsApi({0: other_run, 1: {"at_dstn": True}})
+        assert started(mock_upstream(api.handler, lambda: train_module.fetch_train_run_status("19309"))) == 1
+
+    def test_memoized_run_skips_probing(self, train_api, mock_upstream):
+        api = MockRunsApi({0: {"at_src": True}, 1: {}, 2: {}})
+
+        async def run():
+            first = await train_module.fetch_train_run_status("19309")
+            probes = len(api.requests)
+            train_module.TRAIN_STATUS_CACHE.clear()
+            second = await train_module.fetch_train_run_status("19309")
+            return first, second, probes
+
+        first, second, probes = mock_upstream(api.handler, run)
+        assert started(first) == started(second) == 1
+        assert probes == 3
+        assert api.requests[probes:] == [1]
+        assert train_module.ACTIVE_RUNS[("19309", date.today())].start_date == date.today() - timedelta(days=1)
+
+    def test_memoized_run_is_dropped_once_it_arrives(self, train_api, mock_upstream):
+        api = MockRunsApi({0: {"at_src": True}, 1: {}})
+
+        async def run():
+            await train_module.fetch_train_run_status("19309")
+            api.runs = {0: {}, 1: {"at_dstn": True}}
+            train_module.TRAIN_STATUS_CACHE.clear()
+            return await train_module.fetch_train_run_status("19309")
+
+        assert started(mock_upstream(api.handler, run)) == 0
+
+    def test_probes_cover_the_journey_length(self, monkeypatch, train_api, mock_upstream):
+        monkeypatch.setattr(train_module, "TRAIN_START_DAY_PROBES", 5)
+        assert train_module.probe_days("19309") == 5
+        api = MockRunsApi({0: {}})
+        mock_upstream(api.handler, lambda: train_module.fetch_new_train_status("19309", 0))
+        # The example train arrives the day after it leaves: today's, yesterday's and (if late) the day before's run
+        assert train_module.probe_days("19309") == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,12 +1,25 @@
 """Tests for new train status functions."""
 
+import asyncio
 import json
+from datetime import date, timedelta
+import httpx
 import pytest
-from lib.schema.train import NewTrainStatusResponse
+from lib.schema.train import (
+    CompactNonStop,
+    CompactStation,
+    FullTrainStatusResponse,
+    NewTrainStatusResponse,
+    TrainRunQuery,
+    UpcomingStation,
+)
 from lib.train import (
     fetch_new_train_status,
+    fetch_train_status_batch,
+    get_batch_train_summary,
     format_delay,
     get_expected_arrival_at_station,
+    get_times_at_stations,
     get_current_train_position,
     get_train_route,
     get_upcoming_stations,
@@ -46,6 +59,56 @@ class TestFormatDelay:
         assert format_delay(-5) == "Early by 5 mins"
 
 
+class TestStationIndex:
+    """Tests for the cached station index on NewTrainStatusResponse."""
+
+    def test_indexes_halts_and_non_stops(self):
+        response = load_example_response()
+        assert response.station_lookup("MGN").kind == "upcoming"
+        assert response.station_lookup("adi").kind == "previous"
+        location = response.station_lookup("KKF")
+        assert location.kind == "non_stop"
+        assert location.station.station_code == "KKF"
+        assert response.station_lookup("XXXX") is None
+        assert "" not in response.station_index
+
+    def test_positions_follow_route_order(self):
+        response = load_example_response()
+        positions = [response.station_lookup(code).position for code in ("ADI", "KKF", "KKEC", "MHD", "MGN")]
+        assert positions == sorted(positions)
+
+    def test_built_once(self):
+        response = load_example_response()
+        assert response.station_index is response.station_index
+
+    def test_upcoming_halt_wins_over_previous_pass(self):
+        response = load_example_response()
+        previous = response.previous_stations[1].model_copy(update={"station_code": "MGN"})
+        response = response.model_copy(update={"previous_stations": [response.previous_stations[0], previous]})
+        assert response.station_lookup("MGN").kind == "upcoming"
+
+
+class TestCompactRoutes:
+    """Tests that the formatting functions give the same answers on compacted responses."""
+
+    def test_formatting_matches_full_models(self):
+        response = load_example_response()
+        compact = load_example_response().compact()
+        for format_fn in (get_train_route, get_upcoming_stations, get_train_summary, get_current_train_position):
+            assert format_fn(compact) == format_fn(response)
+        assert get_train_route(compact, include_non_stops=True) == get_train_route(response, include_non_stops=True)
+        for code in ("MGN", "ADI", "KKF", "BIO", "XXXX"):
+            assert get_expected_arrival_at_station(compact, code) == get_expected_arrival_at_station(response, code)
+        assert get_times_at_stations(compact, ["MGN", "ADI", "KKF"]) == get_times_at_stations(response, ["MGN", "ADI", "KKF"])
+
+    def test_compacting_after_lookup_rebuilds_index(self):
+        response = load_example_response()
+        assert isinstance(response.station_lookup("MGN").station, UpcomingStation)
+        response.compact()
+        assert isinstance(response.station_lookup("MGN").station, CompactStation)
+        assert isinstance(response.station_lookup("KKF").station, CompactNonStop)
+
+
 class TestGetExpectedArrivalAtStation:
     """Tests for get_expected_arrival_at_station function."""
 
@@ -85,6 +148,29 @@ class TestGetExpectedArrivalAtStation:
         assert "MEGHNAGAR" in result_lower
 
 
+class TestGetTimesAtStations:
+    """Tests for get_times_at_stations function."""
+
+    def test_one_row_per_station_in_request_order(self):
+        response = load_example_response()
+        result = get_times_at_stations(response, ["MGN", "adi", "MGN"])
+        lines = result.splitlines()
+        assert "Train Start Date:" in result
+        rows = lines[lines.index(next(l for l in lines if l.startswith("Station"))) + 2:]
+        assert len(rows) == 2
+        assert rows[0].startswith("MEGHNAGAR (MGN)")
+        assert "Upcoming" in rows[0] and "00:02" in rows[0]
+        assert rows[1].startswith("AHMEDABAD JN (ADI)")
+        assert "Departed" in rows[1]
+
+    def test_current_non_stop_and_unknown_stations(self):
+        response = load_example_response()
+        result = get_times_at_stations(response, ["BIO", "KKF", "XYZ"])
+        assert "Current" in result
+        assert "Non-stop" in result
+        assert "Not on route" in result
+
+
 class TestGetCurrentTrainPosition:
     """Tests for get_current_train_position function."""
 
@@ -287,6 +373,38 @@ class TestSchemaValidation:
         assert response.success == True
         assert response.data.train_number == "19309"
 
+    def test_lean_model_skips_ui_payload(self):
+        """Test that the default model drops the ad/UI payload and the full model keeps it."""
+        with open(os.path.join(PROJECT_ROOT, "lib", "example_api_responses", "train_status.json")) as f:
+            data = json.load(f)
+        lean = NewTrainStatusResponse.model_validate(data)
+        full = FullTrainStatusResponse.model_validate(data)
+        assert "ttb_card" not in NewTrainStatusResponse.model_fields
+        assert full.ttb_card is not None and full.current_location_info
+        assert isinstance(full, NewTrainStatusResponse)
+        assert lean.next_stoppage_info == full.next_stoppage_info
+        assert get_train_summary(lean) == get_train_summary(full)
+
+    def test_station_lists_validated_on_first_access(self):
+        """Test that header-only use never validates the route."""
+        response = load_example_response()
+        assert get_current_train_position(response)
+        assert "upcoming_stations" not in response.__dict__
+        assert "previous_stations" not in response.__dict__
+
+        stations = response.upcoming_stations
+        assert all(isinstance(s, UpcomingStation) for s in stations)
+        assert response.upcoming_stations is stations
+        assert response.raw_upcoming_stations is stations
+
+    def test_dump_round_trips_station_lists(self):
+        response = load_example_response()
+        response.previous_stations
+        dumped = response.model_dump(by_alias=True)
+        again = NewTrainStatusResponse.model_validate(dumped)
+        assert again.previous_stations == response.previous_stations
+        assert again.upcoming_stations == response.upcoming_stations
+
     def test_data_fields(self):
         """Test that data fields are correctly parsed."""
         response = load_example_response()
@@ -336,5 +454,53 @@ class TestSchemaValidation:
         assert remaining == 277  # 525 - 248
 
 
+class TestFetchTrainStatusBatch:
+    """Tests for fetch_train_status_batch (mocked upstream)."""
+
+    def run_batch(self, mock_upstream, runs: list[TrainRunQuery], concurrency: int = 8):
+        with open(os.path.join(PROJECT_ROOT, "lib", "example_api_responses", "train_status.json"), "rb") as f:
+            body = f.read()
+        in_flight = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            if "/99999/" in request.url.path:
+                return httpx.Response(200, json={"success": False})
+            return httpx.Response(200, content=body)
+
+        results = mock_upstream(handler, lambda: fetch_train_status_batch(runs, concurrency=concurrency))
+        return results, peak
+
+    def test_partial_failures_reported_per_train(self, train_api, mock_upstream):
+        runs = [
+            TrainRunQuery(train_number="19309"),
+            TrainRunQuery(train_number="99999", start_day=1),
+            TrainRunQuery(train_number="99999"),
+        ]
+        results, _ = self.run_batch(mock_upstream, runs)
+        assert [run for run, _ in results] == runs
+        assert isinstance(results[0][1], NewTrainStatusResponse)
+        assert results[1][1] is None and results[2][1] is None
+
+        summary = get_batch_train_summary(results)
+        assert "2 unavailable" in summary
+        assert "SHANTI EXPRESS" in summary
+        started = (date.today() - timedelta(days=1)).strftime("%d-%m-%Y")
+        assert f"99999 (run started {started}, start_day=1): Error" in summary
+        assert "99999 (no current run found in the last 3 days): Error" in summary
+        assert "start_day=None" not in summary
+
+    def test_concurrency_is_bounded(self, train_api, mock_upstream):
+        runs = [TrainRunQuery(train_number=str(12000 + i)) for i in range(10)]
+        results, peak = self.run_batch(mock_upstream, runs, concurrency=3)
+        assert all(response is not None for _, response in results)
+        assert peak <= 3
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
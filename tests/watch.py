@@ -0,0 +1,158 @@
+"""Tests for shared live status pollers (mocked upstream)."""
+
+import asyncio
+import json
+import httpx
+import pytest
+from lib.fleet import PollerFleet, StatusUpdate, poller_fleet, status_changes
+from lib.schema.train import NewTrainStatusResponse
+from lib.watch import get_watch_log, subscribe_train_status
+import lib.fleet as fleet_module
+from tests.conftest import EXAMPLE_TRAIN_STATUS, train_module
+
+INTERVAL = 0.02
+
+
+class MockMovingTrain:
+    """A train status API whose answers step through a list of snapshots, one per request."""
+
+    def __init__(self, steps: list[dict]):
+        with open(EXAMPLE_TRAIN_STATUS) as f:
+            self.example = json.load(f)
+        self.steps = steps
+        self.requests = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        step = self.steps[min(self.requests, len(self.steps) - 1)]
+        self.requests += 1
+        return httpx.Response(200, json={**self.example, **step})
+
+
+@pytest.fixture
+def fast_polling(monkeypatch, train_api):
+    """Poll every INTERVAL seconds instead of the API's cur_refresh_interval, from a fresh fleet."""
+    monkeypatch.setattr(train_module, "TRAIN_CACHE_MIN_TTL", 0)
+    monkeypatch.setattr(train_module, "TRAIN_CACHE_MAX_TTL", INTERVAL)
+    monkeypatch.setattr(fleet_module, "_fleet", PollerFleet(max_rate=0, jitter=0))
+
+
+def snapshot(**fields) -> NewTrainStatusResponse:
+    with open(EXAMPLE_TRAIN_STATUS) as f:
+        data = json.load(f)
+    return NewTrainStatusResponse.model_validate({**data, **fields})
+
+
+async def collect(queue: asyncio.Queue[StatusUpdate], count: int) -> list[StatusUpdate]:
+    return [await asyncio.wait_for(queue.get(), 1) for _ in range(count)]
+
+
+class TestStatusChanges:
+    """Tests for status_changes."""
+
+    def test_unchanged(self):
+        assert status_changes(snapshot(), snapshot()) == []
+
+    def test_station_delay_and_platform(self):
+        changes = status_changes(
+            snapshot(),
+            snapshot(current_station_code="RTM", current_station_name="RATLAM JN", delay=15, platform_number=4),
+        )
+        assert changes == ["Now at RATLAM JN (RTM)", "Delayed by 15 mins (was delayed by 7 mins)", "Platform 4 at RTM"]
+
+    def test_platform_change_at_same_station(self):
+        changes = status_changes(snapshot(platform_number=2), snapshot(platform_number=3))
+        assert changes == ["Platform at BIO changed: 2 → 3"]
+
+    def test_arrival(self):
+        assert status_changes(snapshot(), snapshot(at_dstn=True))[-1] == "Reached INDORE JN BG (INDB)"
+
+
+class TestSubscribeTrainStatus:
+    """Tests for subscribe_train_status."""
+
+    def test_pushes_only_changes_and_stops_at_destination(self, fast_polling, mock_upstream):
+        api = MockMovingTrain([{}, {}, {"delay": 12}, {"delay": 12}, {"at_dstn": True, "delay": 12}])
+
+        async def run():
+            async with subscribe_train_status("19309", 0) as queue:
+                updates = await collect(queue, 3)
+                await asyncio.sleep(INTERVAL * 3)
+                return updates, queue.empty()
+
+        updates, drained = mock_upstream(api.handler, run)
+        assert [u.changes for u in updates] == [[], ["Delayed by 12 mins (was delayed by 7 mins)"], ["Reached INDORE JN BG (INDB)"]]
+        assert updates[-1].final is True
+        assert drained
+        assert api.requests == 5
+
+        log = get_watch_log(updates)
+        assert "SHANTI EXPRESS" in log
+        assert "Delayed by 12 mins" in log
+        assert "reached its destination" in log
+
+    def test_subscribers_share_one_fleet_run(self, fast_polling, mock_upstream):
+        api = MockMovingTrain([{}, {"delay": 20}])
+
+        async def run():
+            async with subscribe_train_status("19309", 0) as first:
+                first_updates = await collect(first, 1)
+                async with subscribe_train_status("19309", 0) as second:
+                    assert len(poller_fleet()) == 1
+                    late = await collect(second, 2)  # the latest snapshot, then the change
+                    shared = await collect(first, 1)
+            return first_updates + shared, late
+
+        first, late = mock_upstream(api.handler, run)
+        assert late[0].train_status is first[0].train_status
+        assert late[1].changes == first[1].changes == ["Delayed by 20 mins (was delayed by 7 mins)"]
+        assert len(poller_fleet()) == 0
+
+    def test_watching_a_fleet_run_shares_its_polls(self, fast_polling, mock_upstream):
+        api = MockMovingTrain([{}, {"delay": 20}])
+
+        async def run():
+            fleet = poller_fleet()
+            fleet.watch("19309", 0)
+            async with subscribe_train_status("19309", 0) as queue:
+                updates = await collect(queue, 2)
+                assert len(fleet) == 1
+            held = ("19309", 0) in fleet
+            await fleet.stop()
+            return updates, held
+
+        updates, held = mock_upstream(api.handler, run)
+        assert updates[1].changes == ["Delayed by 20 mins (was delayed by 7 mins)"]
+        assert api.requests == 2
+        assert held  # still watched for the fleet after the subscriber left
+
+    def test_seeded_watch_keeps_its_status_when_polls_fail(self, fast_polling, mock_upstream):
+        api = MockMovingTrain([{"success": False}])
+
+        async def run():
+            async with subscribe_train_status("19309", 0, snapshot()) as queue:
+                updates = await collect(queue, 1)
+                polled = api.requests
+                await asyncio.sleep(INTERVAL * 3)
+                return updates, polled
+
+        updates, polled = mock_upstream(api.handler, run)
+        assert polled == 0  # the seed stands in for the first poll
+        assert api.requests >= 1
+        assert "SHANTI EXPRESS" in get_watch_log(updates)
+
+    def test_last_unsubscribe_stops_polling(self, fast_polling, mock_upstream):
+        api = MockMovingTrain([{}])
+
+        async def run():
+            async with subscribe_train_status("19309", 0) as queue:
+                await collect(queue, 1)
+            polled = api.requests
+            await asyncio.sleep(INTERVAL * 3)
+            return polled
+
+        polled = mock_upstream(api.handler, run)
+        assert api.requests == polled
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])